@@ -9,6 +9,10 @@ import time
 BBOX = "40.98,28.92,41.11,29.07"
 OUTPUT_FILE = "data/istanbul_pilot.osm"
 
+# Ülke ölçeği Overpass'tan çekilemez: Hazır PBF özeti (importer .pbf'i süreç havuzuyla okur)
+PBF_URL = "https://download.geofabrik.de/europe/turkey-latest.osm.pbf"
+PBF_FILE = "data/turkey-latest.osm.pbf"
+
 # Yedekli Sunucu Listesi (Failover)
 SERVERS = [
     "https://overpass.kumi.systems/api/interpreter", 
@@ -20,6 +24,7 @@ SERVERS = [
 def download_expanded():
     print("🌍 İSTANBUL GENİŞLETİLMİŞ BÖLGE İNDİRİLİYOR...")
     print("👉 Kapsam: Fatih - Beşiktaş - Şişli - Üsküdar - Kadıköy - Köprüler")
+    print("👉 İçerik: Yollar + POI'ler (amenity/leisure/tourism/aeroway)")
     print("⏳ Veri büyük (50MB+), işlem 2-3 dakika sürebilir. Bekle...")
     
     # Timeout: 500 saniye (8 dakika), MaxSize: 1GB
@@ -27,6 +32,10 @@ def download_expanded():
     [out:xml][timeout:500][maxsize:1073741824];
     (
       way["highway"]({BBOX});
+      nwr["amenity"]({BBOX});
+      nwr["leisure"]({BBOX});
+      nwr["tourism"]({BBOX});
+      nwr["aeroway"]({BBOX});
     );
     (._;>;);
     out meta;
@@ -76,5 +85,22 @@ def download_expanded():
 
     print("\n💀 BAŞARISIZ: Hiçbir sunucu bu kadar büyük veriyi veremedi.")
 
+def download_pbf():
+    print(f"🌍 PBF özeti indiriliyor: {PBF_URL}")
+    os.makedirs("data", exist_ok=True)
+    with requests.get(PBF_URL, stream=True, timeout=60) as response:
+        response.raise_for_status()
+        with open(PBF_FILE, "wb") as f:
+            for chunk in response.iter_content(chunk_size=1024 * 1024):
+                f.write(chunk)
+
+    size_mb = os.path.getsize(PBF_FILE) / (1024 * 1024)
+    print(f"   ✅ BAŞARILI! {PBF_FILE} ({size_mb:.0f} MB)")
+    print("   👉 İçeri al: python etl/importer_osm.py /app/data/turkey-latest.osm.pbf")
+
 if __name__ == "__main__":
-    download_expanded()
\ No newline at end of file
+    import sys
+    if "--pbf" in sys.argv:
+        download_pbf()
+    else:
+        download_expanded()
\ No newline at end of file
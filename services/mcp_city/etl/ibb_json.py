@@ -0,0 +1,69 @@
+import json
+import numpy as np
+
+from etl.pg_copy import linestring_ewkb
+
+# İBB statik segment dosyası: [{"S": segment_id, "G": "[[lat, lon], ...]"}, ...]
+# Dosya tek parça json.load ile belleğe alınmaz; üst düzey dizi elemanları tek tek çözülür.
+_WHITESPACE = " \t\r\n"
+_COORD_JUNK = str.maketrans("[]", "  ")
+
+
+def iter_json_array(f, chunk_size: int = 1 << 20):
+    """
+    Üst düzey JSON dizisinin elemanlarını akış halinde üretir (Metin modunda açılmış dosya).
+    Bellekte en fazla bir parça + yarım kalan eleman tutulur.
+    """
+    decoder = json.JSONDecoder()
+    buffer = f.read(chunk_size).lstrip(_WHITESPACE)
+    if not buffer.startswith("["):
+        raise ValueError("JSON dizisi bekleniyordu")
+    pos, eof = 1, False
+
+    while True:
+        # Ayraçları atla
+        while pos < len(buffer) and buffer[pos] in _WHITESPACE + ",":
+            pos += 1
+        if pos < len(buffer) and buffer[pos] == "]":
+            return
+        try:
+            if pos >= len(buffer):
+                raise json.JSONDecodeError("parça bitti", buffer, pos)
+            item, end = decoder.raw_decode(buffer, pos)
+            # Sayı parça sonunda bitiyorsa devamı sonraki parçada olabilir
+            if end == len(buffer) and not eof:
+                raise json.JSONDecodeError("parça bitti", buffer, end)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+        yield item
+        pos = end
+
+
+def parse_coords(geometry) -> np.ndarray:
+    """G alanı ([[lat, lon], ...] metni veya listesi) -> (n, 2) enlem/boylam dizisi. Metin json'a çevrilmeden okunur."""
+    if isinstance(geometry, str):
+        values = np.array(geometry.translate(_COORD_JUNK).split(","), dtype=np.float64)
+    else:
+        values = np.asarray(geometry, dtype=np.float64).ravel()
+    if len(values) % 2:
+        raise ValueError("Tek sayıda koordinat")
+    return values.reshape(-1, 2)
+
+
+def ibb_segment_rows(f, chunk_size: int = 1 << 20):
+    """Dosyadan (segment_id, LineString EWKB) satırları. Bozuk/tek noktalı segmentler atlanır."""
+    for item in iter_json_array(f, chunk_size):
+        try:
+            coords = parse_coords(item["G"])
+            if len(coords) < 2:
+                raise ValueError("Tek nokta")
+            # [Lat, Lon] -> (Lon, Lat)
+            yield int(item["S"]), linestring_ewkb(coords[:, 1], coords[:, 0])
+        except (KeyError, TypeError, ValueError):
+            continue
@@ -0,0 +1,145 @@
+from array import array
+import numpy as np
+from etl.pg_copy import linestring_ewkb, point_ewkb, segment_lengths_m
+
+# OSM Standart Hızları
+SPEED_LIMITS = {
+    'motorway': 110, 'trunk': 90, 'primary': 70,
+    'secondary': 50, 'tertiary': 40, 'residential': 30,
+    'service': 20, 'living_street': 10
+}
+
+# ways tablosuna COPY ile yazılan kolonlar (gid SERIAL).
+# source/target doğrudan OSM düğüm id'leridir: Köprü altından geçen yol düğüm paylaşmadığı için birleşmez.
+# seq: Kenarın yol içindeki sırası, node_ids: Geometrideki her noktanın OSM düğüm id'si
+# (Artımlı .osc güncellemesinde yol DB'den yeniden kurulabilsin diye)
+WAY_COLUMNS = [
+    "osm_id", "seq", "source", "target", "node_ids", "name", "maxspeed", "current_speed", "highway", "oneway",
+    "length_m", "cost_time", "reverse_cost_time", "the_geom",
+]
+VERTEX_COLUMNS = ["id", "cnt", "the_geom"]
+
+# Kenar üretimi için yolda tutulan etiketler (Tüm etiket sözlüğünü bellekte taşımamak için)
+EDGE_TAGS = ("highway", "name", "oneway", "junction")
+
+
+def way_attributes(tags: dict) -> tuple:
+    """(isim, hız, highway, tek_yön, ters_mi) - oneway=-1 ise düğüm sırası ters çevrilmelidir."""
+    highway = tags['highway']
+    oneway_tag = tags.get('oneway')
+    reverse = oneway_tag == '-1'
+    oneway = reverse or oneway_tag in ('yes', '1', 'true') or (
+        oneway_tag != 'no' and (tags.get('junction') == 'roundabout' or highway == 'motorway')
+    )
+    return tags.get('name', 'Bilinmiyor'), SPEED_LIMITS.get(highway, 30), highway, oneway, reverse
+
+
+def count_refs(ref_arrays) -> tuple:
+    """Düğüm kullanım sayıları: (sıralı_id, adet). Bloklar için ayrı sayılıp merge_junctions ile birleşir."""
+    if not ref_arrays:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.unique(np.concatenate(ref_arrays), return_counts=True)
+
+
+def merge_counts(counted: list) -> tuple:
+    """[(id, adet), ...] listesini tek (sıralı_id, toplam_adet) çiftine birleştirir."""
+    if not counted:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    ids = np.concatenate([c[0] for c in counted])
+    counts = np.concatenate([c[1] for c in counted])
+    unique, inverse = np.unique(ids, return_inverse=True)
+    return unique, np.bincount(inverse, weights=counts).astype(np.int64)
+
+
+def merge_junctions(counted: list) -> np.ndarray:
+    """
+    Kavşak düğümleri (sıralı): Birden fazla yolun ya da aynı yolun iki kez geçtiği düğüm.
+    """
+    ids, counts = merge_counts(counted)
+    return ids[counts > 1]
+
+
+def _cut_points(refs: np.ndarray, found: np.ndarray, junctions) -> np.ndarray:
+    """Kenarın bölüneceği düğüm indeksleri. junctions None ise her düğümde (sıkıştırmasız)."""
+    n = len(refs)
+    if junctions is None:
+        return np.arange(n)
+    cut = np.zeros(n, dtype=bool)
+    cut[0] = cut[-1] = True
+    if len(junctions):
+        idx = np.searchsorted(junctions, refs)
+        idx[idx >= len(junctions)] = 0
+        cut |= junctions[idx] == refs
+    # Dosyada olmayan düğümün (bbox kenarı) komşuları da uç olur, eksik düğüm kenara girmez
+    cut[:-1] |= ~found[1:]
+    cut[1:] |= ~found[:-1]
+    return np.flatnonzero(cut)
+
+
+def way_edge_rows(way_id: int, refs, tags: dict, nodes, junctions=None, seq_start: int = 0) -> list:
+    """
+    Bir highway yolunu kenarlara böler ve COPY satırları üretir.
+    junctions verilirse yol sadece kavşak ve uç düğümlerde kesilir; aradaki düğümler
+    kenarın geometrisinde kalır (Graf 5-10 kat küçülür, şekil kaybolmaz).
+    Uzunluk ve süre burada hesaplanır; DB'de ayrıca UPDATE gerekmez.
+    """
+    name, speed, highway, oneway, reverse = way_attributes(tags)
+    refs = np.asarray(refs, dtype=np.int64)
+    if reverse:
+        refs = refs[::-1]
+    if len(refs) < 2:
+        return []
+
+    lons, lats, found = nodes.lookup(refs)
+    lengths = segment_lengths_m(lons, lats)
+    cuts = _cut_points(refs, found, junctions)
+    mps = speed / 3.6
+
+    rows = []
+    for a, b in zip(cuts[:-1], cuts[1:]):
+        if not found[a:b + 1].all():
+            continue
+        length = float(lengths[a:b].sum())
+        cost = length / mps
+        reverse_cost = -1.0 if oneway else cost   # Tek yönde geri yön kapalı (Düğüm sırası zaten gidiş yönünde)
+        # Başlangıçta ibb_match_id NULL, current_speed = maxspeed
+        rows.append((
+            way_id, seq_start + len(rows), int(refs[a]), int(refs[b]), refs[a:b + 1].tolist(),
+            name, speed, speed, highway, oneway,
+            length, cost, reverse_cost, linestring_ewkb(lons[a:b + 1], lats[a:b + 1]),
+        ))
+    return rows
+
+
+def vertex_rows(endpoint_counts: tuple, nodes):
+    """Kenar uçlarından ways_vertices_pgr satırları üretir: (osm_düğüm_id, bağlı_kenar_sayısı, nokta)."""
+    ids, counts = endpoint_counts
+    lons, lats, found = nodes.lookup(ids)
+    for i in np.flatnonzero(found):
+        yield int(ids[i]), int(counts[i]), point_ewkb(float(lons[i]), float(lats[i]))
+
+
+class EndpointTally:
+    """Üretilen kenarların uç düğümlerini sayar. Bellek için belli aralıklarla (id, adet) özetine sıkıştırır."""
+
+    def __init__(self, flush_every: int = 1_000_000):
+        self.flush_every = flush_every
+        self._ids = array("q")
+        self._counted = []
+
+    def add(self, rows):
+        for row in rows:
+            self._ids.append(row[2])
+            self._ids.append(row[3])
+        if len(self._ids) >= self.flush_every:
+            self._compact()
+
+    def _compact(self):
+        if len(self._ids):
+            self._counted.append(count_refs([np.frombuffer(self._ids, dtype=np.int64).copy()]))
+            self._ids = array("q")
+        self._counted = [merge_counts(self._counted)]
+
+    def counts(self) -> tuple:
+        self._compact()
+        return self._counted[0]
@@ -0,0 +1,89 @@
+from array import array
+import numpy as np
+
+# Koordinatlar OSM'in kendi hassasiyetinde (1e-7 derece) tamsayı olarak saklanır:
+# Düğüm başına 8 (id) + 4 + 4 bayt. dict[int, tuple] ile ~150 bayt tutuyordu.
+COORD_SCALE = 10_000_000
+
+
+class NodeStore:
+    """
+    Düğüm koordinat deposu.
+    Yükleme sırasında sıkıştırılmış dizilere eklenir, freeze() sonrası id'ye göre sıralı
+    NumPy dizilerinde searchsorted ile toplu aranır.
+    """
+
+    def __init__(self):
+        self._ids = array("q")
+        self._lons = array("i")
+        self._lats = array("i")
+        self._chunks = []
+        self.ids = None
+        self.lons = None
+        self.lats = None
+
+    @property
+    def frozen(self) -> bool:
+        return self.ids is not None
+
+    def __len__(self):
+        return len(self.ids) if self.frozen else len(self._ids) + sum(len(c[0]) for c in self._chunks)
+
+    def add(self, node_id: int, lon: float, lat: float):
+        self._ids.append(node_id)
+        self._lons.append(round(lon * COORD_SCALE))
+        self._lats.append(round(lat * COORD_SCALE))
+
+    def extend(self, ids, lons, lats):
+        """Hazır NumPy blokları ekler (PBF). Koordinatlar zaten COORD_SCALE tamsayısıdır."""
+        self._chunks.append((
+            np.asarray(ids, dtype=np.int64), np.asarray(lons, dtype=np.int32), np.asarray(lats, dtype=np.int32)
+        ))
+
+    def freeze(self):
+        """Eklemeyi bitirir ve diziyi id'ye göre sıralar (OSM dosyaları genelde zaten sıralıdır)."""
+        parts = [(
+            np.frombuffer(self._ids, dtype=np.int64),
+            np.frombuffer(self._lons, dtype=np.int32),
+            np.frombuffer(self._lats, dtype=np.int32),
+        )] + self._chunks
+        ids = np.concatenate([p[0] for p in parts])
+        lons = np.concatenate([p[1] for p in parts])
+        lats = np.concatenate([p[2] for p in parts])
+        self._ids, self._lons, self._lats, self._chunks = array("q"), array("i"), array("i"), []
+
+        if len(ids) > 1 and not np.all(ids[1:] > ids[:-1]):
+            order = np.argsort(ids, kind="stable")
+            ids, lons, lats = ids[order], lons[order], lats[order]
+
+        self.ids, self.lons, self.lats = ids, lons, lats
+
+    def lookup(self, refs) -> tuple:
+        """
+        Düğüm id dizisini koordinatlara çevirir.
+        Dönüş: (lon, lat, found) - bulunamayan düğümlerde found False, koordinat 0.
+        """
+        refs = np.asarray(refs, dtype=np.int64)
+        if not len(self.ids):
+            empty = np.zeros(len(refs))
+            return empty, empty, np.zeros(len(refs), dtype=bool)
+
+        idx = np.searchsorted(self.ids, refs)
+        idx[idx >= len(self.ids)] = 0
+        found = self.ids[idx] == refs
+        lons = np.where(found, self.lons[idx], 0) / COORD_SCALE
+        lats = np.where(found, self.lats[idx], 0) / COORD_SCALE
+        return lons, lats, found
+
+    def bbox(self) -> tuple | None:
+        """(min_lon, min_lat, max_lon, max_lat)"""
+        if not len(self):
+            return None
+        return (self.lons.min() / COORD_SCALE, self.lats.min() / COORD_SCALE,
+                self.lons.max() / COORD_SCALE, self.lats.max() / COORD_SCALE)
+
+    def clip(self, bbox: tuple):
+        """Kutu dışındaki düğümleri atar (min_lon, min_lat, max_lon, max_lat). Dışarıya taşan kenarlar üretilmez."""
+        min_lon, min_lat, max_lon, max_lat = (round(v * COORD_SCALE) for v in bbox)
+        keep = (self.lons >= min_lon) & (self.lons <= max_lon) & (self.lats >= min_lat) & (self.lats <= max_lat)
+        self.ids, self.lons, self.lats = self.ids[keep], self.lons[keep], self.lats[keep]
@@ -0,0 +1,135 @@
+import asyncio
+import asyncpg
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from etl.osm_graph import WAY_COLUMNS, EndpointTally, count_refs, merge_counts, merge_junctions, way_edge_rows
+from etl.osm_nodes import COORD_SCALE, NodeStore
+from etl.osm_pbf import read_block, scan_blocks
+from etl.osm_poi import POI_COLUMNS, poi_row
+from etl.pg_copy import CopyBuffer, register_geometry_codec
+
+# Yol aşamasında fork edilen süreçler düğüm deposunu ve kavşak kümesini buradan (copy-on-write) okur.
+# Diziler bir kez üretilir; her sürece pickle ile kopyalanmaz.
+_NODES = None
+_JUNCTIONS = None
+
+
+def _scan_block(path: str, offset: int, size: int, rules: list, clip: tuple = None) -> tuple:
+    """
+    1. aşama (süreç havuzunda): Bloğu aç; düğüm dizilerini, düğüm POI satırlarını ve
+    highway yollarının düğüm kullanım sayılarını (kavşak tespiti için) döndür.
+    """
+    block = read_block(path, offset, size)
+    ids, lons, lats, tagged = block.nodes()
+    if clip:
+        # Bölge kurulumu: Kutu dışındaki düğümler ana sürece hiç taşınmaz (Türkiye PBF'inde bellek sabit kalır)
+        lo = [round(v * COORD_SCALE) for v in clip]
+        keep = (lons >= lo[0]) & (lons <= lo[2]) & (lats >= lo[1]) & (lats <= lo[3])
+        ids, lons, lats = ids[keep], lons[keep], lats[keep]
+    pois = []
+    for node_id, lon, lat, tags in tagged:
+        if clip and not (lo[0] <= lon <= lo[2] and lo[1] <= lat <= lo[3]):
+            continue
+        row = poi_row(node_id, 'n', tags, rules, lon / COORD_SCALE, lat / COORD_SCALE)
+        if row:
+            pois.append(row)
+
+    ways = list(block.ways())
+    usage = count_refs([refs for _, refs, tags in ways if 'highway' in tags])
+    return ids, lons, lats, pois, bool(ways), usage
+
+
+async def _copy_ways(path: str, blocks: list, dsn: str, rules: list, schema: str, batch: int) -> tuple:
+    conn = await asyncpg.connect(dsn)
+    try:
+        await register_geometry_codec(conn)
+        ways_out = CopyBuffer(conn, "ways", WAY_COLUMNS, batch, schema)
+        pois_out = CopyBuffer(conn, "pois", POI_COLUMNS, batch, schema)
+        endpoints = EndpointTally()
+
+        for offset, size in blocks:
+            for way_id, refs, tags in read_block(path, offset, size).ways():
+                if not tags:
+                    continue
+                if tags.get('name'):
+                    lons, lats, found = _NODES.lookup(refs)
+                    if found.any():
+                        row = poi_row(way_id, 'w', tags, rules, float(lons[found].mean()), float(lats[found].mean()))
+                        if row:
+                            await pois_out.add(row)
+                if 'highway' in tags:
+                    rows = way_edge_rows(way_id, refs, tags, _NODES, _JUNCTIONS)
+                    endpoints.add(rows)
+                    await ways_out.extend(rows)
+
+        await ways_out.flush()
+        await pois_out.flush()
+        return ways_out.total, pois_out.total, endpoints.counts()
+    finally:
+        await conn.close()
+
+
+def _copy_way_shard(path: str, blocks: list, dsn: str, rules: list, schema: str, batch: int) -> tuple:
+    """
+    2. aşama (süreç havuzunda): Parçadaki yol bloklarını çöz ve kendi COPY bağlantısıyla yaz.
+    Kenar uçlarının sayımı ana sürece döner (ways_vertices_pgr orada tek seferde yüklenir).
+    """
+    return asyncio.run(_copy_ways(path, blocks, dsn, rules, schema, batch))
+
+
+async def load_pbf(conn, path: str, dsn: str, rules: list, workers: int = None,
+                   schema: str = "public", batch: int = 50_000, compact: bool = True, clip: tuple = None) -> tuple:
+    """
+    .osm.pbf dosyasını süreç havuzuyla yükler.
+    1) Bloklar paralel çözülür, düğümler sıralı NodeStore'da, kullanım sayıları kavşak kümesinde birleşir.
+    2) Yol blokları parçalara bölünür; her süreç düğümleri çözümler ve satırları ayrı bir
+       COPY bağlantısından akıtır.
+    clip verilirse kutu dışındaki düğümler atılır (Kenar ve POI üretilmez).
+    Dönüş: (nodes, bbox, kenar_sayısı, poi_sayısı, uç_sayımları)
+    """
+    global _NODES, _JUNCTIONS
+    workers = workers or os.cpu_count() or 4
+    loop = asyncio.get_running_loop()
+    # fork: 2. aşamada _NODES/_JUNCTIONS çocuk süreçlere kopyalanmadan miras kalır
+    ctx = multiprocessing.get_context("fork")
+
+    bbox, blocks = scan_blocks(path)
+    print(f"📦 {len(blocks)} PBF bloğu, {workers} süreçle çözülüyor...")
+
+    started = time.time()
+    nodes = NodeStore()
+    way_blocks, usage_counts = [], []
+    pois_out = CopyBuffer(conn, "pois", POI_COLUMNS, batch, schema)
+    with ProcessPoolExecutor(workers, mp_context=ctx) as pool:
+        futures = [loop.run_in_executor(pool, _scan_block, path, offset, size, rules, clip) for offset, size in blocks]
+        for block_info, future in zip(blocks, futures):
+            ids, lons, lats, pois, has_ways, usage = await future
+            if len(ids):
+                nodes.extend(ids, lons, lats)
+            await pois_out.extend(pois)
+            if has_ways:
+                way_blocks.append(block_info)
+            if len(usage[0]):
+                usage_counts.append(usage)
+    await pois_out.flush()
+
+    nodes.freeze()
+    print(f"📌 {len(nodes)} düğüm indekslendi ({time.time() - started:.1f} sn), yollar yükleniyor...")
+
+    _NODES = nodes
+    _JUNCTIONS = merge_junctions(usage_counts) if compact else None
+    usage_counts = None
+    shards = [way_blocks[i::workers] for i in range(workers) if way_blocks[i::workers]]
+    with ProcessPoolExecutor(len(shards) or 1, mp_context=ctx) as pool:
+        results = await asyncio.gather(*(
+            loop.run_in_executor(pool, _copy_way_shard, path, shard, dsn, rules, schema, batch)
+            for shard in shards
+        ))
+    _NODES = _JUNCTIONS = None
+
+    ways_total = sum(r[0] for r in results)
+    pois_total = pois_out.total + sum(r[1] for r in results)
+    return nodes, bbox, ways_total, pois_total, merge_counts([r[2] for r in results])
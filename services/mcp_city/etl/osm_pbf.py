@@ -0,0 +1,245 @@
+import lzma
+import struct
+import zlib
+import numpy as np
+
+# .osm.pbf okuyucu: Dosya bağımsız sıkıştırılmış bloklardan (Blob) oluşur.
+# Her blok ayrı süreçte çözülebilir; yoğun düğüm (DenseNodes) dizileri NumPy ile vektörel açılır.
+# Format: https://wiki.openstreetmap.org/wiki/PBF_Format
+
+
+def _varint(buf, pos: int) -> tuple:
+    result = shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if b < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _zigzag(n: int) -> int:
+    return (n >> 1) ^ -(n & 1)
+
+
+def iter_fields(buf):
+    """Protobuf mesajındaki (alan_no, değer) çiftleri. Uzunluklu alanlar memoryview döner."""
+    buf = memoryview(buf)
+    pos, end = 0, len(buf)
+    while pos < end:
+        key, pos = _varint(buf, pos)
+        field, wire = key >> 3, key & 7
+        if wire == 0:
+            value, pos = _varint(buf, pos)
+        elif wire == 2:
+            size, pos = _varint(buf, pos)
+            value = buf[pos:pos + size]
+            pos += size
+        elif wire == 1:
+            value = buf[pos:pos + 8]
+            pos += 8
+        elif wire == 5:
+            value = buf[pos:pos + 4]
+            pos += 4
+        else:
+            raise ValueError(f"Desteklenmeyen protobuf wire tipi: {wire}")
+        yield field, value
+
+
+def packed_varints(buf) -> np.ndarray:
+    """Paketli varint dizisini tek seferde (döngüsüz) uint64 diziye açar."""
+    b = np.frombuffer(buf, dtype=np.uint8)
+    if not len(b):
+        return np.zeros(0, dtype=np.uint64)
+    ends = np.flatnonzero(b < 0x80)
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    shift = (np.arange(len(b)) - np.repeat(starts, ends - starts + 1)) * 7
+    parts = (b & 0x7F).astype(np.uint64) << shift.astype(np.uint64)
+    return np.add.reduceat(parts, starts)
+
+
+def packed_sint(buf, delta: bool = False) -> np.ndarray:
+    """Paketli sint64 (zigzag) dizisi. delta=True ise farklar toplanır (id/lat/lon/refs)."""
+    v = packed_varints(buf)
+    values = (v >> np.uint64(1)).astype(np.int64) ^ -(v & np.uint64(1)).astype(np.int64)
+    return np.cumsum(values) if delta else values
+
+
+def decode_blob(data) -> bytes:
+    for field, value in iter_fields(data):
+        if field == 1:
+            return bytes(value)
+        if field == 3:
+            return zlib.decompress(value)
+        if field == 4:
+            return lzma.decompress(value)
+    raise ValueError("Desteklenmeyen PBF blok sıkıştırması")
+
+
+def _read_blob_header(f) -> tuple | None:
+    raw = f.read(4)
+    if len(raw) < 4:
+        return None
+    (size,) = struct.unpack(">I", raw)
+    blob_type, datasize = None, 0
+    for field, value in iter_fields(f.read(size)):
+        if field == 1:
+            blob_type = bytes(value).decode()
+        elif field == 3:
+            datasize = value
+    return blob_type, datasize
+
+
+def scan_blocks(path: str) -> tuple:
+    """
+    Dosyayı veri bloklarını açmadan tarar.
+    Dönüş: (bbox | None, [(offset, boyut), ...]) - bbox (min_lon, min_lat, max_lon, max_lat)
+    """
+    bbox, blocks = None, []
+    with open(path, "rb") as f:
+        while True:
+            header = _read_blob_header(f)
+            if header is None:
+                break
+            blob_type, datasize = header
+            offset = f.tell()
+            if blob_type == "OSMHeader":
+                bbox = _header_bbox(decode_blob(f.read(datasize)))
+            else:
+                if blob_type == "OSMData":
+                    blocks.append((offset, datasize))
+                f.seek(offset + datasize)
+    return bbox, blocks
+
+
+def _header_bbox(data: bytes) -> tuple | None:
+    for field, value in iter_fields(data):
+        if field == 1:
+            edges = {f: _zigzag(v) / 1e9 for f, v in iter_fields(value)}
+            # HeaderBBox: left=1, right=2, top=3, bottom=4 (nanoderece)
+            return edges.get(1), edges.get(4), edges.get(2), edges.get(3)
+    return None
+
+
+def read_block(path: str, offset: int, size: int) -> "PrimitiveBlock":
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return PrimitiveBlock(decode_blob(f.read(size)))
+
+
+class PrimitiveBlock:
+    """Tek bir OSMData bloğu: string tablosu + gruplar (düğüm / yol)."""
+
+    def __init__(self, data: bytes):
+        self.strings = []
+        self.groups = []
+        self.granularity = 100
+        self.lat_offset = 0
+        self.lon_offset = 0
+        for field, value in iter_fields(data):
+            if field == 1:
+                self.strings = [bytes(s).decode("utf-8") for f, s in iter_fields(value) if f == 1]
+            elif field == 2:
+                self.groups.append(value)
+            elif field == 17:
+                self.granularity = value
+            elif field == 19:
+                self.lat_offset = value
+            elif field == 20:
+                self.lon_offset = value
+
+    def _coord(self, offset: int, values):
+        # Nanoderece -> COORD_SCALE (1e-7 derece) tamsayı
+        return (offset + self.granularity * values) // 100
+
+    def _tags(self, keys, vals) -> dict:
+        return {self.strings[k]: self.strings[v] for k, v in zip(keys, vals)}
+
+    def nodes(self) -> tuple:
+        """
+        Bloktaki düğümler: (ids, lons, lats, etiketli)
+        lons/lats COORD_SCALE tamsayıdır; etiketli = [(id, lon, lat, tags), ...] (Sadece etiketi olanlar)
+        """
+        ids, lons, lats, tagged = [], [], [], []
+        for group in self.groups:
+            for field, value in iter_fields(group):
+                if field == 2:
+                    self._dense(value, ids, lons, lats, tagged)
+                elif field == 1:
+                    self._node(value, ids, lons, lats, tagged)
+
+        if not ids:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty.astype(np.int32), empty.astype(np.int32), tagged
+        return (np.concatenate(ids), np.concatenate(lons).astype(np.int32),
+                np.concatenate(lats).astype(np.int32), tagged)
+
+    def _dense(self, buf, ids, lons, lats, tagged):
+        d_ids = d_lat = d_lon = None
+        keys_vals = np.zeros(0, dtype=np.uint64)
+        for field, value in iter_fields(buf):
+            if field == 1:
+                d_ids = packed_sint(value, delta=True)
+            elif field == 8:
+                d_lat = self._coord(self.lat_offset, packed_sint(value, delta=True))
+            elif field == 9:
+                d_lon = self._coord(self.lon_offset, packed_sint(value, delta=True))
+            elif field == 10:
+                keys_vals = packed_varints(value)
+        if d_ids is None:
+            return
+        ids.append(d_ids)
+        lons.append(d_lon)
+        lats.append(d_lat)
+
+        # keys_vals: düğüm başına k,v,k,v,...,0 (0 numaralı string her zaman boştur -> ayraç)
+        if len(keys_vals):
+            stops = np.flatnonzero(keys_vals == 0)
+            starts = np.concatenate(([0], stops[:-1] + 1))
+            for i in np.flatnonzero(stops > starts):
+                kv = keys_vals[starts[i]:stops[i]].astype(np.int64)
+                tagged.append((int(d_ids[i]), int(d_lon[i]), int(d_lat[i]), self._tags(kv[0::2], kv[1::2])))
+
+    def _node(self, buf, ids, lons, lats, tagged):
+        node_id = lat = lon = 0
+        keys, vals = [], []
+        for field, value in iter_fields(buf):
+            if field == 1:
+                node_id = _zigzag(value)
+            elif field == 2:
+                keys = packed_varints(value).astype(np.int64)
+            elif field == 3:
+                vals = packed_varints(value).astype(np.int64)
+            elif field == 8:
+                lat = self._coord(self.lat_offset, _zigzag(value))
+            elif field == 9:
+                lon = self._coord(self.lon_offset, _zigzag(value))
+        ids.append(np.array([node_id], dtype=np.int64))
+        lons.append(np.array([lon], dtype=np.int64))
+        lats.append(np.array([lat], dtype=np.int64))
+        if len(keys):
+            tagged.append((node_id, lon, lat, self._tags(keys, vals)))
+
+    def ways(self):
+        """Bloktaki yollar: (id, refs: np.int64 dizi, tags)"""
+        for group in self.groups:
+            for field, value in iter_fields(group):
+                if field != 3:
+                    continue
+                way_id, keys, vals, refs = 0, (), (), None
+                for f, v in iter_fields(value):
+                    if f == 1:
+                        way_id = v
+                    elif f == 2:
+                        keys = packed_varints(v).astype(np.int64)
+                    elif f == 3:
+                        vals = packed_varints(v).astype(np.int64)
+                    elif f == 8:
+                        refs = packed_sint(v, delta=True)
+                yield way_id, (refs if refs is not None else np.zeros(0, dtype=np.int64)), self._tags(keys, vals)
+
+    def has_ways(self) -> bool:
+        return any(field == 3 for group in self.groups for field, _ in iter_fields(group))
@@ -0,0 +1,44 @@
+import re
+from etl.pg_copy import point_ewkb
+
+# POI olarak içeri alınacak OSM anahtarları (tools/osm.py Overpass sorgusunun katmanları + OSM_TAG_MAP'teki place)
+# Sıra önceliktir: amenity=cafe + building=retail olan yer 'cafe' olarak girer.
+POI_KEYS = ("amenity", "shop", "leisure", "tourism", "aeroway", "place", "landuse", "building")
+GENERIC_VALUES = ("yes",)   # building=yes gibi: Kategori taşımaz
+
+POI_COLUMNS = ["osm_id", "osm_type", "name", "category", "tag_key", "tag_value", "the_geom"]
+
+
+def build_category_rules(tag_map: dict) -> list:
+    """
+    settings.OSM_TAG_MAP'i [(kategori, [(key, value), ...]), ...] kurallarına çevirir.
+    Örn: '"amenity"="place_of_worship"["religion"="muslim"]' -> iki koşul birden sağlanmalı.
+    """
+    rules = []
+    for category, filters in tag_map.items():
+        for f in filters:
+            pairs = re.findall(r'"([^"]+)"="([^"]+)"', f)
+            if pairs:
+                rules.append((category, pairs))
+    return rules
+
+
+def normalize_poi(tags: dict, rules: list) -> tuple | None:
+    """POI etiketlerinden (kategori, key, value) üretir. POI değilse None."""
+    key = next((k for k in POI_KEYS if tags.get(k) and tags[k] not in GENERIC_VALUES), None)
+    if not key:
+        return None
+
+    for category, pairs in rules:
+        if all(tags.get(k) == v for k, v in pairs):
+            return category, key, tags[key]
+
+    # Sözlükte yoksa ham OSM değeri kategori olur (Örn: 'cafe', 'pharmacy')
+    return tags[key], key, tags[key]
+
+
+def poi_row(osm_id: int, osm_type: str, tags: dict, rules: list, lon: float, lat: float) -> tuple | None:
+    poi = normalize_poi(tags, rules) if tags.get('name') else None
+    if not poi:
+        return None
+    return (osm_id, osm_type, tags['name'], *poi, point_ewkb(lon, lat))
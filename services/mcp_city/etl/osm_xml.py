@@ -0,0 +1,76 @@
+import gzip
+import xml.etree.ElementTree as ET
+
+
+def _tags(elem) -> dict:
+    return {t.get("k"): t.get("v") for t in elem.iter("tag")}
+
+
+def iter_osm_xml(path: str):
+    """
+    .osm (XML) dosyasını akış halinde okur, ağacı bellekte biriktirmez.
+    Üretilen kayıtlar:
+      ("bounds", (min_lon, min_lat, max_lon, max_lat))
+      ("node", id, lon, lat, tags)
+      ("way", id, [ref, ...], tags)
+    """
+    context = ET.iterparse(path, events=("start", "end"))
+    _, root = next(context)
+
+    for event, elem in context:
+        if event != "end":
+            continue
+
+        tag = elem.tag
+        if tag == "node":
+            yield "node", int(elem.get("id")), float(elem.get("lon")), float(elem.get("lat")), _tags(elem)
+        elif tag == "way":
+            refs = [int(nd.get("ref")) for nd in elem.iter("nd")]
+            yield "way", int(elem.get("id")), refs, _tags(elem)
+        elif tag == "bounds":
+            yield "bounds", (float(elem.get("minlon")), float(elem.get("minlat")),
+                             float(elem.get("maxlon")), float(elem.get("maxlat")))
+        elif tag != "relation":
+            # <tag>/<nd>/<member> çocukları: Ebeveyn kapanınca okunacak, şimdi silme
+            continue
+
+        # İşlenen elemanı ve kökteki referansını bırak (Bellek sabit kalır)
+        elem.clear()
+        root.clear()
+
+
+def iter_osc(path: str):
+    """
+    OSM değişiklik dosyası (.osc / .osc.gz) okuyucu.
+    Üretilen kayıtlar (action: create / modify / delete):
+      (action, "node", id, lon | None, lat | None, tags)
+      (action, "way", id, [ref, ...], tags)
+    Silinen düğümlerde koordinat olmayabilir.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        context = ET.iterparse(f, events=("start", "end"))
+        _, root = next(context)
+        action = None
+
+        for event, elem in context:
+            tag = elem.tag
+            if event == "start":
+                if tag in ("create", "modify", "delete"):
+                    action = tag
+                continue
+
+            if tag == "node":
+                lon, lat = elem.get("lon"), elem.get("lat")
+                yield (action, "node", int(elem.get("id")),
+                       float(lon) if lon else None, float(lat) if lat else None, _tags(elem))
+            elif tag == "way":
+                refs = [int(nd.get("ref")) for nd in elem.iter("nd")]
+                yield action, "way", int(elem.get("id")), refs, _tags(elem)
+            elif tag in ("create", "modify", "delete"):
+                root.clear()
+                continue
+            elif tag != "relation":
+                continue
+
+            elem.clear()
@@ -0,0 +1,79 @@
+import struct
+import numpy as np
+
+# Geometriler WKT metni yerine doğrudan EWKB olarak üretilir.
+# PostGIS'in binary girişi (geometry_recv) EWKB kabul ettiği için binary COPY ile sunucuda parse maliyeti olmaz.
+SRID = 4326
+_EWKB_SRID_FLAG = 0x20000000
+_POINT = 1
+_LINESTRING = 2
+
+
+def point_ewkb(lon: float, lat: float) -> bytes:
+    return struct.pack("<BIIdd", 1, _POINT | _EWKB_SRID_FLAG, SRID, lon, lat)
+
+
+def linestring_ewkb(lons, lats) -> bytes:
+    """Boylam/enlem dizilerinden (numpy veya liste) SRID'li LineString EWKB üretir."""
+    coords = np.empty((len(lons), 2), dtype="<f8")
+    coords[:, 0] = lons
+    coords[:, 1] = lats
+    return struct.pack("<BIII", 1, _LINESTRING | _EWKB_SRID_FLAG, SRID, len(coords)) + coords.tobytes()
+
+
+def linestring_coords(ewkb: bytes) -> np.ndarray:
+    """(E)WKB LineString -> (n, 2) boylam/enlem dizisi. DB'den okunan kenarı yeniden kurmak için."""
+    (geom_type,) = struct.unpack_from("<I", ewkb, 1)
+    offset = 9 if geom_type & _EWKB_SRID_FLAG else 5
+    (count,) = struct.unpack_from("<I", ewkb, offset)
+    return np.frombuffer(ewkb, dtype="<f8", count=count * 2, offset=offset + 4).reshape(count, 2)
+
+
+def segment_lengths_m(lons, lats) -> np.ndarray:
+    """Ardışık noktalar arası haversine mesafesi (metre). n nokta -> n-1 uzunluk."""
+    lon_r, lat_r = np.radians(lons), np.radians(lats)
+    dlon, dlat = np.diff(lon_r), np.diff(lat_r)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat_r[:-1]) * np.cos(lat_r[1:]) * np.sin(dlon / 2) ** 2
+    return 2 * 6371008.8 * np.arcsin(np.sqrt(a))
+
+
+async def register_geometry_codec(conn):
+    """asyncpg'ye geometry tipini ham bytes (EWKB) olarak gönder/al demeyi öğretir."""
+    await conn.set_type_codec(
+        "geometry", schema="public", encoder=bytes, decoder=bytes, format="binary"
+    )
+
+
+class CopyBuffer:
+    """
+    Satırları biriktirip belirli aralıklarla binary COPY ile yazar.
+    Tüm veri bellekte tutulmaz; en fazla batch_size satır bekler.
+    """
+
+    def __init__(self, conn, table: str, columns: list, batch_size: int = 50_000, schema: str = "public"):
+        self.conn = conn
+        self.table = table
+        self.columns = columns
+        self.batch_size = batch_size
+        self.schema = schema
+        self.rows = []
+        self.total = 0
+
+    async def add(self, row: tuple):
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_size:
+            await self.flush()
+
+    async def extend(self, rows):
+        self.rows.extend(rows)
+        if len(self.rows) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        if not self.rows:
+            return
+        await self.conn.copy_records_to_table(
+            self.table, records=self.rows, columns=self.columns, schema_name=self.schema
+        )
+        self.total += len(self.rows)
+        self.rows = []
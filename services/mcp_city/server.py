@@ -8,9 +8,11 @@ from tools.models import StandardPlace, RouteResponse, WeatherResponse
 from tools.osm import search_infrastructure_osm_handler
 from tools.google import search_places_google_handler
 from tools.here import get_route_data_handler # <-- HİBRİT ROUTING BURADA
+from tools.reroute import reroute_handler
+from tools.trace_matching import match_trace_handler
 from tools.weather import get_weather_handler, analyze_route_weather_handler
 from tools.db import save_location_handler
-from tools.toll import get_toll_prices_handler 
+from tools.toll import get_toll_prices_handler, estimate_route_tolls_handler
 
 # --- MCP SUNUCU KURULUMU ---
 mcp = FastMCP(name="City Agent")
@@ -154,6 +156,7 @@ async def get_route_data(origin: str, destination: str) -> str:
             polyline=final_polyline, 
             summary=f"{raw_data.get('mesafe_km')} km, {raw_data.get('sure_dk')} dakika ({raw_data.get('source', 'Bilinmiyor')})",
             checkpoints=raw_data.get("analiz_noktalari", {}),
+            route_id=raw_data.get("route_id"),
             extras={
                 "geometry": raw_data.get("geometry"),
                 "source_system": raw_data.get("source")
@@ -167,6 +170,70 @@ async def get_route_data(origin: str, destination: str) -> str:
         logger.error(f"🔥 [Tool: Rota] Kritik Hata: {e}")
         return json.dumps({"status": "error", "message": str(e)})
 
+# --- 3b. ROTADAN SAPMA (YENİDEN ROTALAMA) ---
+@mcp.tool()
+async def reroute(route_id: str, current_lat: float, current_lon: float) -> str:
+    """
+    Sürücü rotadan çıktığında rotayı mevcut konumdan günceller.
+
+    Önce en yakın noktadan eski rotaya geri bağlanmayı dener (Sadece sapma hesaplanır), olmazsa
+    mevcut konumdan varışa yeni rota hesaplar. Sapmada get_route_data'yı tekrar çağırma.
+
+    Args:
+        route_id (str): get_route_data çıktısındaki route_id.
+        current_lat (float): Sürücünün anlık enlemi.
+        current_lon (float): Sürücünün anlık boylamı.
+    """
+    try:
+        logger.info(f"🛠️ [Tool: Reroute] {route_id} -> {current_lat},{current_lon}")
+        raw_data = await reroute_handler(route_id, current_lat, current_lon)
+
+        if "error" in raw_data:
+            return json.dumps({"status": "error", "message": raw_data["error"]}, ensure_ascii=False)
+
+        response = RouteResponse(
+            distance_km=raw_data.get("mesafe_km", 0),
+            duration_min=raw_data.get("sure_dk", 0),
+            polyline=raw_data.get("polyline_encoded") or "LOCAL_ROUTE",
+            summary=f"{raw_data.get('mesafe_km')} km, {raw_data.get('sure_dk')} dakika kaldı "
+                    f"({'rotaya geri bağlandı' if raw_data.get('yeniden_baglandi') else 'yeni rota'})",
+            checkpoints=raw_data.get("analiz_noktalari", {}),
+            route_id=raw_data.get("route_id"),
+            rejoined=raw_data.get("yeniden_baglandi")
+        )
+        logger.success(f"✅ [Tool: Reroute] {response.summary}")
+        return response.model_dump_json()
+    except Exception as e:
+        logger.error(f"🔥 [Tool: Reroute] Kritik Hata: {e}")
+        return json.dumps({"status": "error", "message": str(e)})
+
+# --- 3c. GPS İZİ EŞLEME ---
+@mcp.tool()
+async def match_trace(points: list[dict]) -> str:
+    """
+    Gürültülü bir GPS izini yol ağına oturtur: Geçilen yol kenarları (sırasıyla, yönüyle), eşlenmiş
+    geometri ve izin zamanlarından çıkan kenar başı süre/hız.
+
+    Filo araç izleri, 'bu araç hangi yoldan gitti?', 'hangi yolda ne hızla gitti?' soruları için kullan.
+    Sadece hizmet bölgesi (İstanbul vb.) içindeki izler eşlenir.
+
+    Args:
+        points (list[dict]): Sıralı iz noktaları: [{"lat": 41.0, "lon": 29.0, "time": 1718000000}, ...].
+            time: Unix saniye ya da ISO 8601 (Opsiyonel; yoksa süre/hız hesaplanmaz).
+    """
+    try:
+        logger.info(f"🛠️ [Tool: Map Matching] {len(points)} noktalık iz")
+        result = await match_trace_handler(points)
+
+        if "error" in result:
+            return json.dumps({"status": "error", "message": result["error"]}, ensure_ascii=False)
+
+        logger.success(f"✅ [Tool: Map Matching] {len(result['edges'])} kenar, {result['distance_km']} km")
+        return json.dumps(result, ensure_ascii=False)
+    except Exception as e:
+        logger.error(f"🔥 [Tool: Map Matching] Kritik Hata: {e}")
+        return json.dumps({"status": "error", "message": str(e)})
+
 # --- 4. HAVA DURUMU ---
 @mcp.tool()
 async def get_weather(lat: float, lon: float) -> str:
@@ -202,20 +269,22 @@ async def get_weather(lat: float, lon: float) -> str:
 
 # --- 5. ROTA HAVA DURUMU ANALİZİ ---
 @mcp.tool()
-async def analyze_route_weather(polyline: str) -> str:
+async def analyze_route_weather(polyline: str, duration_min: float = None) -> str:
     """
     WEATHER SHIELD: Uzun yolculuklarda rota üzerindeki hava durumu risklerini analiz eder.
     
+    Her nokta, sürücünün oraya VARACAĞI saatin tahminiyle değerlendirilir (Şu anki hava değil).
     Kullanıcı 'yolculukta yağmur var mı?', 'yolda hava nasıl?' diye sorarsa bunu kullan.
     
     Args:
         polyline (str): Rota verisi (Encoded Polyline string).
+        duration_min (float, optional): Rotanın toplam süresi (dk). get_route_data çıktısındaki duration_min.
     """
     try:
         logger.info("🛠️ [Tool: Rota Hava] Analiz başlatılıyor...")
         # Not: Yerel rotalarda polyline yerine GeoJSON kullanılması gerekebilir.
         # Handler içinde bu dönüşüm yapılacak.
-        result = await analyze_route_weather_handler(polyline)
+        result = await analyze_route_weather_handler(polyline, duration_min)
         
         logger.success("✅ [Tool: Rota Hava] Analiz tamamlandı.")
         return json.dumps(result, ensure_ascii=False)
@@ -261,6 +330,31 @@ async def get_toll_prices(filter_region: str = None) -> str:
         logger.error(f"🔥 [Tool: Otoyol] Hata: {e}")
         return json.dumps({"status": "error", "message": str(e)})
 
+# --- 8. ROTA ÜCRET HESABI ---
+@mcp.tool()
+async def estimate_route_tolls(polyline: str = None) -> str:
+    """
+    Rota üzerindeki köprü, tünel ve otoyol geçişlerini bulup TOPLAM geçiş ücretini hesaplar.
+    
+    Kullanıcı 'Ankara'ya giderken ne kadar otoyol parası öderim?' derse bunu kullan.
+    Tüm fiyat listesini okuyup tahmin yürütme.
+    
+    Args:
+        polyline (str, optional): Rota verisi (Encoded Polyline). Boş bırakılırsa son hesaplanan rota kullanılır.
+    """
+    try:
+        logger.info("🛠️ [Tool: Otoyol] Rota ücreti hesaplanıyor...")
+        result = await estimate_route_tolls_handler(polyline)
+
+        if "error" in result:
+            return json.dumps({"status": "error", "message": result["error"]}, ensure_ascii=False)
+
+        logger.success(f"✅ [Tool: Otoyol] Toplam: {result['toplam_ucret_tl']} TL")
+        return json.dumps(result, ensure_ascii=False)
+    except Exception as e:
+        logger.error(f"🔥 [Tool: Otoyol] Hata: {e}")
+        return json.dumps({"status": "error", "message": str(e)})
+
 if __name__ == "__main__":
     logger.info("🚀 City Agent (MCP) Başlatılıyor... [Port: 8000]")
     # Docker içinde host 0.0.0.0 olmalı ki dışarıdan erişilebilsin
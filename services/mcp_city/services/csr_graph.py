@@ -0,0 +1,478 @@
+import heapq
+import json
+import math
+import mmap
+import os
+import struct
+import time
+import numpy as np
+from multiprocessing import shared_memory
+from services.kdtree import build_kdtree, nearest
+
+# Bellek içi rotalama grafı (CSR: Compressed Sparse Row).
+# Her düğümün çıkış yayları heads[offsets[u]:offsets[u + 1]] aralığındadır. Her kenar iki yay üretir
+# (pgRouting'deki directed := true ile aynı: cost ileri, reverse_cost geri yön). Negatif maliyetli yön kapalıdır.
+# Diziler tek bir paylaşımlı bellek bloğunda durur; rota süreçleri kopyalamadan (zero-copy) bağlanır.
+ARRAY_NAMES = (
+    "offsets",       # int64 [V+1]
+    "heads",         # int32 [A]  yayın vardığı düğüm sırası
+    "weights",       # float32 [A] saniye (Canlı trafikle yerinde güncellenir)
+    "arc_edge",      # int32 [A]  yayın ait olduğu kenar sırası
+    "vertex_ids",    # int64 [V]  OSM düğüm id'leri (sıralı)
+    "lons",          # float64 [V]
+    "lats",          # float64 [V]
+    "edge_gids",     # int64 [E]  ways.gid (sıralı)
+    "edge_lengths",  # float32 [E] metre
+    "fwd_arc",       # int32 [E]  kenarın ileri yönlü yayı (-1: kapalı)
+    "rev_arc",       # int32 [E]  kenarın geri yönlü yayı (-1: kapalı)
+    "generation",    # int64 [1]  ağırlık sürümü (Tek: yazım sürüyor)
+)
+# Ek diziler: Snap, bileşen kontrolü ve rota geometrisi DB'ye gitmeden yapılır
+EXTRA_ARRAYS = (
+    "components",    # int32 [V]  bağlı bileşen (0: ana ağ)
+    "kd_order",      # int32 [V]  düğüm KD-ağacı (services/kdtree.py)
+    "geom_offsets",  # int64 [E+1] kenar geometrisinin geom_coords aralığı
+    "geom_coords",   # float64 [N, 2] kenar geometrisi (lon, lat), ways.the_geom yönünde
+)
+# Canlı trafikle değişen diziler: Graf dosyadan mmap'lense de bunlar paylaşımlı bellekte durur
+MUTABLE_ARRAYS = ("weights", "generation")
+
+# Anlık görüntü dosyası: [magic][format:uint32][başlık uzunluğu:uint32][JSON başlık][64 bayt hizalı diziler]
+SNAPSHOT_MAGIC = b"GEOGRAPH"
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_ALIGN = 64
+
+EARTH_RADIUS_M = 6371008.8
+# A* sezgiseli için hız tavanı: Canlı hız statik sınırı aşsa da sezgisel iyimser kalsın
+MIN_HEURISTIC_SPEED_MPS = 130 / 3.6
+
+
+class CSRGraph:
+    """CSR dizileri + paylaşımlı belleğe yayınlama/bağlanma + A* arama."""
+
+    def __init__(self, arrays: dict, max_speed: float, lat0: float = 0.0, meta: dict = None):
+        for name in ARRAY_NAMES:
+            setattr(self, name, arrays[name])
+        for name in EXTRA_ARRAYS:
+            setattr(self, name, arrays.get(name))
+        self.max_speed = max_speed
+        self.lat0 = lat0                 # KD-ağacı izdüşüm enlemi
+        self.meta = meta or {}           # Anlık görüntü bilgisi (Sürüm, kenar sayısı vb.)
+        self.snapshot_path = None        # mmap'lenen dosya (Yoksa graf tamamen bellekte)
+        self._shm = None
+        self._mmap = None
+        self._main_mask = None
+
+    @property
+    def vertex_count(self) -> int:
+        return len(self.vertex_ids)
+
+    @classmethod
+    def from_edges(cls, gids, sources, targets, costs, reverse_costs, lengths,
+                   vertex_ids, lons, lats, components=None, geometries=None) -> "CSRGraph":
+        """
+        ways / ways_vertices_pgr kolonlarından CSR kurar. Ucu düğüm tablosunda olmayan kenar atlanır.
+        components: Düğüm başına bileşen. geometries: (koordinatlar [N, 2], kenar başı nokta sayısı) (Giriş sırasında)
+        """
+        vertex_ids = np.asarray(vertex_ids, dtype=np.int64)
+        order = np.argsort(vertex_ids, kind="stable")
+        vertex_ids = vertex_ids[order]
+        lons = np.asarray(lons, dtype=np.float64)[order]
+        lats = np.asarray(lats, dtype=np.float64)[order]
+        if components is None:
+            components = np.zeros(len(vertex_ids), dtype=np.int32)
+        components = np.asarray(components, dtype=np.int32)[order]
+
+        gids = np.asarray(gids, dtype=np.int64)
+        edge_order = np.argsort(gids, kind="stable")
+        gids = gids[edge_order]
+        sources = np.asarray(sources, dtype=np.int64)[edge_order]
+        targets = np.asarray(targets, dtype=np.int64)[edge_order]
+        costs = np.asarray(costs, dtype=np.float32)[edge_order]
+        reverse_costs = np.asarray(reverse_costs, dtype=np.float32)[edge_order]
+        lengths = np.nan_to_num(np.asarray(lengths, dtype=np.float32)[edge_order])
+
+        u = _vertex_index(vertex_ids, sources)
+        v = _vertex_index(vertex_ids, targets)
+        valid = (u >= 0) & (v >= 0)
+        kept = edge_order[valid]   # Giriş sırasındaki kenar no
+        gids, u, v = gids[valid], u[valid], v[valid]
+        costs, reverse_costs, lengths = costs[valid], reverse_costs[valid], lengths[valid]
+        edge_count = len(gids)
+
+        tails = np.concatenate([u, v])
+        heads = np.concatenate([v, u]).astype(np.int32)
+        weights = np.concatenate([costs, reverse_costs])
+        arc_edge = np.tile(np.arange(edge_count, dtype=np.int32), 2)
+        open_arcs = np.flatnonzero(weights >= 0)
+        arc_order = open_arcs[np.argsort(tails[open_arcs], kind="stable")]
+
+        offsets = np.zeros(len(vertex_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(tails[arc_order], minlength=len(vertex_ids)), out=offsets[1:])
+        position = np.full(2 * edge_count, -1, dtype=np.int32)
+        position[arc_order] = np.arange(len(arc_order), dtype=np.int32)
+
+        arrays = {
+            "offsets": offsets,
+            "heads": heads[arc_order],
+            "weights": weights[arc_order],
+            "arc_edge": arc_edge[arc_order],
+            "vertex_ids": vertex_ids,
+            "lons": lons,
+            "lats": lats,
+            "edge_gids": gids,
+            "edge_lengths": lengths,
+            "fwd_arc": position[:edge_count],
+            "rev_arc": position[edge_count:],
+            "generation": np.zeros(1, dtype=np.int64),
+        }
+        lat0 = float(np.median(lats)) if len(lats) else 0.0
+        arrays["components"] = components
+        arrays["kd_order"] = build_kdtree(lons, lats, lat0)
+        if geometries is not None:
+            coords, counts = geometries
+            counts = np.asarray(counts, dtype=np.int64)
+            starts = np.concatenate([[0], np.cumsum(counts)])[:-1]
+            geom_offsets = np.zeros(edge_count + 1, dtype=np.int64)
+            np.cumsum(counts[kept], out=geom_offsets[1:])
+            # Kenarların nokta aralıklarını yeni (gid) sırasıyla arka arkaya diz
+            picks = np.repeat(starts[kept] - geom_offsets[:-1], counts[kept]) + np.arange(geom_offsets[-1])
+            arrays["geom_offsets"] = geom_offsets
+            arrays["geom_coords"] = np.asarray(coords, dtype=np.float64).reshape(-1, 2)[picks]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            speeds = lengths / np.where(costs > 0, costs, np.inf)
+        max_speed = max(float(speeds.max()) if edge_count else 0.0, MIN_HEURISTIC_SPEED_MPS)
+        return cls(arrays, max_speed, lat0)
+
+    # --- Anlık görüntü dosyası ---
+    def _array_names(self) -> list:
+        return [name for name in ARRAY_NAMES + EXTRA_ARRAYS if getattr(self, name) is not None]
+
+    def write_snapshot(self, path: str, meta: dict = None):
+        """
+        Dizileri tek dosyaya yazar (Statik ağırlıklarla). Geçici dosyaya yazılıp rename edilir:
+        Dosyayı açan süreç yarım yazılmış hali görmez.
+        """
+        names = [name for name in self._array_names() if name != "generation"]
+        layout, size = {}, 0
+        for name in names:
+            arr = getattr(self, name)
+            layout[name] = (size, arr.dtype.str, arr.shape)
+            size += -(-arr.nbytes // SNAPSHOT_ALIGN) * SNAPSHOT_ALIGN
+        header = json.dumps({
+            "max_speed": self.max_speed, "lat0": self.lat0, "meta": meta or {}, "layout": layout,
+        }).encode()
+        data_start = -(-(16 + len(header)) // SNAPSHOT_ALIGN) * SNAPSHOT_ALIGN
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(SNAPSHOT_MAGIC + struct.pack("<II", SNAPSHOT_FORMAT, len(header)) + header)
+            for name in names:
+                f.seek(data_start + layout[name][0])
+                f.write(np.ascontiguousarray(getattr(self, name)).data)
+            f.truncate(data_start + size)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def from_snapshot(cls, path: str) -> "CSRGraph":
+        """
+        Dosyayı mmap ile açar (Salt okunur). Kopya yok: Sayfalar ihtiyaç oldukça diskten gelir ve aynı dosyayı
+        açan tüm süreçler işletim sisteminin sayfa önbelleğini paylaşır.
+        """
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        fmt, header_len = struct.unpack_from("<II", mm, len(SNAPSHOT_MAGIC)) if len(mm) >= 16 else (None, 0)
+        if mm[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC or fmt != SNAPSHOT_FORMAT:
+            mm.close()
+            raise ValueError(f"Tanınmayan graf dosyası: {path} (format {fmt})")
+        header = json.loads(mm[16:16 + header_len])
+        data_start = -(-(16 + header_len) // SNAPSHOT_ALIGN) * SNAPSHOT_ALIGN
+        arrays = {
+            name: np.ndarray(tuple(shape), dtype=dtype, buffer=mm, offset=data_start + offset)
+            for name, (offset, dtype, shape) in header["layout"].items()
+        }
+        arrays["generation"] = np.zeros(1, dtype=np.int64)
+        graph = cls(arrays, header["max_speed"], header["lat0"], header["meta"])
+        graph.snapshot_path = path
+        graph._mmap = mm
+        return graph
+
+    # --- Paylaşımlı bellek ---
+    def share(self) -> dict:
+        """
+        Dizileri tek paylaşımlı bellek bloğuna taşır. Dönüş: Süreçlere gönderilecek tanıtıcı (pickle'lanabilir).
+        Graf dosyadan açıldıysa sadece değişen diziler taşınır; gerisini süreçler aynı dosyadan mmap'ler.
+        """
+        names = MUTABLE_ARRAYS if self.snapshot_path else self._array_names()
+        layout, size = {}, 0
+        for name in names:
+            arr = getattr(self, name)
+            size = -(-size // 8) * 8   # 8 bayt hizala
+            layout[name] = (size, arr.dtype.str, arr.shape)
+            size += arr.nbytes
+
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 8))
+        for name, (offset, dtype, shape) in layout.items():
+            view = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+            view[...] = getattr(self, name)
+            setattr(self, name, view)
+        self._shm = shm
+        return {"name": shm.name, "layout": layout, "max_speed": self.max_speed, "lat0": self.lat0,
+                "snapshot": self.snapshot_path}
+
+    @classmethod
+    def attach(cls, handle: dict) -> "CSRGraph":
+        """Yayınlanmış grafa bağlanır (Kopya yok)."""
+        # Havuz süreçleri (spawn) yayınlayan sürecin kaynak izleyicisini paylaşır: Bağlanırken yapılan kayıt
+        # aynı kaydın tekrarıdır. Burada unregister edilirse sahibin kaydı da silinir (unlink'te KeyError).
+        shm = shared_memory.SharedMemory(name=handle["name"])
+        arrays = {
+            name: np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+            for name, (offset, dtype, shape) in handle["layout"].items()
+        }
+        if handle.get("snapshot"):
+            graph = cls.from_snapshot(handle["snapshot"])
+            for name, arr in arrays.items():
+                setattr(graph, name, arr)
+        else:
+            graph = cls(arrays, handle["max_speed"], handle["lat0"])
+        graph._shm = shm
+        return graph
+
+    def close(self, unlink: bool = False):
+        # Dizi görünümleri bırakılmadan blok/dosya kapatılamaz
+        for name in ARRAY_NAMES + EXTRA_ARRAYS:
+            setattr(self, name, None)
+        self._main_mask = None
+        if self._shm is not None:
+            self._shm.close()
+            if unlink:
+                self._shm.unlink()
+            self._shm = None
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass   # Dışarıda tutulan bir görünüm var; eşleme onunla birlikte bırakılır
+            self._mmap = None
+
+    # --- Ağırlık güncellemesi (seqlock) ---
+    def overlay_weights(self, base: np.ndarray, gids, costs, reverse_costs) -> np.ndarray:
+        """base yay ağırlıklarının kopyası + verilen kenarların maliyetleri (Grafta olmayan gid yok sayılır)."""
+        weights = base.copy()
+        gids = np.asarray(gids, dtype=np.int64)
+        if not len(gids) or not len(self.edge_gids):
+            return weights
+        idx = np.searchsorted(self.edge_gids, gids)
+        idx[idx >= len(self.edge_gids)] = 0
+        known = self.edge_gids[idx] == gids
+        fwd, rev = self.fwd_arc[idx[known]], self.rev_arc[idx[known]]
+        costs = np.asarray(costs, dtype=np.float32)[known]
+        reverse_costs = np.asarray(reverse_costs, dtype=np.float32)[known]
+        weights[fwd[fwd >= 0]] = costs[fwd >= 0]
+        weights[rev[rev >= 0]] = reverse_costs[rev >= 0]
+        return weights
+
+    def publish_weights(self, weights: np.ndarray):
+        """
+        Ağırlıkları yerinde yazar. generation tek iken yazım sürüyordur; okuyucular sorgu başı/sonu
+        sürümü karşılaştırıp değiştiyse aramayı tekrarlar (seqlock). Tek yazar: Grafı yayınlayan süreç.
+        """
+        self.generation[0] += 1
+        try:
+            self.weights[:] = weights
+        finally:
+            self.generation[0] += 1
+
+    # --- Snap ---
+    def vertex_index(self, vertex_id: int) -> int:
+        idx = _vertex_index(self.vertex_ids, np.array([vertex_id], dtype=np.int64))
+        return int(idx[0])
+
+    def vertex_indices(self, vertex_ids) -> np.ndarray:
+        """OSM düğüm id'leri -> sıra (Grafta olmayan: -1)."""
+        return _vertex_index(self.vertex_ids, np.asarray(vertex_ids, dtype=np.int64))
+
+    def nearest_vertex(self, lon: float, lat: float, main_only: bool = False) -> int:
+        """En yakın düğümün sırası (main_only: Sadece ana bileşen). Graf boşsa -1."""
+        mask = None
+        if main_only:
+            if self._main_mask is None:
+                self._main_mask = self.components == 0
+            mask = self._main_mask
+        return nearest(self.kd_order, self.lons, self.lats, self.lat0, lon, lat, mask)
+
+    def distance_m(self, vertex: int, lon: float, lat: float) -> float:
+        return _haversine_m(float(self.lons[vertex]), float(self.lats[vertex]), lon, lat)
+
+    # --- Arama ---
+
+    def shortest_path(self, source: int, target: int, max_retries: int = 3) -> dict | None:
+        """
+        source/target: Düğüm sırası. Dönüş: {"arcs": [...], "seconds": float} ya da yol yoksa None.
+        Arama sırasında ağırlıklar değiştiyse (generation farklı) tekrar edilir.
+        """
+        return self._consistent(self._astar, max_retries, source, target)
+
+    def rejoin(self, source: int, join_costs: dict, budget: float, max_retries: int = 3) -> dict | None:
+        """
+        Rotaya geri bağlanma: source'tan join_costs'taki düğümlere (düğüm sırası -> varışa kalan süre) çok hedefli
+        Dijkstra. En küçük (sapma + kalan) seçilir; sapma süresi budget'ı aşan düğümlere bakılmaz.
+        Dönüş: {"arcs": [...], "seconds": sapma süresi, "join": düğüm sırası} ya da None.
+        """
+        return self._consistent(self._rejoin, max_retries, source, join_costs, budget)
+
+    def _consistent(self, search, max_retries: int, *args):
+        """Arama sırasında ağırlıklar değiştiyse (generation farklı) tekrar edilir."""
+        for _ in range(max_retries):
+            generation = int(self.generation[0])
+            if generation % 2:
+                time.sleep(0.001)
+                continue
+            result = search(*args)
+            if int(self.generation[0]) == generation:
+                return result
+        return search(*args)
+
+    def _trace(self, pred: dict, source: int, u: int) -> list:
+        arcs = []
+        while u != source:
+            arc, u = pred[u]
+            arcs.append(arc)
+        arcs.reverse()
+        return arcs
+
+    def _astar(self, source: int, target: int) -> dict | None:
+        offsets, heads, weights = self.offsets, self.heads, self.weights
+        lons, lats = self.lons, self.lats
+        t_lon, t_lat = math.radians(lons[target]), math.radians(lats[target])
+        cos_t = math.cos(t_lat)
+        inv_speed = 1.0 / self.max_speed
+
+        def heuristic(v: int) -> float:
+            lon, lat = math.radians(lons[v]), math.radians(lats[v])
+            a = math.sin((lat - t_lat) / 2) ** 2 + math.cos(lat) * cos_t * math.sin((lon - t_lon) / 2) ** 2
+            return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a))) * inv_speed
+
+        dist = {source: 0.0}
+        pred = {}
+        done = set()
+        heap = [(heuristic(source), 0.0, source)]
+        while heap:
+            _, d, u = heapq.heappop(heap)
+            if u in done:
+                continue
+            if u == target:
+                return {"arcs": self._trace(pred, source, u), "seconds": d}
+            done.add(u)
+            start, end = int(offsets[u]), int(offsets[u + 1])
+            for arc, v, w in zip(range(start, end), heads[start:end].tolist(), weights[start:end].tolist()):
+                nd = d + w
+                if nd < dist.get(v, math.inf):
+                    dist[v] = nd
+                    pred[v] = (arc, u)
+                    heapq.heappush(heap, (nd + heuristic(v), nd, v))
+        return None
+
+    def _rejoin(self, source: int, join_costs: dict, budget: float) -> dict | None:
+        offsets, heads, weights = self.offsets, self.heads, self.weights
+        dist = {source: 0.0}
+        pred = {}
+        done = set()
+        heap = [(0.0, source)]
+        best, best_total = None, math.inf
+        while heap:
+            d, u = heapq.heappop(heap)
+            if u in done:
+                continue
+            # Kalan süre negatif değil: Bundan sonra settle edilen düğüm daha iyi sonuç veremez
+            if d > budget or d >= best_total:
+                break
+            done.add(u)
+            if u in join_costs and d + join_costs[u] < best_total:
+                best, best_total = u, d + join_costs[u]
+            start, end = int(offsets[u]), int(offsets[u + 1])
+            for arc, v, w in zip(range(start, end), heads[start:end].tolist(), weights[start:end].tolist()):
+                nd = d + w
+                if nd < dist.get(v, math.inf):
+                    dist[v] = nd
+                    pred[v] = (arc, u)
+                    heapq.heappush(heap, (nd, v))
+        if best is None:
+            return None
+        return {"arcs": self._trace(pred, source, best), "seconds": dist[best], "join": best}
+
+    def edge_arcs(self, gids, directions) -> list | None:
+        """Saklanmış kenar listesi (gid, yön) -> yay listesi. Kenar artık yoksa ya da yön kapalıysa None."""
+        gids = np.asarray(gids, dtype=np.int64)
+        if not len(gids):
+            return []
+        idx = np.searchsorted(self.edge_gids, gids)
+        idx[idx >= len(self.edge_gids)] = 0
+        if not np.array_equal(self.edge_gids[idx], gids):
+            return None
+        arcs = np.where(np.asarray(directions) > 0, self.fwd_arc[idx], self.rev_arc[idx])
+        return None if (arcs < 0).any() else arcs.tolist()
+
+    def arc_tail(self, arc: int) -> int:
+        """Yayın çıktığı düğüm sırası."""
+        return int(np.searchsorted(self.offsets, arc, side="right") - 1)
+
+    def edge_endpoints(self) -> tuple:
+        """Kenarların (source, target) düğüm sıraları, ways.the_geom yönünde. İki yönü de kapalı kenar: -1."""
+        open_arc = np.where(self.fwd_arc >= 0, self.fwd_arc, self.rev_arc)
+        tails = np.searchsorted(self.offsets, np.maximum(open_arc, 0), side="right") - 1
+        heads = self.heads[np.maximum(open_arc, 0)].astype(np.int64)
+        forward = self.fwd_arc >= 0
+        sources, targets = np.where(forward, tails, heads), np.where(forward, heads, tails)
+        closed = open_arc < 0
+        sources[closed] = targets[closed] = -1
+        return sources, targets
+
+    def describe_path(self, arcs: list) -> dict:
+        """Yay listesi -> geçilen düğümler (OSM id), kenar gid'leri, yönleri (1/-1), kenar başı metre ve saniye."""
+        arcs = np.asarray(arcs, dtype=np.int64)
+        edges = self.arc_edge[arcs]
+        tails = np.searchsorted(self.offsets, arcs[:1], side="right") - 1
+        return {
+            "nodes": self.vertex_ids[np.concatenate([tails, self.heads[arcs]])].tolist() if len(arcs) else [],
+            "gids": self.edge_gids[edges].tolist(),
+            "directions": np.where(self.fwd_arc[edges] == arcs, 1, -1).tolist(),
+            "edge_meters": self.edge_lengths[edges].astype(float).tolist(),
+            "edge_seconds": self.weights[arcs].astype(float).tolist(),
+        }
+
+    def path_coordinates(self, arcs: list) -> list:
+        """Yay listesi -> gidiş yönünde [[lon, lat], ...]. Kenar birleşimindeki tekrar eden nokta atlanır."""
+        if self.geom_coords is None:
+            # Geometrisiz graf: Düğümler arası düz çizgi
+            nodes = self.vertex_indices(self.describe_path(arcs)["nodes"])
+            return np.column_stack([self.lons[nodes], self.lats[nodes]]).tolist()
+        coords = []
+        for arc in arcs:
+            edge = int(self.arc_edge[arc])
+            part = self.geom_coords[self.geom_offsets[edge]:self.geom_offsets[edge + 1]]
+            if self.fwd_arc[edge] != arc:
+                part = part[::-1]
+            part = part.tolist()
+            if coords and part and coords[-1] == part[0]:
+                part = part[1:]
+            coords.extend(part)
+        return coords
+
+
+def _haversine_m(lon1: float, lat1: float, lon2: float, lat2: float) -> float:
+    lon1, lat1, lon2, lat2 = map(math.radians, (lon1, lat1, lon2, lat2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _vertex_index(vertex_ids: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    """OSM düğüm id'leri -> sıra (Bulunamayan: -1)."""
+    if not len(vertex_ids):
+        return np.full(len(ids), -1, dtype=np.int64)
+    idx = np.searchsorted(vertex_ids, ids)
+    idx[idx >= len(vertex_ids)] = 0
+    return np.where(vertex_ids[idx] == ids, idx, -1)
@@ -0,0 +1,106 @@
+import glob
+import os
+import time
+import numpy as np
+import shapely
+from services.csr_graph import CSRGraph
+
+# --- GRAF ANLIK GÖRÜNTÜSÜ ---
+# ETL (build_graph, osm_changes) grafı canlıya alırken bölge grafını tek bir dosyaya yazar (CSR dizileri,
+# düğüm koordinatları + KD-ağacı, kenar geometrileri). City Agent açılışta SQL yerine bu dosyayı mmap'ler.
+# Dosyalar sürümlüdür: {bölge}.{sürüm}.graph. {bölge}.graph (güncel) ve {bölge}.previous.graph (geri dönüş)
+# sembolik bağdır; bağ değişimi atomiktir, eski dosyayı açmış süreçler onunla devam eder.
+SNAPSHOT_DIR = os.getenv("GRAPH_SNAPSHOT_DIR", "/app/data/graph")
+
+
+async def load_graph(conn, schema: str = "public") -> CSRGraph:
+    """Bölge grafını SQL'den kurar (Statik maliyetler). Anlık görüntü yoksa City Agent da bunu kullanır."""
+    edges = await conn.fetch(f"""
+        SELECT gid, source, target, length_m, cost_time, reverse_cost_time,
+               COALESCE(ST_NPoints(the_geom), 0) AS points, ST_AsBinary(the_geom) AS wkb
+        FROM {schema}.ways;
+    """)
+    vertices = await conn.fetch(f"""
+        SELECT id, ST_X(the_geom) AS lon, ST_Y(the_geom) AS lat, COALESCE(component, 0) AS component
+        FROM {schema}.ways_vertices_pgr;
+    """)
+    coords = shapely.get_coordinates(shapely.from_wkb([e["wkb"] for e in edges]))
+    return CSRGraph.from_edges(
+        [e["gid"] for e in edges], [e["source"] for e in edges], [e["target"] for e in edges],
+        [e["cost_time"] for e in edges], [e["reverse_cost_time"] for e in edges], [e["length_m"] for e in edges],
+        [v["id"] for v in vertices], [v["lon"] for v in vertices], [v["lat"] for v in vertices],
+        components=[v["component"] for v in vertices],
+        geometries=(coords, np.array([e["points"] for e in edges], dtype=np.int64)),
+    )
+
+
+async def graph_fingerprint(conn, schema: str = "public") -> dict:
+    """Dosya ile DB'deki graf aynı mı? (Artımlı güncelleme kenar siler/ekler: sayı ya da son gid değişir)"""
+    row = await conn.fetchrow(f"SELECT count(*) AS edges, COALESCE(max(gid), 0) AS max_gid FROM {schema}.ways;")
+    return {"edges": row["edges"], "max_gid": row["max_gid"]}
+
+
+def snapshot_links(region_name: str, directory: str = None) -> tuple:
+    directory = directory or SNAPSHOT_DIR
+    return os.path.join(directory, f"{region_name}.graph"), os.path.join(directory, f"{region_name}.previous.graph")
+
+
+async def export_snapshot(conn, schema: str, region_name: str, directory: str = None) -> str:
+    """Grafı yeni sürüm dosyasına yazar (Henüz güncel değil: publish_snapshot ile bağlanır). Dönüş: Dosya yolu."""
+    started = time.time()
+    directory = directory or SNAPSHOT_DIR
+    os.makedirs(directory, exist_ok=True)
+    graph = await load_graph(conn, schema)
+    version = time.strftime("%Y%m%d%H%M%S")
+    path = os.path.join(directory, f"{region_name}.{version}.graph")
+    graph.write_snapshot(path, {
+        "region": region_name, "version": version, "fingerprint": await graph_fingerprint(conn, schema),
+    })
+    print(f"💾 Graf dosyası yazıldı: {path} ({os.path.getsize(path) / 1e6:.1f} MB, {time.time() - started:.1f} sn)")
+    return path
+
+
+def _point_link(link: str, target: str):
+    tmp = f"{link}.tmp"
+    if os.path.lexists(tmp):
+        os.remove(tmp)
+    os.symlink(os.path.basename(target), tmp)
+    os.replace(tmp, link)
+
+
+def publish_snapshot(region_name: str, path: str, directory: str = None):
+    """Güncel bağı yeni dosyaya çevirir, öncekini geri dönüş için saklar, bağlanmayan eski sürümleri siler."""
+    directory = directory or SNAPSHOT_DIR
+    current, previous = snapshot_links(region_name, directory)
+    if os.path.exists(current) and os.path.realpath(current) != os.path.realpath(path):
+        _point_link(previous, os.path.realpath(current))
+    _point_link(current, path)
+
+    keep = {os.path.realpath(link) for link in (current, previous) if os.path.exists(link)}
+    for old in glob.glob(os.path.join(directory, f"{region_name}.*.graph")):
+        if os.path.islink(old) or os.path.realpath(old) in keep:
+            continue
+        os.remove(old)   # Açık tutan süreç varsa inode o kapanana kadar yaşar
+
+
+def rollback_snapshot(region_name: str, directory: str = None) -> bool:
+    """Güncel ve önceki bağın yerini değiştirir (build_graph --rollback ile birlikte)."""
+    current, previous = snapshot_links(region_name, directory)
+    if not (os.path.exists(current) and os.path.exists(previous)):
+        return False
+    current_target, previous_target = os.path.realpath(current), os.path.realpath(previous)
+    _point_link(current, previous_target)
+    _point_link(previous, current_target)
+    return True
+
+
+def open_snapshot(region_name: str, directory: str = None) -> CSRGraph | None:
+    """Güncel dosyayı mmap ile açar. Yoksa ya da okunamazsa None (Çağıran SQL'den yükler)."""
+    current, _ = snapshot_links(region_name, directory)
+    if not os.path.exists(current):
+        return None
+    try:
+        # Bağ değil gerçek dosya: Havuz süreçleri de aynı sürümü açar (Arada bağ değişse bile)
+        return CSRGraph.from_snapshot(os.path.realpath(current))
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,70 @@
+import math
+import numpy as np
+
+# Düğüm snap'i için örtük (implicit) KD-ağacı: Ağaç tek bir permütasyon dizisidir.
+# [lo, hi) aralığının bölen noktası ortadaki elemandır (mid = (lo + hi) // 2), sol alt ağaç [lo, mid),
+# sağ alt ağaç [mid + 1, hi). İşaretçi/düğüm nesnesi yok; dizi olduğu gibi dosyaya yazılıp mmap ile okunur.
+# Koordinatlar eşdikdörtgen izdüşümde: x = lon * cos(lat0), y = lat (Şehir ölçeğinde yeterli).
+LEAF_SIZE = 16
+METERS_PER_DEG = 111320.0
+
+
+def project(lons, lats, lat0: float) -> tuple:
+    return np.asarray(lons, dtype=np.float64) * math.cos(math.radians(lat0)), np.asarray(lats, dtype=np.float64)
+
+
+def build_kdtree(lons, lats, lat0: float) -> np.ndarray:
+    """Dönüş: int32 permütasyon (Ağaç sırası). O(V log V), özyineleme yerine yığın."""
+    x, y = project(lons, lats, lat0)
+    order = np.arange(len(x), dtype=np.int32)
+    stack = [(0, len(order), 0)]
+    while stack:
+        lo, hi, axis = stack.pop()
+        if hi - lo <= LEAF_SIZE:
+            continue
+        mid = (lo + hi) // 2
+        coords = x if axis == 0 else y
+        part = order[lo:hi]
+        order[lo:hi] = part[np.argpartition(coords[part], mid - lo)]
+        stack.append((lo, mid, 1 - axis))
+        stack.append((mid + 1, hi, 1 - axis))
+    return order
+
+
+def nearest(order: np.ndarray, lons: np.ndarray, lats: np.ndarray, lat0: float,
+            lon: float, lat: float, mask: np.ndarray = None) -> int:
+    """
+    (lon, lat) noktasına en yakın düğümün sırası (mask verilirse sadece mask[i] olan düğümler).
+    Bulunamazsa -1. Yaprak aralıkları numpy ile taranır; alt ağaçlar bölme düzlemine uzaklıkla budanır.
+    """
+    scale = math.cos(math.radians(lat0))
+    px, py = lon * scale, lat
+    best, best_d2 = -1, math.inf
+    stack = [(0, len(order), 0, 0.0)]
+    while stack:
+        lo, hi, axis, bound = stack.pop()
+        if bound >= best_d2:
+            continue
+        if hi - lo <= LEAF_SIZE:
+            idx = order[lo:hi]
+            if mask is not None:
+                idx = idx[mask[idx]]
+            if len(idx):
+                d2 = (lons[idx] * scale - px) ** 2 + (lats[idx] - py) ** 2
+                i = int(np.argmin(d2))
+                if d2[i] < best_d2:
+                    best, best_d2 = int(idx[i]), float(d2[i])
+            continue
+        mid = (lo + hi) // 2
+        node = int(order[mid])
+        nx, ny = float(lons[node]) * scale, float(lats[node])
+        if mask is None or mask[node]:
+            d2 = (nx - px) ** 2 + (ny - py) ** 2
+            if d2 < best_d2:
+                best, best_d2 = node, d2
+        delta = (px - nx) if axis == 0 else (py - ny)
+        near, far = ((lo, mid), (mid + 1, hi)) if delta < 0 else ((mid + 1, hi), (lo, mid))
+        # Yakın taraf önce taranır; uzak taraf sırası gelince bölme düzlemine uzaklıkla budanır
+        stack.append((far[0], far[1], 1 - axis, delta * delta))
+        stack.append((near[0], near[1], 1 - axis, 0.0))
+    return best
@@ -0,0 +1,268 @@
+import heapq
+import math
+import numpy as np
+import shapely
+from shapely.strtree import STRtree
+
+# GPS izi -> graf kenarları (HMM + Viterbi, Newson & Krumm 2009).
+# Durum: Noktanın aday kenarı üzerindeki izdüşümü. Emisyon: Noktanın kenara uzaklığı (Gauss).
+# Geçiş: İki izdüşüm arası yol mesafesi ile kuş uçuşu mesafenin farkı (Üstel). Yol mesafesi sınırlı
+# Dijkstra ile (metre) bulunur. Uzun izler parça parça çözülür: Her parçanın son durumu sabitlenir
+# ve sonraki parçanın ilk durumu olur (Bellek parça boyuyla sınırlı).
+GPS_SIGMA_M = 10.0          # GPS gürültüsü
+TRANSITION_BETA_M = 30.0    # Yol mesafesi / kuş uçuşu farkına tolerans
+SEARCH_RADIUS_M = 50.0      # Aday kenar arama yarıçapı
+MAX_CANDIDATES = 5          # Nokta başına en fazla aday
+MIN_SPACING_M = 2 * GPS_SIGMA_M   # Bundan yakın ardışık noktalar yeni bilgi taşımaz (Atlanır)
+ROUTE_SLACK_M = 500.0       # Yol aramasının sınırı: 2 x kuş uçuşu + bu pay
+CHUNK_POINTS = 500          # Viterbi parça boyu
+METERS_PER_DEG = 111320.0
+
+
+class EdgeIndex:
+    """
+    Kenar geometrileri yerel metrik izdüşümde (metre) STRtree'de. Bir parçanın tüm noktaları için
+    adaylar tek vektörel sorguyla bulunur. Grafı yükleyen süreçte bir kez kurulur.
+    """
+
+    def __init__(self, graph):
+        self.scale_x = math.cos(math.radians(graph.lat0)) * METERS_PER_DEG
+        edge_count = len(graph.edge_gids)
+        if graph.geom_coords is not None:
+            counts = np.diff(graph.geom_offsets)
+            coords = graph.geom_coords
+        else:
+            # Geometrisiz graf: Kenar = iki ucu arası düz çizgi
+            sources, targets = graph.edge_endpoints()
+            counts = np.where(sources >= 0, 2, 0)
+            ends = np.column_stack([sources, targets])[sources >= 0].ravel()
+            coords = np.column_stack([graph.lons[ends], graph.lats[ends]])
+        owner = np.repeat(np.arange(edge_count), counts)
+        usable = counts[owner] >= 2
+        self.lines = np.empty(edge_count, dtype=object)
+        if usable.any():
+            shapely.linestrings(
+                self._project(coords[usable, 0], coords[usable, 1]), indices=owner[usable], out=self.lines,
+            )
+        self.tree = STRtree(self.lines)
+
+    def _project(self, lons, lats) -> np.ndarray:
+        return np.column_stack([np.asarray(lons) * self.scale_x, np.asarray(lats) * METERS_PER_DEG])
+
+    def candidates(self, lons, lats) -> tuple:
+        """Dönüş: (nokta sırası, kenar sırası, kenar üzerindeki oran 0-1, uzaklık m); nokta, uzaklık sıralı."""
+        points = shapely.points(self._project(lons, lats))
+        point_idx, edge_idx = self.tree.query(points, predicate="dwithin", distance=SEARCH_RADIUS_M)
+        if not len(point_idx):
+            empty = np.array([], dtype=np.int64)
+            return empty, empty, np.array([]), np.array([])
+        lines, points = self.lines[edge_idx], points[point_idx]
+        dist = shapely.distance(points, lines)
+        frac = shapely.line_locate_point(lines, points, normalized=True)
+        order = np.lexsort((dist, point_idx))
+        point_idx, edge_idx, frac, dist = point_idx[order], edge_idx[order], frac[order], dist[order]
+        rank = np.arange(len(point_idx)) - np.searchsorted(point_idx, point_idx)
+        keep = rank < MAX_CANDIDATES
+        return point_idx[keep], edge_idx[keep], frac[keep], dist[keep]
+
+
+class _Matcher:
+    """Tek parçanın Viterbi çözümü (Havuz sürecinde, paylaşımlı graf üzerinde)."""
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.lengths = graph.edge_lengths
+
+    def _exits(self, edge: int, frac: float) -> list:
+        """İzdüşümden kenarın uçlarına: [(yay, varılan düğüm, kalan metre)]"""
+        g, length = self.graph, float(self.lengths[edge])
+        out = []
+        if g.fwd_arc[edge] >= 0:
+            out.append((int(g.fwd_arc[edge]), int(g.heads[g.fwd_arc[edge]]), (1 - frac) * length))
+        if g.rev_arc[edge] >= 0:
+            out.append((int(g.rev_arc[edge]), int(g.heads[g.rev_arc[edge]]), frac * length))
+        return out
+
+    def _entries(self, edge: int, frac: float) -> list:
+        """Kenarın uçlarından izdüşüme: [(yay, başlangıç düğümü, yay başından metre)]"""
+        g, length = self.graph, float(self.lengths[edge])
+        out = []
+        if g.fwd_arc[edge] >= 0:
+            out.append((int(g.fwd_arc[edge]), g.arc_tail(int(g.fwd_arc[edge])), frac * length))
+        if g.rev_arc[edge] >= 0:
+            out.append((int(g.rev_arc[edge]), g.arc_tail(int(g.rev_arc[edge])), (1 - frac) * length))
+        return out
+
+    def _dijkstra(self, sources: dict, targets: set, bound: float) -> tuple:
+        g = self.graph
+        offsets, heads, arc_edge, lengths = g.offsets, g.heads, g.arc_edge, self.lengths
+        dist = {v: d for v, (d, _) in sources.items()}
+        pred = {}
+        heap = [(d, v) for v, d in dist.items()]
+        heapq.heapify(heap)
+        done, remaining = set(), set(targets)
+        while heap and remaining:
+            d, u = heapq.heappop(heap)
+            if u in done:
+                continue
+            if d > bound:
+                break
+            done.add(u)
+            remaining.discard(u)
+            start, end = int(offsets[u]), int(offsets[u + 1])
+            for arc, v, w in zip(range(start, end), heads[start:end].tolist(), lengths[arc_edge[start:end]].tolist()):
+                nd = d + w
+                if nd < dist.get(v, math.inf):
+                    dist[v] = nd
+                    pred[v] = (arc, u)
+                    heapq.heappush(heap, (nd, v))
+        return dist, pred
+
+    def transitions(self, a: tuple, cands: list, bound: float) -> list:
+        """
+        a adayından cands'teki her adaya en kısa yol: [(metre, yaylar, a'nın yay başına uzaklığı,
+        b'nin yay başına uzaklığı)] (Yol yoksa metre = inf). Yaylar a'nın yayından b'nin yayına dahil.
+        """
+        edge_a, frac_a, _ = a
+        sources = {}
+        for arc, vertex, remaining in self._exits(edge_a, frac_a):
+            if vertex not in sources or remaining < sources[vertex][0]:
+                sources[vertex] = (remaining, arc)
+        entries = [self._entries(edge, frac) for edge, frac, _ in cands]
+        targets = {vertex for entry in entries for _, vertex, _ in entry}
+        dist, pred = self._dijkstra(sources, targets, bound)
+
+        length_a = float(self.lengths[edge_a])
+        results = []
+        for (edge_b, frac_b, _), entry in zip(cands, entries):
+            best = (math.inf, None, 0.0, 0.0)
+            # Aynı kenar üzerinde ileri gidiş (Kenar uçlarına gitmeden)
+            if edge_b == edge_a:
+                for arc, _, along_b in entry:
+                    along_a = frac_a * length_a if arc == self.graph.fwd_arc[edge_a] else (1 - frac_a) * length_a
+                    if along_b >= along_a and along_b - along_a < best[0]:
+                        best = (along_b - along_a, [arc], along_a, along_b)
+            for arc_b, vertex, along_b in entry:
+                if dist.get(vertex, math.inf) + along_b < best[0]:
+                    best = (dist[vertex] + along_b, (vertex, arc_b), None, along_b)
+            if isinstance(best[1], tuple):
+                vertex, arc_b = best[1]
+                middle = []
+                while vertex in pred:
+                    arc, vertex = pred[vertex]
+                    middle.append(arc)
+                middle.reverse()
+                remaining, arc_a = sources[vertex]
+                best = (best[0], [arc_a] + middle + [arc_b], length_a - remaining, best[3])
+            results.append(best)
+        return results
+
+    def solve(self, steps: list) -> list:
+        """
+        steps: [{"cands": [(kenar, oran, uzaklık), ...], "gc": önceki noktaya kuş uçuşu, ...}]
+        Dönüş: Bölümler (Yol bulunamayan yerde HMM kırılır): [{"steps": [adım sırası], "states": [aday],
+        "moves": [(metre, yaylar, a ofseti, b ofseti)]}]
+        """
+        segments = []
+        scores, back, start = None, [], 0
+        for t, step in enumerate(steps):
+            emission = np.array([-0.5 * (d / GPS_SIGMA_M) ** 2 for _, _, d in step["cands"]])
+            if scores is None:
+                scores, back, start = emission, [None], t
+                continue
+            bound = 2 * step["gc"] + ROUTE_SLACK_M
+            prev_cands = steps[t - 1]["cands"]
+            moves = [self.transitions(a, step["cands"], bound) for a in prev_cands]
+            route = np.array([[m[0] for m in row] for row in moves])
+            with np.errstate(invalid="ignore"):
+                total = scores[:, None] - np.abs(route - step["gc"]) / TRANSITION_BETA_M
+            best_prev = np.argmax(total, axis=0)
+            best = total[best_prev, np.arange(len(step["cands"]))]
+            if not np.isfinite(best).any():
+                # Bağlantı yok (Tünel, veri boşluğu vb.): Önceki bölümü kapat, buradan yeni bölüm
+                segments.append(self._backtrack(scores, back, start))
+                scores, back, start = emission, [None], t
+                continue
+            back.append([(int(p), moves[p][j]) for j, p in enumerate(best_prev)])
+            scores = best + emission
+        if scores is not None:
+            segments.append(self._backtrack(scores, back, start))
+        return segments
+
+    @staticmethod
+    def _backtrack(scores: np.ndarray, back: list, start: int) -> dict:
+        state = int(np.argmax(scores))
+        states, moves = [state], []
+        for t in range(len(back) - 1, 0, -1):
+            prev, move = back[t][state]
+            moves.append(move)
+            states.append(prev)
+            state = prev
+        states.reverse()
+        moves.reverse()
+        return {"steps": list(range(start, start + len(states))), "states": states, "moves": moves}
+
+
+def match_steps(graph, steps: list) -> dict:
+    """
+    Bir parçayı eşler. Dönüş: {"segments": [...], "last": son adımın seçilen adayı}.
+    Her bölüm: Kenar dizisi (gid, yön, metre, izin süresi), ilk/son adım ve toplam yol mesafesi.
+    """
+    matcher = _Matcher(graph)
+    segments = []
+    last = None
+    for raw in matcher.solve(steps):
+        chosen = [steps[t]["cands"][s] for t, s in zip(raw["steps"], raw["states"])]
+        last = chosen[-1]
+        if not raw["moves"]:
+            continue
+        times = [steps[t].get("time") for t in raw["steps"]]
+        segments.append({"first_step": raw["steps"][0], "last_step": raw["steps"][-1],
+                         **_describe(graph, raw["moves"], times)})
+    return {"segments": segments, "last": last}
+
+
+def _describe(graph, moves: list, times: list) -> dict:
+    """Geçişleri tek yay dizisine birleştirir; noktaların yol üzerindeki konumundan kenar sürelerini çıkarır."""
+    arcs, starts = [], []
+    positions = [0.0]
+    for distance, move_arcs, offset_a, offset_b in moves:
+        pos_a = positions[-1]
+        pos_b = pos_a + distance
+        # İlk yay a'nın bulunduğu yay; başlangıcı a'nın ofseti kadar geride. Son yay b'nin yayı.
+        cursor = pos_a - offset_a
+        for i, arc in enumerate(move_arcs):
+            if i == len(move_arcs) - 1:
+                cursor = pos_b - offset_b
+            if not (arcs and arcs[-1] == arc and abs(starts[-1] - cursor) < 1e-6):
+                arcs.append(arc)
+                starts.append(cursor)
+            cursor += float(graph.edge_lengths[graph.arc_edge[arc]])
+        positions.append(pos_b)
+
+    path = graph.describe_path(arcs)
+    starts = np.array(starts)
+    ends = starts + np.array(path["edge_meters"])
+    covered_from = np.clip(starts, positions[0], positions[-1])
+    covered_to = np.clip(ends, positions[0], positions[-1])
+    timed = all(t is not None for t in times) and times[-1] > times[0]
+    edges = []
+    for i, gid in enumerate(path["gids"]):
+        covered = float(covered_to[i] - covered_from[i])
+        seconds = None
+        if timed:
+            seconds = float(np.interp(covered_to[i], positions, times) - np.interp(covered_from[i], positions, times))
+        edges.append({
+            "gid": gid,
+            "direction": path["directions"][i],
+            "meters": round(path["edge_meters"][i], 1),
+            "covered_m": round(covered, 1),
+            "seconds": round(seconds, 1) if seconds is not None else None,
+            "speed_kmh": round(covered / seconds * 3.6, 1) if seconds and covered > 0 else None,
+        })
+    return {
+        "points": len(positions),
+        "distance_m": round(positions[-1], 1),
+        "seconds": round(times[-1] - times[0], 1) if timed else None,
+        "edges": edges,
+    }
@@ -0,0 +1,173 @@
+import asyncio
+import json
+import logging
+import struct
+from array import array
+from dataclasses import dataclass, field
+
+logger = logging.getLogger("TrafficEpoch")
+
+# --- REDIS ANAHTARLARI ---
+EPOCH_KEY = "traffic:epoch"             # Her değişen döngüde +1
+CHANNEL = "traffic:updates"             # {"epoch": n, "count": k} yayınlanır
+BLOB_KEY = "traffic:weights:{epoch}"    # Değişen kenar ağırlıkları (paketli)
+BLOB_TTL = 900                          # Geç kalan tüketici için 15 dk saklanır
+GRAPH_VERSION_KEY = "graph:version"     # Yeni graf canlıya alındıkça +1 (ETL build_graph)
+GRAPH_CHANNEL = "graph:reload"          # {"version": n, ...} yayınlanır
+
+
+def edge_speed_ddl(schema: str, table: str = "TABLE IF NOT EXISTS") -> str:
+    """
+    Canlı hız tablosu (traffic_monitor yazar; local_routing/memory_routing okur). ETL ve monitor aynı tanımı kullanır.
+    Dar tablo (Geometrili 'ways' yerine). fillfactor=70: Güncellemeler HOT olur (İndeks şişmez, vacuum yükü az).
+    """
+    return f"""
+        CREATE {table} {schema}.edge_speed (
+            gid INTEGER PRIMARY KEY,          -- ways.gid
+            speed SMALLINT NOT NULL,          -- km/s
+            cost_time REAL NOT NULL,          -- saniye
+            reverse_cost_time REAL NOT NULL,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        ) WITH (fillfactor = 70);
+    """
+
+
+def pack_weights(rows) -> bytes:
+    """[(gid, cost, reverse_cost), ...] -> [adet:uint32][gid:uint32 * n][cost:f32 * n][reverse:f32 * n]"""
+    gids = array("I", (int(r[0]) for r in rows))
+    costs = array("f", (float(r[1]) for r in rows))
+    reverse = array("f", (float(r[2]) for r in rows))
+    return struct.pack("<I", len(gids)) + gids.tobytes() + costs.tobytes() + reverse.tobytes()
+
+
+def unpack_weights(blob: bytes) -> tuple:
+    """pack_weights'in tersi: (gids, costs, reverse_costs) dizileri."""
+    (count,) = struct.unpack_from("<I", blob, 0)
+    offset = 4
+    arrays = []
+    for typecode in ("I", "f", "f"):
+        arr = array(typecode)
+        size = count * arr.itemsize
+        arr.frombytes(blob[offset:offset + size])
+        offset += size
+        arrays.append(arr)
+    return tuple(arrays)
+
+
+async def publish_epoch(redis_client, rows) -> int:
+    """Trafik döngüsü sonunda: epoch'u artır, ağırlıkları sakla, işaretçiyi yayınla."""
+    epoch = await redis_client.incr(EPOCH_KEY)
+    await redis_client.set(BLOB_KEY.format(epoch=epoch), pack_weights(rows), ex=BLOB_TTL)
+    await redis_client.publish(CHANNEL, json.dumps({"epoch": epoch, "count": len(rows)}))
+    return epoch
+
+
+async def publish_graph_version(redis_client, info: dict) -> int:
+    """Graf değişimi sonrası: Sürümü artır ve bellek içi graf tutan süreçlere yeniden yükle sinyali ver."""
+    version = await redis_client.incr(GRAPH_VERSION_KEY)
+    await redis_client.publish(GRAPH_CHANNEL, json.dumps({"version": version, **info}))
+    return version
+
+
+@dataclass(frozen=True)
+class WeightSnapshot:
+    """Bir epoch'a ait değişmez ağırlık görüntüsü. Sorgu başında alınır, sorgu boyunca tutarlıdır."""
+    epoch: int = 0
+    weights: dict = field(default_factory=dict)   # gid -> (cost, reverse_cost)
+    complete: bool = True                         # Epoch atlandıysa False (Tam yükleme gerekir)
+
+
+class TrafficEpochListener:
+    """
+    City Agent tarafı: Redis pub/sub'dan yeni epoch'ları ve graf sürümlerini dinler.
+    Yeni ağırlıklar ayrı bir tampona uygulanır, hazır olunca referans tek atamayla değiştirilir
+    (double buffer). Devam eden sorgular eski görüntüyü görmeye devam eder.
+    """
+
+    def __init__(self, redis_factory):
+        self._redis_factory = redis_factory
+        self.snapshot = WeightSnapshot()
+        self.graph_version = 0
+        self._callbacks = []
+        self._graph_callbacks = []
+        self._task = None
+
+    @property
+    def epoch(self) -> int:
+        return self.snapshot.epoch
+
+    def on_epoch(self, callback):
+        """Epoch değişince çağrılacak fonksiyon (Örn: rota önbelleğini temizle)."""
+        self._callbacks.append(callback)
+
+    def on_graph_reload(self, callback):
+        """Yeni graf canlıya alınınca çağrılacak fonksiyon (Bellek içi graf yeniden yüklenmeli)."""
+        self._graph_callbacks.append(callback)
+
+    def ensure_started(self):
+        """Çalışan event loop içinde dinleyiciyi bir kez başlatır."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def apply(self, client, epoch: int):
+        if epoch <= self.snapshot.epoch:
+            return
+
+        blob = await client.get(BLOB_KEY.format(epoch=epoch))
+        # Araya kaçırılmış epoch girdiyse görüntü eksik kalır; tüketici tam yükleme yapmalı
+        complete = self.snapshot.complete and epoch == self.snapshot.epoch + 1 and blob is not None
+
+        buffer = dict(self.snapshot.weights)
+        if blob:
+            gids, costs, reverse = unpack_weights(blob)
+            buffer.update(zip(gids, zip(costs, reverse)))
+
+        self.snapshot = WeightSnapshot(epoch=epoch, weights=buffer, complete=complete)
+        for callback in self._callbacks:
+            try:
+                callback(epoch)
+            except Exception as e:
+                logger.error(f"Epoch callback hatası: {e}")
+
+    def apply_graph(self, version: int):
+        """Graf değişti: gid'ler yenilendiği için eski ağırlık görüntüsü geçersizdir."""
+        if version <= self.graph_version:
+            return
+        self.graph_version = version
+        self.snapshot = WeightSnapshot(epoch=self.snapshot.epoch, complete=False)
+        for callback in self._graph_callbacks:
+            try:
+                callback(version)
+            except Exception as e:
+                logger.error(f"Graf yenileme callback hatası: {e}")
+
+    async def run(self):
+        while True:
+            try:
+                client = self._redis_factory()
+                # Başlangıçta mevcut epoch'u al (Önceki güncellemeler DB'de zaten var)
+                current = await client.get(EPOCH_KEY)
+                if current and int(current) > self.snapshot.epoch:
+                    self.snapshot = WeightSnapshot(epoch=int(current), complete=False)
+                version = await client.get(GRAPH_VERSION_KEY)
+                if version and self.graph_version == 0:
+                    self.graph_version = int(version)
+
+                pubsub = client.pubsub()
+                await pubsub.subscribe(CHANNEL, GRAPH_CHANNEL)
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    channel = message["channel"]
+                    if isinstance(channel, bytes):
+                        channel = channel.decode()
+                    payload = json.loads(message["data"])
+                    if channel == GRAPH_CHANNEL:
+                        self.apply_graph(int(payload["version"]))
+                    else:
+                        await self.apply(client, int(payload["epoch"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Trafik epoch dinleyicisi koptu, 10sn sonra tekrar: {e}")
+                await asyncio.sleep(10)
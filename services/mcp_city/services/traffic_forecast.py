@@ -0,0 +1,161 @@
+import math
+import os
+import struct
+from datetime import datetime
+from zoneinfo import ZoneInfo
+import numpy as np
+from services.traffic_history import NO_DATA
+
+# --- TRAFİK TAHMİNİ (traffic_monitor) ---
+# Segment başına iki durum, hepsi segment sırasına (ordinal, traffic_history ile aynı) göre NumPy dizisi:
+#   profile[saat_dilimi, ordinal]: Haftanın her saati için beklenen hız (Yavaş EWMA, ~2 hafta hafıza)
+#   ratio[ordinal]: Şu anki sapma (Gözlenen / profil, hızlı EWMA). Kaza, yağmur, maç vb.
+# Tahmin(t + h) = profil(t + h) * (1 + (ratio - 1) * e^(-h / tau)): Sapma zamanla profile döner.
+# Güncelleme ve tüm ufukların tahmini tüm segmentler üzerinde tek vektörel geçiş (100k segment ~ms).
+LOCAL_TZ = ZoneInfo("Europe/Istanbul")
+SLOTS = 168                     # Haftanın saatleri (Pazartesi 00-01 = 0)
+HORIZONS_MIN = (15, 30, 60)
+PROFILE_ALPHA = 0.02            # Döngü başına (Saatte ~30 gözlem: bir hafta önceki aynı saatin ağırlığı ~%55)
+RATIO_ALPHA = 0.3               # Sapma yumuşatma (~3 döngü)
+LEVEL_ALPHA = 0.1               # Profili henüz olmayan segmentler için ortalama hız
+ANOMALY_TAU_MIN = 40.0          # Sapmanın profile dönüş süresi
+MIN_SPEED, MAX_SPEED = 3.0, 254.0   # build_snapshot alt sınırı / paketli geçmiş üst sınırı
+
+FORECAST_KEY = "traffic:forecast"   # Redis: Son tahmin (pack_forecast)
+FORECAST_TTL = 900
+
+
+def week_position(when: datetime) -> float:
+    """Haftadaki konum (Saat, yerel). Pazartesi 07:45 -> 7.75"""
+    local = when.astimezone(LOCAL_TZ)
+    return local.weekday() * 24 + local.hour + local.minute / 60 + local.second / 3600
+
+
+class SpeedForecaster:
+    """Mevsimsel profil + sapma durumu. Diziler ordinal sırasında; yeni segmentler sona eklenir."""
+
+    def __init__(self, size: int = 0):
+        self.profile = np.full((SLOTS, size), np.nan, dtype=np.float32)
+        self.ratio = np.ones(size, dtype=np.float32)
+        self.level = np.full(size, np.nan, dtype=np.float32)
+
+    @property
+    def size(self) -> int:
+        return len(self.ratio)
+
+    def _grow(self, size: int):
+        """Yeni segmentler (ordinal sona eklenir): Diziler büyütülür, eski değerler yerinde kalır."""
+        extra = size - self.size
+        if extra <= 0:
+            return
+        self.profile = np.concatenate([self.profile, np.full((SLOTS, extra), np.nan, dtype=np.float32)], axis=1)
+        self.ratio = np.concatenate([self.ratio, np.ones(extra, dtype=np.float32)])
+        self.level = np.concatenate([self.level, np.full(extra, np.nan, dtype=np.float32)])
+
+    def _expected(self, position: float) -> np.ndarray:
+        """Konumdaki beklenen hız: Komşu iki saat diliminin merkezleri arasında doğrusal. Profil yoksa ortalama hız."""
+        x = position - 0.5
+        base = math.floor(x)
+        w = np.float32(x - base)
+        p0, p1 = self.profile[base % SLOTS], self.profile[(base + 1) % SLOTS]
+        blended = p0 * (1 - w) + p1 * w
+        blended = np.where(np.isnan(p0), p1, np.where(np.isnan(p1), p0, blended))
+        return np.where(np.isnan(blended), self.level, blended)
+
+    def update(self, when: datetime, speeds: np.ndarray):
+        """Bir döngünün gözlemi. speeds: float32 [ordinal] km/s (NaN: Veri yok)."""
+        speeds = np.asarray(speeds, dtype=np.float32)
+        self._grow(len(speeds))
+        if len(speeds) < self.size:
+            speeds = np.concatenate([speeds, np.full(self.size - len(speeds), np.nan, dtype=np.float32)])
+        seen = ~np.isnan(speeds)
+        position = week_position(when)
+
+        expected = self._expected(position)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            observed_ratio = speeds / expected
+        valid = seen & (expected > 0)
+        self.ratio = np.where(valid, self.ratio + RATIO_ALPHA * (observed_ratio - self.ratio), self.ratio)
+
+        self.level = np.where(seen, np.where(np.isnan(self.level), speeds,
+                                             self.level + LEVEL_ALPHA * (speeds - self.level)), self.level)
+        row = self.profile[int(position) % SLOTS]
+        row[:] = np.where(seen, np.where(np.isnan(row), speeds, row + PROFILE_ALPHA * (speeds - row)), row)
+
+    def forecast(self, when: datetime, horizons: tuple = HORIZONS_MIN) -> np.ndarray:
+        """Tahmini hızlar: float32 [ufuk, ordinal] (NaN: Segment hiç görülmedi)."""
+        position = week_position(when)
+        out = np.empty((len(horizons), self.size), dtype=np.float32)
+        for i, minutes in enumerate(horizons):
+            decay = np.float32(math.exp(-minutes / ANOMALY_TAU_MIN))
+            out[i] = self._expected(position + minutes / 60) * (1 + (self.ratio - 1) * decay)
+        return np.clip(out, MIN_SPEED, MAX_SPEED, out=out)
+
+    def save(self, path: str):
+        """Durum dosyaya (Yeniden başlatmada geçmişten ısınmaya gerek kalmaz). Yazım atomik."""
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, profile=self.profile, ratio=self.ratio, level=self.level)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "SpeedForecaster | None":
+        try:
+            with np.load(path) as data:
+                forecaster = cls()
+                forecaster.profile, forecaster.ratio, forecaster.level = data["profile"], data["ratio"], data["level"]
+        except (OSError, KeyError, ValueError):
+            return None
+        if forecaster.profile.shape != (SLOTS, forecaster.size):
+            return None
+        return forecaster
+
+
+def unpack_history_speeds(blob: bytes) -> np.ndarray:
+    """traffic_history paketli satırı -> float32 [ordinal] (NaN: Veri yok). Geçmişten ısınmak için."""
+    packed = np.frombuffer(blob, dtype=np.uint8)
+    return np.where(packed == NO_DATA, np.nan, packed).astype(np.float32)
+
+
+class OrdinalLookup:
+    """Snapshot {seg_id: hız} -> ordinal indeksli dizi (Vektörel). Ordinal sözlüğü büyüdükçe yeniden kurulur."""
+
+    def __init__(self):
+        self._count = -1
+        self._seg_ids = self._ordinals = None
+        self._size = 0
+
+    def speeds(self, snapshot: dict, ordinals: dict) -> np.ndarray:
+        if len(ordinals) != self._count:
+            seg_ids = np.fromiter(ordinals.keys(), dtype=np.int64, count=len(ordinals))
+            values = np.fromiter(ordinals.values(), dtype=np.int64, count=len(ordinals))
+            order = np.argsort(seg_ids)
+            self._seg_ids, self._ordinals = seg_ids[order], values[order]
+            self._size = int(values.max()) + 1 if len(values) else 0
+            self._count = len(ordinals)
+        out = np.full(self._size, np.nan, dtype=np.float32)
+        if not snapshot or not self._size:
+            return out
+        seg_ids = np.fromiter(snapshot.keys(), dtype=np.int64, count=len(snapshot))
+        values = np.fromiter(snapshot.values(), dtype=np.float32, count=len(snapshot))
+        idx = np.searchsorted(self._seg_ids, seg_ids)
+        idx[idx >= len(self._seg_ids)] = 0
+        known = self._seg_ids[idx] == seg_ids
+        out[self._ordinals[idx[known]]] = values[known]
+        return out
+
+
+def pack_forecast(captured_at: datetime, horizons: tuple, speeds: np.ndarray) -> bytes:
+    """[zaman:f64][ufuk sayısı:uint32][ordinal sayısı:uint32][ufuklar:uint16 * k][hız:uint8 * k * n] (255: Veri yok)"""
+    packed = np.where(np.isnan(speeds), NO_DATA, np.rint(speeds)).astype(np.uint8)
+    header = struct.pack("<dII", captured_at.timestamp(), len(horizons), speeds.shape[1])
+    return header + np.asarray(horizons, dtype=np.uint16).tobytes() + packed.tobytes()
+
+
+def unpack_forecast(blob: bytes) -> tuple:
+    """pack_forecast'in tersi: (zaman damgası, ufuklar (dk), uint8 hızlar [ufuk, ordinal])."""
+    captured_at, count, size = struct.unpack_from("<dII", blob, 0)
+    offset = struct.calcsize("<dII")
+    horizons = np.frombuffer(blob, dtype=np.uint16, count=count, offset=offset)
+    speeds = np.frombuffer(blob, dtype=np.uint8, count=count * size, offset=offset + 2 * count)
+    return captured_at, tuple(horizons.tolist()), speeds.reshape(count, size)
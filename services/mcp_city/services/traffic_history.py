@@ -0,0 +1,125 @@
+from array import array
+from datetime import datetime, timedelta, timezone
+import logging
+
+logger = logging.getLogger("TrafficMonitor")
+
+# Paketli formatta "veri yok" işareti (Hızlar 0-254 km/s aralığına sıkıştırılır)
+NO_DATA = 255
+
+
+async def ensure_history_schema(conn):
+    """
+    Geçmiş deposu: Döngü başına TEK satır, hızlar segment sırasına (ordinal) göre paketli bytea.
+    Segment başına satır (~700k satır/gün) yerine günde ~720 satır yazılır.
+    """
+    # Segment ID -> Kalıcı sıra numarası (Paketli dizideki indeks). Asla yeniden numaralanmaz.
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS traffic_segment_ordinals (
+            seg_id INTEGER PRIMARY KEY,
+            ordinal INTEGER NOT NULL UNIQUE
+        );
+    """)
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS traffic_history (
+            captured_at TIMESTAMPTZ NOT NULL,
+            segment_count INTEGER NOT NULL,
+            speeds BYTEA NOT NULL            -- uint8 dizi, speeds[ordinal] = km/s (255: veri yok)
+        ) PARTITION BY RANGE (captured_at);
+    """)
+
+
+def _partition_name(day: datetime) -> str:
+    return f"traffic_history_p{day:%Y%m%d}"
+
+
+async def ensure_partitions(conn, now: datetime, days_ahead: int = 1):
+    """Bugün ve sonraki gün(ler) için günlük partition + BRIN indeks oluşturur."""
+    day = now.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    for i in range(days_ahead + 1):
+        start = day + timedelta(days=i)
+        end = start + timedelta(days=1)
+        name = _partition_name(start)
+        await conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {name} PARTITION OF traffic_history
+            FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}');
+        """)
+        # Zaman sıralı append -> BRIN birkaç sayfayla tüm partition'ı özetler
+        await conn.execute(f"CREATE INDEX IF NOT EXISTS {name}_brin ON {name} USING BRIN (captured_at);")
+
+
+async def drop_old_partitions(conn, now: datetime, retention_days: int) -> int:
+    """Saklama süresini aşan günlük partition'ları siler (DELETE değil DROP: vacuum yükü yok)."""
+    cutoff = _partition_name(now.astimezone(timezone.utc) - timedelta(days=retention_days))
+    rows = await conn.fetch("""
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = 'traffic_history';
+    """)
+    dropped = 0
+    for r in rows:
+        # İsimler sabit genişlikte (YYYYMMDD) olduğu için string karşılaştırma tarih sırasıdır
+        if r["relname"] < cutoff:
+            await conn.execute(f"DROP TABLE IF EXISTS {r['relname']};")
+            dropped += 1
+    return dropped
+
+
+async def load_ordinals(conn) -> dict:
+    rows = await conn.fetch("SELECT seg_id, ordinal FROM traffic_segment_ordinals;")
+    return {r["seg_id"]: r["ordinal"] for r in rows}
+
+
+async def assign_ordinals(conn, ordinals: dict, seg_ids) -> dict:
+    """Yeni görülen segmentlere dizinin sonuna eklenecek şekilde sıra numarası verir."""
+    new_ids = sorted(s for s in seg_ids if s not in ordinals)
+    if not new_ids:
+        return ordinals
+
+    start = max(ordinals.values(), default=-1) + 1
+    records = [(seg_id, start + i) for i, seg_id in enumerate(new_ids)]
+    await conn.executemany("""
+        INSERT INTO traffic_segment_ordinals (seg_id, ordinal) VALUES ($1, $2)
+        ON CONFLICT DO NOTHING;
+    """, records)
+    # Başka bir süreç araya girdiyse DB'deki hali esas al
+    return await load_ordinals(conn)
+
+
+def pack_speeds(snapshot: dict, ordinals: dict) -> bytes:
+    """{seg_id: hız} -> ordinal indeksli uint8 dizi."""
+    size = max(ordinals.values(), default=-1) + 1
+    packed = array("B", [NO_DATA]) * size
+    for seg_id, speed in snapshot.items():
+        idx = ordinals.get(seg_id)
+        if idx is not None:
+            packed[idx] = max(0, min(int(speed), NO_DATA - 1))
+    return packed.tobytes()
+
+
+def unpack_speeds(blob: bytes) -> array:
+    """Paketli diziyi geri açar. Değer NO_DATA ise o döngüde segment için veri yoktur."""
+    speeds = array("B")
+    speeds.frombytes(blob)
+    return speeds
+
+
+async def append_history(conn, captured_at: datetime, snapshot: dict, ordinals: dict) -> dict:
+    """Döngünün hızlarını tek satır olarak geçmişe ekler. Güncel ordinal sözlüğünü döner."""
+    ordinals = await assign_ordinals(conn, ordinals, snapshot.keys())
+    await conn.execute(
+        "INSERT INTO traffic_history (captured_at, segment_count, speeds) VALUES ($1, $2, $3);",
+        captured_at, len(snapshot), pack_speeds(snapshot, ordinals)
+    )
+    return ordinals
+
+
+async def iter_history(conn, since: datetime):
+    """since'ten bu yana paketli satırlar, zaman sıralı. Sunucu tarafı imleç: Bellekte sadece bir parti durur."""
+    async with conn.transaction():
+        async for r in conn.cursor(
+            "SELECT captured_at, speeds FROM traffic_history WHERE captured_at >= $1 ORDER BY captured_at;",
+            since, prefetch=100,
+        ):
+            yield r["captured_at"], r["speeds"]
@@ -1,3 +1,5 @@
+import hashlib
+import json
 import redis
 from .config import settings
 from logger import log
@@ -15,10 +17,17 @@ class RedisCache:
                     db=settings.REDIS_DB,
                     decode_responses=True # String olarak okumak için önemli
                 )
+                # Paketli ikili veriler (rota kenar listesi) için çözümsüz istemci
+                cls._instance.raw_client = redis.Redis(
+                    host=settings.REDIS_HOST,
+                    port=settings.REDIS_PORT,
+                    db=settings.REDIS_DB,
+                )
                 log.info("✅ Redis Bağlantısı Başarılı")
             except Exception as e:
                 log.error(f"❌ Redis Bağlantı Hatası: {e}")
                 cls._instance.client = None
+                cls._instance.raw_client = None
         return cls._instance
 
     def set_route(self, polyline: str):
@@ -34,5 +43,32 @@ class RedisCache:
             return self.client.get("latest_route")
         return None
 
+    @staticmethod
+    def _eta_key(polyline: str) -> str:
+        # Polyline çok uzun olabilir, anahtar olarak hash'ini kullanıyoruz
+        return "route_eta:" + hashlib.sha1(polyline.encode("utf-8")).hexdigest()
+
+    def set_eta_profile(self, polyline: str, profile: list):
+        """Rotanın zaman profilini [(oran, saniye), ...] polyline'a bağlı saklar (1 saat ömürlü)."""
+        if self.client and profile:
+            self.client.set(self._eta_key(polyline), json.dumps(profile), ex=3600)
+
+    def get_eta_profile(self, polyline: str):
+        """Polyline için kaydedilmiş zaman profilini getirir."""
+        if self.client:
+            raw = self.client.get(self._eta_key(polyline))
+            return json.loads(raw) if raw else None
+        return None
+
+    def set_route_edges(self, route_id: str, blob: bytes, ttl: int):
+        """Yerel rotanın paketli kenar listesi (Yeniden rotalama için)."""
+        if self.raw_client:
+            self.raw_client.set(f"route_edges:{route_id}", blob, ex=ttl)
+
+    def get_route_edges(self, route_id: str):
+        if self.raw_client:
+            return self.raw_client.get(f"route_edges:{route_id}")
+        return None
+
 # Singleton instance
 redis_store = RedisCache()
\ No newline at end of file
@@ -15,10 +15,27 @@ class Settings(BaseSettings):
         "https://lz4.overpass-api.de/api/interpreter",   # Yedek Mirror
         "https://maps.mail.ru/osm/tools/overpass/api/interpreter" # Rus Mirror (Bazen hayat kurtarır)
     ]
+
+    # --- OVERPASS YARIŞ (HEDGING) AYARLARI ---
+    OVERPASS_HEDGE_DELAY: float = 2.0        # İlk mirror bu kadar sürede dönmezse sıradakini de başlat
+    OVERPASS_MAX_PARALLEL: int = 3           # Aynı anda en fazla kaç mirror yarışsın
+    OVERPASS_REQUEST_TIMEOUT: float = 50.0   # Mirror başına client timeout (sunucu timeout'u 45sn)
+    OVERPASS_CIRCUIT_COOLDOWN: int = 300     # 429/504 dönen mirror kaç saniye atlansın
+    OVERPASS_HEALTH_ALPHA: float = 0.3       # Kayan ortalama (EWMA) ağırlığı
+
     HERE_ROUTING_URL: str = "https://router.hereapi.com/v8/routes"
     GOOGLE_PLACES_URL: str = "https://maps.googleapis.com/maps/api/place/textsearch/json"
     OPENWEATHER_URL: str = "https://api.openweathermap.org/data/3.0/onecall"
 
+    # --- HAVA DURUMU FAN-OUT AYARLARI ---
+    # Uzun rotalarda 25+ nokta aynı anda sorgulanınca OpenWeather 429 atıyor.
+    WEATHER_MAX_CONCURRENCY: int = 5   # Aynı anda en fazla kaç istek
+    WEATHER_REQUEST_TIMEOUT: float = 8.0  # İstek başına timeout (saniye)
+    WEATHER_MAX_RETRIES: int = 3       # 429/5xx için tekrar sayısı
+    WEATHER_RETRY_BASE_DELAY: float = 0.5  # Üstel bekleme tabanı (saniye)
+    WEATHER_GRID_DEG: float = 0.25     # Hava durumu hücre boyu (~25 km). Aynı hücre = tek istek
+    WEATHER_DEFAULT_SPEED_KMH: float = 80.0  # Rota süresi bilinmiyorsa ETA için ortalama hız
+
     # --- OSM TAG MAPPER (Sihirli Sözlük) ---
     # LLM'in gönderdiği basit kategoriyi OSM sorgusuna çevirir
     OSM_TAG_MAP: dict = {
@@ -30,6 +47,83 @@ class Settings(BaseSettings):
         "school": ['"amenity"="school"', '"amenity"="university"']
     }
 
+    # --- BÖLGELER (Yerel rotalama yapılan şehirler) ---
+    # Her bölgenin grafı ayrı şemada durur (Kendi başına kurulur ve sorgulanır).
+    # polygon: [[lon, lat], ...]. traffic_feed: Canlı trafik kaynağı (Yoksa statik hızlar kullanılır)
+    REGIONS: dict = {
+        "istanbul": {
+            "schema": "public",
+            "polygon": [[28.50, 40.80], [29.50, 40.80], [29.50, 41.30], [28.50, 41.30]],
+            "traffic_feed": "https://tkmservices.ibb.gov.tr/web/api/TrafficData/v4/SegmentData",
+            "osm_file": "/app/data/istanbul_pilot.osm",
+        },
+        # Pilot: yol.txt (Türkiye PBF'inden bölge kutusuyla kırpılarak kurulur)
+        "samsun": {
+            "schema": "samsun",
+            "polygon": [[35.95, 41.10], [36.25, 41.05], [36.80, 41.10], [36.80, 41.40], [36.40, 41.45], [35.95, 41.40]],
+            "traffic_feed": None,
+            "osm_file": "/app/data/turkey-latest.osm.pbf",
+            "clip_osm": True,   # Dosya bölgeden büyük: Sadece poligon kutusundaki düğümler alınır
+        },
+    }
+
+    # --- YEREL ROTALAMA MOTORU ---
+    # "pgrouting": Her rota pgr_dijkstra. "memory": Graf paylaşımlı bellekte, rota süreç havuzunda (A*)
+    ROUTING_ENGINE: str = "pgrouting"
+    ROUTING_WORKERS: int = 0   # 0: CPU sayısı kadar rota süreci
+
+    # --- YENİDEN ROTALAMA (reroute) ---
+    REROUTE_TTL: int = 10800                # Rota kenar listesi kaç saniye saklanır
+    REROUTE_SEARCH_SECONDS: float = 300.0   # Rotaya geri bağlanma aramasının süre bütçesi
+    REROUTE_SEARCH_RADIUS_M: float = 2000.0 # pgRouting motorunda aramanın yapıldığı alt graf yarıçapı
+
+    # --- MAÇ / ETKİNLİK TRAFİK KATMANI ---
+    # sports_matches.stadium ve city_events.venue metni names'teki bir ifadeyi içeriyorsa o mekândır.
+    # Mekânın radius_m içindeki kenarların süresi etkinlik penceresinde çarpanla artırılır (ways'e yazılmaz).
+    EVENT_VENUES: dict = {
+        "sukru_saracoglu": {
+            "region": "istanbul", "point": [29.0369, 40.9876], "radius_m": 1200,
+            "names": ["şükrü saracoğlu", "chobani stad", "ülker stad", "fenerbahçe stad"],
+        },
+        "rams_park": {
+            "region": "istanbul", "point": [28.9908, 41.1034], "radius_m": 1500,
+            "names": ["rams park", "ali sami yen", "nef stad", "türk telekom stad"],
+        },
+        "besiktas_stadyumu": {
+            "region": "istanbul", "point": [28.9946, 41.0394], "radius_m": 1000,
+            "names": ["tüpraş stad", "vodafone park", "beşiktaş stad", "inönü"],
+        },
+        "ataturk_olimpiyat": {
+            "region": "istanbul", "point": [28.7657, 41.0745], "radius_m": 1500,
+            "names": ["atatürk olimpiyat"],
+        },
+        "ulker_sports_arena": {
+            "region": "istanbul", "point": [29.0935, 40.9994], "radius_m": 800,
+            "names": ["ülker sports arena", "ülker spor ve etkinlik"],
+        },
+        "sinan_erdem": {
+            "region": "istanbul", "point": [28.8478, 40.9900], "radius_m": 800,
+            "names": ["sinan erdem"],
+        },
+        "zorlu_psm": {
+            "region": "istanbul", "point": [29.0171, 41.0672], "radius_m": 600,
+            "names": ["zorlu"],
+        },
+        "harbiye_acikhava": {
+            "region": "istanbul", "point": [28.9905, 41.0455], "radius_m": 600,
+            "names": ["harbiye", "cemil topuzlu"],
+        },
+        "samsun_19_mayis": {
+            "region": "samsun", "point": [36.4553, 41.2325], "radius_m": 1000,
+            "names": ["samsun stad", "19 mayıs stad"],
+        },
+    }
+    EVENT_IMPACT_FACTORS: dict = {1: 1.15, 2: 1.35, 3: 1.8}  # sports_matches.traffic_impact_level -> süre çarpanı
+    CITY_EVENT_FACTOR: float = 1.2        # city_events (Konser, tiyatro vb.)
+    EVENT_WINDOW_BEFORE_MIN: int = 120    # Başlamadan bu kadar önce (Seyirci gelişi)
+    EVENT_WINDOW_AFTER_MIN: int = 180     # Başladıktan bu kadar sonra (Maç/etkinlik + dağılma)
+    EVENT_REFRESH_SECONDS: int = 600      # Etkinlik tabloları kaç saniyede bir okunur
+
     REDIS_HOST: str = "geo_redis" 
     REDIS_PORT: int = 6379
     REDIS_DB: int = 0
@@ -0,0 +1,82 @@
+import asyncio
+import random
+import httpx
+from logger import log
+
+# Tekrar denemeye değer HTTP kodları (Rate limit + sunucu tarafı hatalar)
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+def _retry_delay(attempt: int, base_delay: float, retry_after: str | None = None,
+                 max_retry_after: float | None = None) -> float | None:
+    """
+    Üstel bekleme + jitter. Sunucu 'Retry-After' verdiyse ona uyarız.
+    Retry-After max_retry_after'dan uzunsa None: Beklemeye değmez (bounded_gather slotu kilitlenmesin).
+    """
+    if retry_after:
+        try:
+            wait = float(retry_after)
+        except ValueError:
+            wait = None
+        if wait is not None:
+            return None if max_retry_after is not None and wait > max_retry_after else max(wait, 0.0)
+    delay = base_delay * (2 ** attempt)
+    return delay + random.uniform(0, delay)
+
+
+async def fetch_json_with_retry(
+    client: httpx.AsyncClient,
+    url: str,
+    params: dict,
+    timeout: float = 10.0,
+    retries: int = 3,
+    base_delay: float = 0.5,
+) -> dict | None:
+    """
+    Tekil GET isteği: İstek başına timeout, 429/5xx için jitter'lı retry.
+    Retry-After istek timeout'undan uzunsa beklenmez, o istekten vazgeçilir.
+    Başarısız olursa None döner (Hata sebebi loglanır, sessizce yutulmaz).
+    """
+    for attempt in range(retries + 1):
+        retry_after = None
+        try:
+            resp = await client.get(url, params=params, timeout=timeout)
+
+            if resp.status_code == 200:
+                return resp.json()
+
+            if resp.status_code not in RETRYABLE_STATUS:
+                log.warning(f"⚠️ [FANOUT] HTTP {resp.status_code} (Tekrar denenmeyecek) - {url}")
+                return None
+
+            retry_after = resp.headers.get("Retry-After")
+            log.warning(f"⚠️ [FANOUT] HTTP {resp.status_code} - Deneme {attempt + 1}/{retries + 1}")
+
+        except (httpx.TimeoutException, httpx.TransportError) as e:
+            log.warning(f"⚠️ [FANOUT] Bağlantı/Timeout ({type(e).__name__}) - Deneme {attempt + 1}/{retries + 1}")
+        except ValueError:
+            log.warning(f"⚠️ [FANOUT] JSON Parse Hatası - {url}")
+            return None
+
+        if attempt < retries:
+            delay = _retry_delay(attempt, base_delay, retry_after, max_retry_after=timeout)
+            if delay is None:
+                log.warning(f"⚠️ [FANOUT] Retry-After {retry_after} sn (Sınır {timeout} sn), vazgeçildi - {url}")
+                return None
+            await asyncio.sleep(delay)
+
+    return None
+
+
+async def bounded_gather(items: list, worker, limit: int = 5) -> list:
+    """
+    asyncio.gather'ın eşzamanlılık limitli hali.
+    'worker' her eleman için çağrılan async fonksiyondur. Sonuç sırası giriş sırasıyla aynıdır.
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def _run(item):
+        async with semaphore:
+            return await worker(item)
+
+    return await asyncio.gather(*(_run(item) for item in items))
@@ -92,7 +92,8 @@ def sample_route_points(encoded_polyline: str = None, geojson_geometry: dict = N
             sampled_points.append({
                 "lat": point_gps.y,
                 "lon": point_gps.x,
-                "km_point": int(current_dist / 1000)
+                "km_point": int(current_dist / 1000),
+                "fraction": current_dist / total_length_m # Rotanın yüzde kaçı (ETA eşlemesi için)
             })
             current_dist += interval_m
             
@@ -103,7 +104,8 @@ def sample_route_points(encoded_polyline: str = None, geojson_geometry: dict = N
             sampled_points.append({
                 "lat": end_point_gps.y,
                 "lon": end_point_gps.x,
-                "km_point": int(total_length_m / 1000)
+                "km_point": int(total_length_m / 1000),
+                "fraction": 1.0
             })
 
         log.info(f"📏 [GEO] Rota {int(total_length_m/1000)} km, {len(sampled_points)} analiz noktasına bölündü.")
@@ -113,6 +115,53 @@ def sample_route_points(encoded_polyline: str = None, geojson_geometry: dict = N
         log.error(f"❌ Geometri Hatası (sample_route_points): {e}")
         return []
 
+def eta_profile_from_spans(encoded_polyline: str, spans: list) -> list:
+    """
+    HERE 'spans=duration' çıktısını [(rota_oranı, kümülatif_saniye), ...] profiline çevirir.
+    Span 'offset' değeri polyline'daki nokta indeksidir, 'duration' o span'in süresidir.
+    """
+    line_coords = _get_line_coords(encoded_polyline)
+    if len(line_coords) < 2 or not spans:
+        return []
+
+    try:
+        # Her noktaya kadar olan kümülatif uzunluk (sample_route_points ile aynı metrik)
+        coords_m = list(transform(project_to_meters, LineString(line_coords)).coords)
+        cumulative = [0.0]
+        for (x1, y1), (x2, y2) in zip(coords_m, coords_m[1:]):
+            cumulative.append(cumulative[-1] + math.hypot(x2 - x1, y2 - y1))
+
+        total_m = cumulative[-1]
+        if total_m <= 0:
+            return []
+
+        profile = []
+        elapsed = 0.0
+        for span in spans:
+            offset = min(int(span.get("offset", 0)), len(cumulative) - 1)
+            profile.append((cumulative[offset] / total_m, elapsed))
+            elapsed += float(span.get("duration", 0))
+
+        profile.append((1.0, elapsed))
+        return profile
+
+    except Exception as e:
+        log.error(f"❌ Geometri Hatası (eta_profile_from_spans): {e}")
+        return []
+
+def eta_at_fraction(profile: list, fraction: float) -> float | None:
+    """Profil üzerinde lineer interpolasyon: rotanın 'fraction' kadarına kaç saniyede varılır?"""
+    if not profile:
+        return None
+
+    for (f1, t1), (f2, t2) in zip(profile, profile[1:]):
+        if f1 <= fraction <= f2:
+            if f2 == f1:
+                return t1
+            return t1 + (t2 - t1) * (fraction - f1) / (f2 - f1)
+
+    return profile[-1][1] if fraction > profile[-1][0] else profile[0][1]
+
 def filter_places_by_polyline(places: list, encoded_polyline: str = None, geojson_geometry: dict = None) -> list:
     """
     Mekanları rotaya olan uzaklığına göre etiketler.
@@ -4,7 +4,10 @@ from loguru import logger as log
 from .config import settings
 from .models import RouteRequest
 from .cache import redis_store
-from .local_routing import is_in_service_area, get_local_route
+from .local_routing import get_local_route
+from .regions import regions
+from .geometry import eta_profile_from_spans
+from .route_store import StoredRoute, save_route
 
 # --- 1. KOORDİNAT ÇÖZÜCÜ ---
 async def _resolve_coordinates(location: str) -> str | None:
@@ -85,7 +88,72 @@ async def get_location_name(lat, lon):
         pass
     return "Bilinmeyen Konum"
 
-# --- 3. ANA ROTA HANDLER (HİBRİT YAPININ KALBİ) ---
+# --- 3. YEREL ROTA ÇIKTISI (get_route_data ve reroute ortak) ---
+def build_local_response(local_result: dict, region, lat1, lon1, lat2, lon2, origin: str, destination: str) -> dict:
+    # 🔥🔥🔥 FİNAL DÜZELTME: MULTILINESTRING DESTEĞİ 🔥🔥🔥
+    encoded_poly = "LOCAL_ROUTE" # Varsayılan değer
+
+    try:
+        geom = local_result.get("geometry")
+        if geom and "coordinates" in geom:
+            raw_coords = geom["coordinates"]
+            flat_coords = []
+
+            # Durum 1: MultiLineString (İç içe liste gelir: [[[lon, lat],..], [[lon, lat],..]])
+            if geom.get("type") == "MultiLineString":
+                for segment in raw_coords:
+                    flat_coords.extend(segment) # Hepsini tek çizgiye indir
+
+            # Durum 2: LineString (Düz liste gelir: [[lon, lat], [lon, lat]])
+            else:
+                flat_coords = raw_coords
+
+            # GeoJSON [Lon, Lat] verir -> Polyline [Lat, Lon] ister
+            # Ayrıca her ihtimale karşı float'a çeviriyoruz
+            lat_lon_coords = [(float(c[1]), float(c[0])) for c in flat_coords]
+
+            # Artık encode edebiliriz
+            if lat_lon_coords:
+                encoded_poly = flexpolyline.encode(lat_lon_coords)
+
+    except Exception as e:
+        log.error(f"Polyline Encode Hatası: {e}")
+        # Hata olsa bile kod patlamasın, rota bilgisini döndürsün
+
+    # Kenar bazlı süre profili (Weather Shield ETA eşlemesi için). Anahtar polyline: Encode edilemediyse
+    # yazılmaz (Yoksa tüm bu rotalar "LOCAL_ROUTE" anahtarında birbirinin profilini ezer).
+    if encoded_poly != "LOCAL_ROUTE":
+        try:
+            redis_store.set_eta_profile(encoded_poly, local_result.get("eta_profile"))
+        except Exception as e:
+            log.warning(f"⚠️ ETA profili önbelleğe yazılamadı: {e}")
+
+    # Sürücü rotadan çıkarsa (reroute) sadece sapma hesaplansın diye kenar listesi saklanır
+    route_id = None
+    if local_result.get("edges"):
+        route_id = save_route(
+            StoredRoute.from_edges(region.name, local_result["mode"], lat2, lon2, local_result["edges"])
+        )
+
+    return {
+        "source": "GeoIntel_Local_DB",
+        "mesafe_km": local_result["distance_km"], 
+        "sure_dk": local_result["duration_min"],
+        "mode": local_result["mode"],
+
+        # ARTIK ŞİFRELENMİŞ STRING BURAYA GİDİYOR 👇
+        "polyline_encoded": encoded_poly, 
+
+        "geometry": local_result["geometry"], 
+        "analiz_noktalari": {
+            "baslangic": {"coords": [lat1, lon1], "ad": origin},
+            "bitis": {"coords": [lat2, lon2], "ad": destination}
+        },
+        "route_id": route_id,
+        "not": "Bu veri İBB Canlı Trafik ve OSM verileriyle yerel sunucuda hesaplanmıştır."
+    }
+
+# --- 4. ANA ROTA HANDLER (HİBRİT YAPININ KALBİ) ---
 async def get_route_data_handler(origin: str, destination: str) -> dict:
     try:
         # A. Koordinat Çözümleme
@@ -101,60 +169,16 @@ async def get_route_data_handler(origin: str, destination: str) -> dict:
         except ValueError:
              return {"error": "Koordinat formatı hatalı."}
 
-        # B. HİBRİT KARAR MEKANİZMASI: İSTANBUL MU?
-        if is_in_service_area(lat1, lon1) and is_in_service_area(lat2, lon2):
-            log.info(f"🏙️ [GEOINTEL] Yerel Veritabanı Devrede: {origin} -> {destination}")
+        # B. HİBRİT KARAR MEKANİZMASI: İKİ UÇ DA AYNI HİZMET BÖLGESİNDE Mİ?
+        region = regions.find_route(lat1, lon1, lat2, lon2)
+        if region:
+            log.info(f"🏙️ [GEOINTEL] Yerel Veritabanı Devrede ({region.name}): {origin} -> {destination}")
             
             # PostGIS Sorgusu
-            local_result = await get_local_route(lat1, lon1, lat2, lon2, preference="fastest")
+            local_result = await get_local_route(lat1, lon1, lat2, lon2, preference="fastest", region=region)
             
             if local_result:
-                # 🔥🔥🔥 FİNAL DÜZELTME: MULTILINESTRING DESTEĞİ 🔥🔥🔥
-                encoded_poly = "LOCAL_ROUTE" # Varsayılan değer
-                
-                try:
-                    geom = local_result.get("geometry")
-                    if geom and "coordinates" in geom:
-                        raw_coords = geom["coordinates"]
-                        flat_coords = []
-
-                        # Durum 1: MultiLineString (İç içe liste gelir: [[[lon, lat],..], [[lon, lat],..]])
-                        if geom.get("type") == "MultiLineString":
-                            for segment in raw_coords:
-                                flat_coords.extend(segment) # Hepsini tek çizgiye indir
-                        
-                        # Durum 2: LineString (Düz liste gelir: [[lon, lat], [lon, lat]])
-                        else:
-                            flat_coords = raw_coords
-
-                        # GeoJSON [Lon, Lat] verir -> Polyline [Lat, Lon] ister
-                        # Ayrıca her ihtimale karşı float'a çeviriyoruz
-                        lat_lon_coords = [(float(c[1]), float(c[0])) for c in flat_coords]
-                        
-                        # Artık encode edebiliriz
-                        if lat_lon_coords:
-                            encoded_poly = flexpolyline.encode(lat_lon_coords)
-                            
-                except Exception as e:
-                    log.error(f"Polyline Encode Hatası: {e}")
-                    # Hata olsa bile kod patlamasın, rota bilgisini döndürsün
-
-                return {
-                    "source": "GeoIntel_Local_DB",
-                    "mesafe_km": local_result["distance_km"], 
-                    "sure_dk": local_result["duration_min"],
-                    "mode": local_result["mode"],
-                    
-                    # ARTIK ŞİFRELENMİŞ STRING BURAYA GİDİYOR 👇
-                    "polyline_encoded": encoded_poly, 
-                    
-                    "geometry": local_result["geometry"], 
-                    "analiz_noktalari": {
-                        "baslangic": {"coords": [lat1, lon1], "ad": origin},
-                        "bitis": {"coords": [lat2, lon2], "ad": destination}
-                    },
-                    "not": "Bu veri İBB Canlı Trafik ve OSM verileriyle yerel sunucuda hesaplanmıştır."
-                }
+                return build_local_response(local_result, region, lat1, lon1, lat2, lon2, origin, destination)
 
         # C. FALLBACK: HERE MAPS API
         log.info(f"🌍 [HERE API] Dış Hat Rotası: {origin} -> {destination}")
@@ -165,6 +189,7 @@ async def get_route_data_handler(origin: str, destination: str) -> dict:
             "origin": req.origin,
             "destination": req.destination,
             "return": "summary,polyline",
+            "spans": "duration", # Parça bazlı süreler (ETA profili için)
             "apiKey": settings.HERE_API_KEY
         }
 
@@ -180,7 +205,11 @@ async def get_route_data_handler(origin: str, destination: str) -> dict:
                 # Redis Cache
                 try:
                     redis_store.set_route(encoded_polyline)
-                except: pass
+                    redis_store.set_eta_profile(
+                        encoded_polyline, eta_profile_from_spans(encoded_polyline, section.get("spans", []))
+                    )
+                except Exception as e:
+                    log.warning(f"⚠️ Rota/ETA profili önbelleğe yazılamadı: {e}")
                 
                 return {
                     "source": "HERE_Maps_API",
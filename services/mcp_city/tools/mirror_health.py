@@ -0,0 +1,98 @@
+import time
+from logger import log
+from .cache import redis_store
+from .config import settings
+
+# Hiç ölçülmemiş mirror için varsayılan gecikme (saniye)
+DEFAULT_LATENCY = 5.0
+# Redis hata verirse bu kadar saniye ona hiç gitmeyiz (Her istekte bağlantı timeout'u yememek için)
+REDIS_RETRY_AFTER = 30.0
+# Bu kodlar gelirse mirror cooldown süresince devre dışı kalır (Circuit Breaker)
+CIRCUIT_STATUS = {429, 504}
+
+
+class MirrorHealth:
+    """
+    Overpass mirror sağlık skoru: Kayan (EWMA) gecikme + hata oranı + circuit breaker.
+    Veriler Redis'te tutulur ki tüm City Agent kopyaları aynı sıralamayı görsün.
+    Redis yoksa süreç içi sözlüğe düşer.
+    """
+
+    def __init__(self, prefix: str = "overpass:health"):
+        self.prefix = prefix
+        self._local = {}
+        self._redis_retry_at = 0.0
+
+    def _redis(self):
+        """Kullanılabilir Redis client'ı döner. Yakın zamanda hata verdiyse None."""
+        if redis_store.client and time.time() >= self._redis_retry_at:
+            return redis_store.client
+        return None
+
+    def _redis_failed(self, e: Exception):
+        self._redis_retry_at = time.time() + REDIS_RETRY_AFTER
+        log.debug(f"[MIRROR] Redis erişilemedi, {REDIS_RETRY_AFTER}sn yerel skor kullanılacak: {e}")
+
+    def _key(self, url: str) -> str:
+        return f"{self.prefix}:{url}"
+
+    def _load(self, url: str) -> dict:
+        client = self._redis()
+        if client:
+            try:
+                raw = client.hgetall(self._key(url))
+                return {k: float(v) for k, v in raw.items()}
+            except Exception as e:
+                self._redis_failed(e)
+        return dict(self._local.get(url, {}))
+
+    def _save(self, url: str, stats: dict):
+        self._local[url] = stats
+        client = self._redis()
+        if client:
+            try:
+                client.hset(self._key(url), mapping=stats)
+                client.expire(self._key(url), 86400) # 1 gün işlem yoksa sıfırlansın
+            except Exception as e:
+                self._redis_failed(e)
+
+    def record_success(self, url: str, latency: float):
+        stats = self._load(url)
+        alpha = settings.OVERPASS_HEALTH_ALPHA
+        stats["latency"] = (1 - alpha) * stats.get("latency", latency) + alpha * latency
+        stats["error_rate"] = (1 - alpha) * stats.get("error_rate", 0.0)
+        stats["open_until"] = 0.0
+        self._save(url, stats)
+
+    def record_failure(self, url: str, status: int | None = None, latency: float | None = None):
+        stats = self._load(url)
+        alpha = settings.OVERPASS_HEALTH_ALPHA
+        stats["error_rate"] = (1 - alpha) * stats.get("error_rate", 0.0) + alpha
+        if latency is not None:
+            stats["latency"] = (1 - alpha) * stats.get("latency", latency) + alpha * latency
+        if status in CIRCUIT_STATUS:
+            stats["open_until"] = time.time() + settings.OVERPASS_CIRCUIT_COOLDOWN
+            log.warning(f"⛔ [MIRROR] Devre açıldı ({status}): {url} - "
+                        f"{settings.OVERPASS_CIRCUIT_COOLDOWN}sn atlanacak")
+        self._save(url, stats)
+
+    def score(self, stats: dict) -> float:
+        """Düşük skor = daha iyi mirror. Hata oranı gecikmeyi katlar."""
+        return stats.get("latency", DEFAULT_LATENCY) * (1 + 4 * stats.get("error_rate", 0.0))
+
+    def ranked(self, urls: list) -> list:
+        """Devresi açık olmayan mirrorları skora göre sıralar (Eşitlikte config sırası korunur)."""
+        now = time.time()
+        all_stats = {url: self._load(url) for url in urls}
+        closed = [u for u in urls if all_stats[u].get("open_until", 0) <= now]
+
+        if not closed:
+            # Hepsi cooldown'daysa en erken açılacak olanla devam et, hiç denememekten iyidir
+            log.warning("⚠️ [MIRROR] Tüm mirrorların devresi açık, en erken açılan deneniyor.")
+            return sorted(urls, key=lambda u: all_stats[u].get("open_until", 0))
+
+        return sorted(closed, key=lambda u: self.score(all_stats[u]))
+
+
+# Singleton instance
+overpass_health = MirrorHealth()
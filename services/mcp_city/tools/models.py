@@ -65,4 +65,6 @@ class RouteResponse(BaseModel):
     duration_min: float
     polyline: str
     summary: str
-    checkpoints: dict
\ No newline at end of file
+    checkpoints: dict
+    route_id: Optional[str] = None   # Yerel rotalarda: Sapmada reroute aracına verilir
+    rejoined: Optional[bool] = None  # reroute: Eski rotaya geri bağlandı mı
\ No newline at end of file
@@ -1,7 +1,169 @@
+import asyncio
+import time
 import httpx
+import asyncpg
 from logger import log
 from .config import settings
 from .models import OSMRequest
+from .mirror_health import overpass_health
+from .regions import regions
+
+async def _search_local_pois(lat: float, lon: float, tag: str, radius: int) -> list | None:
+    """
+    Yerel PostGIS POI indeksinde arama (ETL: etl/importer_osm.py -> bölge şemasındaki 'pois' tablosu).
+    Arama dairesi yerel kapsama alanının tamamen içindeyse sonuç listesi döner (boş olabilir).
+    Kapsama dışıysa, kategori indekste hiç yoksa (İçeri alınmayan etiket) veya tablo/DB yoksa
+    None döner -> Overpass'a düşülür.
+    """
+    region = regions.find(lat, lon)
+    if region is None:
+        return None
+    schema = region.schema
+
+    try:
+        conn = await asyncpg.connect(settings.DATABASE_URL, timeout=5)
+    except Exception as e:
+        log.warning(f"⚠️ [OSM] Yerel POI DB'ye bağlanılamadı: {e}")
+        return None
+
+    try:
+        covered = await conn.fetchval(f"""
+            SELECT EXISTS (
+                SELECT 1 FROM {schema}.poi_coverage
+                WHERE ST_Covers(the_geom, ST_Buffer(ST_SetSRID(ST_MakePoint($1, $2), 4326)::geography, $3)::geometry)
+            );
+        """, lon, lat, radius)
+        if not covered:
+            return None
+
+        # ST_DWithin (geography indeksi) + KNN sıralama (geometry indeksi)
+        rows = await conn.fetch(f"""
+            SELECT name, category, tag_value, ST_Y(the_geom) AS lat, ST_X(the_geom) AS lon
+            FROM {schema}.pois
+            WHERE (category = $3 OR tag_value = $3)
+              AND ST_DWithin(the_geom::geography, ST_SetSRID(ST_MakePoint($1, $2), 4326)::geography, $4)
+            ORDER BY the_geom <-> ST_SetSRID(ST_MakePoint($1, $2), 4326)
+            LIMIT 10;
+        """, lon, lat, tag, radius)
+        if not rows:
+            known = await conn.fetchval(
+                f"SELECT EXISTS (SELECT 1 FROM {schema}.pois WHERE category = $1 OR tag_value = $1);", tag
+            )
+            if not known:
+                return None
+
+        return [
+            {"isim": r["name"], "tur": r["tag_value"] or r["category"], "lat": r["lat"], "lon": r["lon"]}
+            for r in rows
+        ]
+    except Exception as e:
+        log.warning(f"⚠️ [OSM] Yerel POI sorgusu başarısız: {e}")
+        return None
+    finally:
+        await conn.close()
+
+def _parse_elements(elements: list, tag: str) -> list:
+    """Overpass 'elements' listesini standart yer sözlüklerine çevirir."""
+    places = []
+    for el in elements:
+        tags = el.get("tags", {})
+        name = tags.get("name") or tags.get("name:tr") or tags.get("name:en")
+        
+        if not name: continue
+        
+        found_type = tags.get("amenity") or tags.get("shop") or tags.get("landuse") or tag
+
+        places.append({
+            "isim": name,
+            "tur": found_type,
+            "lat": el.get("lat") or el.get("center", {}).get("lat"),
+            "lon": el.get("lon") or el.get("center", {}).get("lon")
+        })
+    return places
+
+async def _query_mirror(client: httpx.AsyncClient, url: str, query: str, tag: str) -> list | None:
+    """
+    Tek bir mirror'a sorgu atar ve sağlık skorunu günceller.
+    Başarılıysa yer listesi (boş olabilir), hata durumunda None döner.
+    """
+    start = time.monotonic()
+    try:
+        log.info(f"🌍 [OSM] Deneniyor: {url} | Tag: {tag}")
+        # Header ekleyelim ki bot sanıp engellemesinler
+        # --- FIX: data= yerine content= kullanıyoruz (Deprecation Fix) ---
+        resp = await client.post(url, content=query, headers={"Content-Type": "text/plain"})
+        latency = time.monotonic() - start
+
+        if resp.status_code == 200:
+            try:
+                data = resp.json()
+            except Exception:
+                log.warning(f"⚠️ [OSM] JSON Parse Hatası ({url})")
+                overpass_health.record_failure(url, latency=latency)
+                return None
+
+            overpass_health.record_success(url, latency)
+            places = _parse_elements(data.get("elements", []), tag)
+            if not places:
+                log.warning(f"⚠️ [OSM] Sonuç boş döndü ({url})")
+            return places
+
+        if resp.status_code == 429:
+            log.warning(f"⚠️ [OSM] Çok Fazla İstek (429) - {url} bizi banladı, geçiyoruz.")
+        elif resp.status_code == 504:
+            log.warning(f"⚠️ [OSM] Sunucu Zaman Aşımı (504) - {url} çok yavaş.")
+        else:
+            log.warning(f"⚠️ [OSM] HTTP Hata ({resp.status_code}) - {url}")
+        overpass_health.record_failure(url, status=resp.status_code, latency=latency)
+        return None
+
+    except asyncio.CancelledError:
+        # Yarışı kaybetti, sağlık skoruna yansıtmıyoruz
+        raise
+    except Exception as e:
+        log.warning(f"⚠️ [OSM] Bağlantı Hatası ({url}): {e}")
+        overpass_health.record_failure(url, latency=time.monotonic() - start)
+        return None
+
+async def _race_mirrors(client: httpx.AsyncClient, query: str, tag: str) -> list:
+    """
+    Hedged istek: En iyi skorlu mirror'dan başla, OVERPASS_HEDGE_DELAY içinde cevap gelmezse
+    (veya biri hata verirse) sıradakini de yarışa sok. İlk dolu cevap kazanır, kalanlar iptal edilir.
+    """
+    ranked = overpass_health.ranked(settings.OVERPASS_URLS)
+    pending = set()
+    next_idx = 0
+
+    def launch():
+        nonlocal next_idx
+        url = ranked[next_idx]
+        next_idx += 1
+        pending.add(asyncio.create_task(_query_mirror(client, url, query, tag)))
+
+    launch()
+    try:
+        while pending:
+            can_hedge = next_idx < len(ranked) and len(pending) < settings.OVERPASS_MAX_PARALLEL
+            done, _ = await asyncio.wait(
+                pending,
+                timeout=settings.OVERPASS_HEDGE_DELAY if can_hedge else None,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            pending.difference_update(done)
+
+            for task in done:
+                places = task.result()
+                if places:
+                    log.success(f"✅ [OSM] Başarılı - {len(places)} yer bulundu.")
+                    return places
+
+            # Zaman aşımı (hedge) veya başarısız/boş cevap -> sıradaki mirror yarışa girer
+            if next_idx < len(ranked) and len(pending) < settings.OVERPASS_MAX_PARALLEL:
+                launch()
+        return []
+    finally:
+        for task in pending:
+            task.cancel()
 
 async def search_infrastructure_osm_handler(lat: float, lon: float, category: str, radius: int = 2000) -> list:
     """
@@ -14,6 +176,15 @@ async def search_infrastructure_osm_handler(lat: float, lon: float, category: st
         tag = req.category.strip().lower()
         search_radius = 50000 if "airport" in tag else req.radius
 
+        # --- 1. YEREL POI İNDEKSİ (Milisaniyeler) ---
+        local_places = await _search_local_pois(req.lat, req.lon, tag, search_radius)
+        if local_places is not None:
+            if local_places:
+                log.success(f"✅ [OSM] Yerel indeksten {len(local_places)} yer bulundu.")
+                return local_places
+            return [{"warning": f"Aradığın kriterde ('{tag}') bu bölgede sonuç bulunamadı."}]
+
+        # --- 2. FALLBACK: OVERPASS (Yerel kapsama dışı) ---
         # --- OPTİMİZE SORGUSU ---
         # Timeout süresini 45 saniyeye çıkardık.
         # Çok ağır olmaması için en kritik katmanları bıraktık.
@@ -30,65 +201,12 @@ async def search_infrastructure_osm_handler(lat: float, lon: float, category: st
         out center 10;
         """
 
-        async with httpx.AsyncClient(timeout=60.0) as client: # Client timeout sunucudan uzun olmalı
-            last_error = None
-            
-            # Header ekleyelim ki bot sanıp engellemesinler
-            headers = {"Content-Type": "text/plain"}
-
-            for url in settings.OVERPASS_URLS:
-                try:
-                    log.info(f"🌍 [OSM] Deneniyor: {url} | Tag: {tag}")
-                    
-                    # --- FIX: data= yerine content= kullanıyoruz (Deprecation Fix) ---
-                    resp = await client.post(url, content=query, headers=headers)
-                    
-                    if resp.status_code == 200:
-                        try:
-                            data = resp.json()
-                        except:
-                            log.warning(f"⚠️ [OSM] JSON Parse Hatası ({url})")
-                            continue
-
-                        elements = data.get("elements", [])
-                        
-                        if not elements:
-                            log.warning(f"⚠️ [OSM] Sonuç boş döndü ({url}) - Diğerleri deneniyor...")
-                            continue 
-                        
-                        places = []
-                        for el in elements:
-                            tags = el.get("tags", {})
-                            name = tags.get("name") or tags.get("name:tr") or tags.get("name:en")
-                            
-                            if not name: continue
-                            
-                            found_type = tags.get("amenity") or tags.get("shop") or tags.get("landuse") or tag
-
-                            places.append({
-                                "isim": name,
-                                "tur": found_type,
-                                "lat": el.get("lat") or el.get("center", {}).get("lat"),
-                                "lon": el.get("lon") or el.get("center", {}).get("lon")
-                            })
-                        
-                        if places:
-                            log.success(f"✅ [OSM] Başarılı ({url}) - {len(places)} yer bulundu.")
-                            return places[:10]
-                        
-                    elif resp.status_code == 429:
-                        log.warning(f"⚠️ [OSM] Çok Fazla İstek (429) - {url} bizi banladı, geçiyoruz.")
-                    elif resp.status_code == 504:
-                        log.warning(f"⚠️ [OSM] Sunucu Zaman Aşımı (504) - {url} çok yavaş.")
-                    else:
-                        log.warning(f"⚠️ [OSM] HTTP Hata ({resp.status_code}) - {url}")
-                        last_error = f"HTTP {resp.status_code}"
-
-                except Exception as e:
-                    log.warning(f"⚠️ [OSM] Bağlantı Hatası ({url}): {e}")
-                    last_error = str(e)
-            
-            return [{"warning": f"Aradığın kriterde ('{tag}') sonuç alınamadı. (Sunucular yoğun olabilir)"}]
+        async with httpx.AsyncClient(timeout=settings.OVERPASS_REQUEST_TIMEOUT) as client:
+            places = await _race_mirrors(client, query, tag)
+
+        if places:
+            return places[:10]
+        return [{"warning": f"Aradığın kriterde ('{tag}') sonuç alınamadı. (Sunucular yoğun olabilir)"}]
 
     except Exception as e:
         log.error(f"🔥 [OSM] Kritik Hata: {str(e)}")
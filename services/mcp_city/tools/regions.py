@@ -0,0 +1,60 @@
+from dataclasses import dataclass
+from shapely.geometry import Point, Polygon
+from shapely.strtree import STRtree
+from .config import settings
+
+
+@dataclass(frozen=True)
+class Region:
+    """Yerel rotalama yapılan şehir: Sınır poligonu + graf şeması + (varsa) canlı trafik kaynağı."""
+    name: str
+    schema: str
+    polygon: Polygon
+    traffic_feed: str | None = None
+    osm_file: str | None = None
+    clip_osm: bool = False
+
+    @property
+    def clip_bbox(self) -> tuple | None:
+        """OSM kırpma kutusu (min_lon, min_lat, max_lon, max_lat). Dosya zaten bölgeye özelse None."""
+        return self.polygon.bounds if self.clip_osm else None
+
+
+class RegionRegistry:
+    """
+    Bölgeleri STRtree'de tutar. Nokta sorgusu önce kutu indeksinden adayları alır,
+    sonra poligon içinde mi diye bakar (Şehir sayısı artınca da sabit maliyet).
+    """
+
+    def __init__(self, config: dict):
+        self.regions = [
+            Region(
+                name=name,
+                schema=spec["schema"],
+                polygon=Polygon(spec["polygon"]),
+                traffic_feed=spec.get("traffic_feed"),
+                osm_file=spec.get("osm_file"),
+                clip_osm=spec.get("clip_osm", False),
+            )
+            for name, spec in config.items()
+        ]
+        self._by_name = {r.name: r for r in self.regions}
+        self._tree = STRtree([r.polygon for r in self.regions]) if self.regions else None
+
+    def get(self, name: str) -> Region | None:
+        return self._by_name.get(name)
+
+    def find(self, lat: float, lon: float) -> Region | None:
+        if self._tree is None:
+            return None
+        hits = self._tree.query(Point(lon, lat), predicate="intersects")
+        # Çakışan poligonlarda config sırası belirleyici
+        return self.regions[min(hits)] if len(hits) else None
+
+    def find_route(self, lat1: float, lon1: float, lat2: float, lon2: float) -> Region | None:
+        """İki ucu da aynı bölgedeyse o bölge (Bölgeler arası rota yerel grafta yoktur)."""
+        region = self.find(lat1, lon1)
+        return region if region is not None and self.find(lat2, lon2) is region else None
+
+
+regions = RegionRegistry(settings.REGIONS)
@@ -0,0 +1,85 @@
+import json
+import struct
+import uuid
+from dataclasses import dataclass
+import numpy as np
+from .cache import redis_store
+from .config import settings
+
+# --- ROTA KENAR LİSTESİ (reroute için) ---
+# Yerel rotanın düğüm/kenar dizisi route_id ile Redis'te paketli saklanır:
+# [başlık uzunluğu:uint32][JSON başlık][düğüm:int64 * (n+1)][gid:int32 * n][yön:int8 * n][metre:f32 * n][saniye:f32 * n]
+# 1000 kenarlık rota ~21 KB. Sürücü rotadan çıkınca sadece sapma kısmı yeniden hesaplanır.
+_ARRAYS = (("nodes", np.int64, 1), ("gids", np.int32, 0), ("directions", np.int8, 0),
+           ("edge_meters", np.float32, 0), ("edge_seconds", np.float32, 0))
+
+
+@dataclass
+class StoredRoute:
+    region: str
+    preference: str
+    dest_lat: float
+    dest_lon: float
+    nodes: np.ndarray          # Geçilen düğümler (OSM id), kenar sayısı + 1
+    gids: np.ndarray
+    directions: np.ndarray     # 1: ways.the_geom yönünde, -1: ters
+    edge_meters: np.ndarray
+    edge_seconds: np.ndarray
+
+    @classmethod
+    def from_edges(cls, region: str, preference: str, dest_lat: float, dest_lon: float, edges: dict) -> "StoredRoute":
+        return cls(region, preference, dest_lat, dest_lon,
+                   **{name: np.asarray(edges[name], dtype=dtype) for name, dtype, _ in _ARRAYS})
+
+    def remaining(self) -> np.ndarray:
+        """nodes[i]'den varışa kalan maliyet (Rota planlandığı andaki değerler; shortest: metre, diğerleri: saniye)."""
+        costs = self.edge_meters if self.preference == "shortest" else self.edge_seconds
+        return np.concatenate([np.cumsum(costs[::-1], dtype=np.float64)[::-1], [0.0]])
+
+    def suffix(self, index: int) -> dict:
+        """nodes[index]'ten varışa kadar olan kısım (Kenar listesi sözlüğü)."""
+        return {
+            "nodes": self.nodes[index:].tolist(),
+            "gids": self.gids[index:].tolist(),
+            "directions": self.directions[index:].tolist(),
+            "edge_meters": self.edge_meters[index:].astype(float).tolist(),
+            "edge_seconds": self.edge_seconds[index:].astype(float).tolist(),
+        }
+
+    def pack(self) -> bytes:
+        header = json.dumps({
+            "region": self.region, "preference": self.preference,
+            "dest": [self.dest_lat, self.dest_lon], "edges": len(self.gids),
+        }).encode()
+        body = b"".join(np.ascontiguousarray(getattr(self, name), dtype=dtype).tobytes() for name, dtype, _ in _ARRAYS)
+        return struct.pack("<I", len(header)) + header + body
+
+    @classmethod
+    def unpack(cls, blob: bytes) -> "StoredRoute":
+        (header_len,) = struct.unpack_from("<I", blob, 0)
+        header = json.loads(blob[4:4 + header_len])
+        offset = 4 + header_len
+        arrays = {}
+        for name, dtype, extra in _ARRAYS:
+            count = header["edges"] + extra
+            arrays[name] = np.frombuffer(blob, dtype=dtype, count=count, offset=offset)
+            offset += count * np.dtype(dtype).itemsize
+        return cls(header["region"], header["preference"], header["dest"][0], header["dest"][1], **arrays)
+
+
+def save_route(route: StoredRoute) -> str | None:
+    """Dönüş: route_id (Redis yoksa None: Yeniden rotalama tam rotaya düşer)."""
+    route_id = uuid.uuid4().hex[:16]
+    try:
+        redis_store.set_route_edges(route_id, route.pack(), settings.REROUTE_TTL)
+    except Exception:
+        return None
+    return route_id
+
+
+def load_route(route_id: str) -> StoredRoute | None:
+    try:
+        blob = redis_store.get_route_edges(route_id)
+    except Exception:
+        return None
+    return StoredRoute.unpack(blob) if blob else None
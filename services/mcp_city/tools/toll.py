@@ -1,18 +1,143 @@
 import json
+import math
 import os
+from shapely import affinity
+from shapely.geometry import Point, LineString
+from shapely.strtree import STRtree
+from logger import log
+from .cache import redis_store
+from .geometry import _get_line_coords
+
+# Bir üst klasöre çık (tools -> mcp_city) sonra data'ya gir
+TOLL_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "toll_prices.json")
+
+# Dosya içeriği + mekansal indeks önbelleği (mtime değişince yeniden yüklenir)
+_TOLL_CACHE = {"mtime": None, "data": None, "index": None}
+
+
+def _build_toll_index(data: dict) -> dict:
+    """
+    Köprü/tünel/otoyol kayıtlarını STRtree'ye koyar.
+    Her 'geo' noktası yarıçapı kadar tamponlanır; indeksteki her geometri (kayıt, nokta_no) eşine bağlanır.
+    """
+    entries, geoms, owners = [], [], []
+    for kind, items in (("bridge", data.get("bridges", [])), ("highway", data.get("highways", []))):
+        for item in items:
+            geo = item.get("geo")
+            if not geo or not geo.get("points"):
+                continue
+            entry_idx = len(entries)
+            entries.append({"kind": kind, "item": item})
+            for point_no, (lat, lon) in enumerate(geo["points"]):
+                # Metre -> derece (Boylam enleme göre daralır)
+                r_lat = geo.get("radius_m", 500) / 111000
+                r_lon = r_lat / max(math.cos(math.radians(lat)), 0.1)
+                circle = Point(lon, lat).buffer(1, quad_segs=8)
+                geoms.append(affinity.scale(circle, xfact=r_lon, yfact=r_lat, origin=(lon, lat)))
+                owners.append((entry_idx, point_no))
+
+    return {"tree": STRtree(geoms) if geoms else None, "entries": entries, "owners": owners}
+
 
 # Veriyi yükleyen yardımcı fonksiyon (Dosya içinde gizli kalabilir)
 def _load_toll_data():
     try:
-        # Bir üst klasöre çık (tools -> mcp_city) sonra data'ya gir
-        base_dir = os.path.dirname(os.path.dirname(__file__))
-        file_path = os.path.join(base_dir, "data", "toll_prices.json")
-        
-        with open(file_path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        mtime = os.path.getmtime(TOLL_FILE)
+        if _TOLL_CACHE["mtime"] != mtime:
+            with open(TOLL_FILE, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            _TOLL_CACHE.update(mtime=mtime, data=data, index=_build_toll_index(data))
+            log.info(f"🛣️ [TOLL] Ücret tablosu yüklendi ({len(_TOLL_CACHE['index']['entries'])} konumlu kayıt)")
+        return _TOLL_CACHE["data"]
     except Exception as e:
         return {"error": f"Veri okunamadı: {str(e)}"}
 
+
+def _heading_matches(route_line: LineString, lon: float, lat: float, heading: str | None) -> bool:
+    """Tek yönlü ücretlerde rotanın geçiş noktasındaki doğu/batı yönünü kontrol eder."""
+    if not heading:
+        return True
+    s = route_line.project(Point(lon, lat))
+    before = route_line.interpolate(max(s - 0.01, 0))
+    after = route_line.interpolate(min(s + 0.01, route_line.length))
+    going_west = after.x < before.x
+    return going_west if heading == "west" else not going_west
+
+
+async def estimate_route_tolls_handler(polyline: str = None) -> dict:
+    """
+    Rota çizgisini ücret indeksiyle tek seferde kesiştirir ve toplam geçiş ücretini hesaplar.
+    Köprü/tünel: Noktalardan biri rotaya değerse. Otoyol: Giriş ve çıkış gişelerinin ikisi de rotadaysa.
+    """
+    data = _load_toll_data()
+    if "error" in data:
+        return {"error": data["error"]}
+
+    if not polyline:
+        # Polyline verilmediyse son hesaplanan rotayı kullan
+        try:
+            polyline = redis_store.get_route()
+        except Exception:
+            polyline = None
+    if not polyline:
+        return {"error": "Rota verisi (polyline) eksik. Önce get_route_data ile rota hesapla."}
+
+    line_coords = _get_line_coords(polyline)
+    if len(line_coords) < 2:
+        return {"error": "Rota geometrisi çözülemedi."}
+
+    route_line = LineString(line_coords)
+    index = _TOLL_CACHE["index"]
+    if not index["tree"]:
+        return {"error": "Ücret tablosunda konum bilgisi yok."}
+
+    # 1. Tek geçiş: Rotaya değen tüm gişe/köprü tamponları
+    hits = {}
+    for geom_idx in index["tree"].query(route_line, predicate="intersects"):
+        entry_idx, point_no = index["owners"][int(geom_idx)]
+        hits.setdefault(entry_idx, set()).add(point_no)
+
+    # 2. Kural kontrolü (Otoyolda tüm gişeler, köprüde yön)
+    matched = {}
+    for entry_idx, points_hit in hits.items():
+        entry = index["entries"][entry_idx]
+        item, geo = entry["item"], entry["item"]["geo"]
+
+        if geo.get("type") == "gates" and len(points_hit) < len(geo["points"]):
+            continue
+
+        if geo.get("charged_heading"):
+            lat, lon = geo["points"][min(points_hit)]
+            if not _heading_matches(route_line, lon, lat, geo["charged_heading"]):
+                continue
+
+        matched[item["name"]] = entry
+
+    # 3. Paket fiyatlar: Başka bir kaydın içinde olanları düş (Örn: O-5 Tamamı Osmangazi'yi içerir)
+    for entry in list(matched.values()):
+        for included in entry["item"]["geo"].get("includes", []):
+            matched.pop(included, None)
+
+    crossings = [
+        {
+            "ad": e["item"]["name"],
+            "tur": "Köprü/Tünel" if e["kind"] == "bridge" else "Otoyol",
+            "ucret_tl": e["item"]["price_tl"],
+            "not": e["item"].get("direction") or e["item"].get("note", "")
+        }
+        for e in matched.values()
+    ]
+    total = round(sum(c["ucret_tl"] for c in crossings), 2)
+
+    log.success(f"✅ [TOLL] Rota üzerinde {len(crossings)} ücretli geçiş: {total} TL")
+    return {
+        "toplam_ucret_tl": total,
+        "gecisler": crossings,
+        "arac_sinifi": data.get("metadata", {}).get("vehicle_class"),
+        "uyari": "Tahmini tutardır; giriş/çıkış gişesine göre değişebilir."
+    }
+
+
 async def get_toll_prices_handler(filter_region: str = None) -> str:
     """
     Köprü ve otoyol ücretlerini getirir.
@@ -22,7 +147,7 @@ async def get_toll_prices_handler(filter_region: str = None) -> str:
         return data["error"]
 
     result_text = "🚗 **GÜNCEL GEÇİŞ ÜCRETLERİ (2026 Tahmini)**\n\n"
-    
+
     # Köprüler
     result_text += "🌉 **KÖPRÜLER & TÜNELLER**\n"
     found = False
@@ -39,8 +164,8 @@ async def get_toll_prices_handler(filter_region: str = None) -> str:
             continue
         result_text += f"- **{highway['name']}**: {highway['price_tl']} TL ({highway['note']})\n"
         found = True
-        
+
     if not found and filter_region:
         return f"❌ '{filter_region}' bölgesi için geçiş ücreti bulunamadı."
 
-    return result_text
\ No newline at end of file
+    return result_text
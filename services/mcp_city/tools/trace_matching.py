@@ -0,0 +1,136 @@
+import math
+from datetime import datetime
+import numpy as np
+from logger import log
+from .regions import regions
+from . import memory_routing
+from services.csr_graph import _haversine_m
+from services.map_matching import CHUNK_POINTS, METERS_PER_DEG, MIN_SPACING_M
+
+# --- GPS İZİ EŞLEME (match_trace) ---
+# Filo araçlarının gürültülü GPS izi yol ağına oturtulur: Hangi kenarlardan, hangi yönde, ne hızla geçildi.
+# Aday arama City Agent sürecinde (Kenar STRtree'si, parça başına tek sorgu), Viterbi rota havuzunda
+# (Paylaşımlı graf) çalışır. İz CHUNK_POINTS'lik parçalarla işlenir; parçalar arası son durum taşınır.
+
+
+def _parse_points(points: list) -> tuple:
+    """[{"lat", "lon", "time"}] ya da [[lat, lon, time?]] -> (enlemler, boylamlar, zamanlar | None)."""
+    lats, lons, times = [], [], []
+    for point in points:
+        if isinstance(point, dict):
+            lat, lon, stamp = point["lat"], point["lon"], point.get("time")
+        else:
+            lat, lon, stamp = point[0], point[1], point[2] if len(point) > 2 else None
+        if isinstance(stamp, str):
+            stamp = datetime.fromisoformat(stamp.replace("Z", "+00:00")).timestamp()
+        lats.append(float(lat))
+        lons.append(float(lon))
+        times.append(float(stamp) if stamp is not None else None)
+    if any(t is None for t in times):
+        times = None
+    return np.array(lats), np.array(lons), times
+
+
+def _spaced(lats: np.ndarray, lons: np.ndarray) -> list:
+    """Bir önceki tutulan noktaya MIN_SPACING_M'den yakın noktaları atlar (Son nokta her zaman tutulur)."""
+    scale_x = math.cos(math.radians(float(np.mean(lats)))) * METERS_PER_DEG
+    xs, ys = (lons * scale_x).tolist(), (lats * METERS_PER_DEG).tolist()
+    keep = [0]
+    for i in range(1, len(xs)):
+        j = keep[-1]
+        if math.hypot(xs[i] - xs[j], ys[i] - ys[j]) >= MIN_SPACING_M or i == len(xs) - 1:
+            keep.append(i)
+    return keep
+
+
+def _merge(previous: dict, segment: dict):
+    """Parça sınırında kesilen bölümü birleştirir (Sınırdaki kenar iki parçada da yarım görünür)."""
+    edges = segment["edges"]
+    last, first = previous["edges"][-1], edges[0]
+    if (last["gid"], last["direction"]) == (first["gid"], first["direction"]):
+        last["covered_m"] = round(last["covered_m"] + first["covered_m"], 1)
+        if last["seconds"] is not None and first["seconds"] is not None:
+            last["seconds"] = round(last["seconds"] + first["seconds"], 1)
+            last["speed_kmh"] = round(last["covered_m"] / last["seconds"] * 3.6, 1) if last["seconds"] > 0 else None
+        edges = edges[1:]
+    previous["edges"].extend(edges)
+    previous["distance_m"] = round(previous["distance_m"] + segment["distance_m"], 1)
+    if previous["seconds"] is not None and segment["seconds"] is not None:
+        previous["seconds"] = round(previous["seconds"] + segment["seconds"], 1)
+    previous["points"] += segment["points"] - 1
+
+
+async def match_trace_handler(points: list) -> dict:
+    if len(points) < 2:
+        return {"error": "İz en az 2 nokta içermeli."}
+    try:
+        lats, lons, times = _parse_points(points)
+    except (KeyError, IndexError, TypeError, ValueError) as e:
+        return {"error": f"Nokta formatı hatalı: {e}"}
+
+    region = regions.find(float(lats[0]), float(lons[0])) or regions.find(float(lats[-1]), float(lons[-1]))
+    if region is None:
+        return {"error": "İz hizmet bölgesi dışında."}
+
+    router = await memory_routing.get_router(region)
+    index = await router.edge_index()
+    kept = _spaced(lats, lons)
+    log.info(f"🛰️ [MAP MATCHING] {region.name}: {len(points)} nokta ({len(kept)} eşlenecek)")
+
+    segments = []
+    carry = None      # (nokta sırası, aday): Önceki parçanın sabitlenen son durumu
+    open_segment = False
+    for chunk_start in range(0, len(kept), CHUNK_POINTS):
+        chunk = kept[chunk_start:chunk_start + CHUNK_POINTS]
+        point_idx, edge_idx, fracs, dists = index.candidates(lons[chunk], lats[chunk])
+
+        steps = []
+        if carry is not None:
+            steps.append({"point": carry[0], "cands": [carry[1]]})
+        bounds = np.searchsorted(point_idx, np.arange(len(chunk) + 1))
+        for i, point in enumerate(chunk):
+            lo, hi = bounds[i], bounds[i + 1]
+            if lo == hi:
+                continue   # Yol ağına yakın değil (Bölge dışı, bina içi vb.)
+            steps.append({
+                "point": point,
+                "cands": list(zip(edge_idx[lo:hi].tolist(), fracs[lo:hi].tolist(), dists[lo:hi].tolist())),
+            })
+        for i, step in enumerate(steps):
+            step["time"] = times[step["point"]] if times else None
+            prev = steps[i - 1]["point"] if i else step["point"]
+            step["gc"] = _haversine_m(lons[prev], lats[prev], lons[step["point"]], lats[step["point"]])
+        if len(steps) < 2:
+            continue
+
+        result = await router.match(steps)
+        chunk_segments = result["segments"]
+        ends_open = bool(chunk_segments) and chunk_segments[-1]["last_step"] == len(steps) - 1
+        if chunk_segments and open_segment and carry is not None and chunk_segments[0]["first_step"] == 0:
+            _merge(segments[-1], chunk_segments.pop(0))
+        segments.extend(chunk_segments)
+        open_segment = ends_open
+        carry = (steps[-1]["point"], result["last"])
+
+    if not segments:
+        return {"error": "İz yol ağına eşlenemedi."}
+
+    edges, lines = [], []
+    for number, segment in enumerate(segments):
+        arcs = router.graph.edge_arcs([e["gid"] for e in segment["edges"]], [e["direction"] for e in segment["edges"]])
+        lines.append(router.graph.path_coordinates(arcs or []))
+        edges.extend({"segment": number, **edge} for edge in segment["edges"])
+    timed = all(s["seconds"] is not None for s in segments)
+    distance_m = sum(s["distance_m"] for s in segments)
+    log.success(f"✅ [MAP MATCHING] {len(edges)} kenar, {len(segments)} bölüm, {distance_m / 1000:.2f} km")
+    return {
+        "region": region.name,
+        "total_points": len(points),
+        "matched_points": sum(s["points"] for s in segments),
+        "segments": len(segments),
+        "distance_km": round(distance_m / 1000.0, 2),
+        "duration_min": round(sum(s["seconds"] for s in segments) / 60.0, 1) if timed else None,
+        "edges": edges,
+        "geometry": {"type": "LineString", "coordinates": lines[0]} if len(lines) == 1
+        else {"type": "MultiLineString", "coordinates": lines},
+    }
@@ -1,28 +1,64 @@
 import httpx
-import asyncio
+import time
 from datetime import datetime, timezone, timedelta
 from .config import settings
 from logger import log
-from .geometry import sample_route_points 
+from .cache import redis_store
+from .geometry import sample_route_points, eta_at_fraction
+from .fanout import fetch_json_with_retry, bounded_gather
 
 
 async def get_weather_simple(client, lat, lon):
     """Tekil nokta için hızlı sorgu (Batch işlemde kullanacağız)"""
+    params = {
+        "lat": lat, "lon": lon, 
+        "appid": settings.OPENWEATHER_API_KEY, 
+        "units": "metric",
+        "exclude": "minutely,daily,alerts" # Anlık + Saatlik (ETA eşlemesi için 48 saat)
+    }
+    # Timeout + 429/5xx retry fanout modülünde. Başarısızsa None döner (loglanarak).
+    return await fetch_json_with_retry(
+        client, settings.OPENWEATHER_URL, params,
+        timeout=settings.WEATHER_REQUEST_TIMEOUT,
+        retries=settings.WEATHER_MAX_RETRIES,
+        base_delay=settings.WEATHER_RETRY_BASE_DELAY
+    )
+
+def _grid_cell(lat: float, lon: float) -> tuple:
+    """Noktanın ait olduğu grid hücresi. Aynı hücredeki noktalar tek istekle sorgulanır."""
+    g = settings.WEATHER_GRID_DEG
+    return (round(lat / g), round(lon / g))
+
+def _resolve_eta_profile(polyline: str, duration_min: float | None, checkpoints: list) -> tuple:
+    """
+    Rotanın zaman profilini bulur: [(rota_oranı, kümülatif_saniye), ...]
+    Öncelik: Rota hesaplanırken kaydedilen parça bazlı profil > Toplam süre > Varsayılan hız.
+    """
     try:
-        params = {
-            "lat": lat, "lon": lon, 
-            "appid": settings.OPENWEATHER_API_KEY, 
-            "units": "metric",
-            "exclude": "minutely,hourly,daily,alerts" # Sadece anlık yeterli
-        }
-        resp = await client.get(settings.OPENWEATHER_URL, params=params)
-        return resp.json()
-    except:
+        profile = redis_store.get_eta_profile(polyline)
+        if profile:
+            return profile, "rota_profili"
+    except Exception as e:
+        log.warning(f"⚠️ [SHIELD] ETA profili okunamadı: {e}")
+
+    if duration_min:
+        return [(0.0, 0.0), (1.0, duration_min * 60)], "toplam_sure"
+
+    total_km = checkpoints[-1]["km_point"]
+    return [(0.0, 0.0), (1.0, total_km / settings.WEATHER_DEFAULT_SPEED_KMH * 3600)], "varsayilan_hiz"
+
+def _pick_forecast(weather_data: dict, target_ts: float) -> dict | None:
+    """Varış zamanına en yakın tahmini seçer (Anlık veri + saatlik tahminler arasından)."""
+    candidates = [weather_data["current"]] if weather_data.get("current") else []
+    candidates += weather_data.get("hourly") or []
+    if not candidates:
         return None
+    return min(candidates, key=lambda h: abs(h.get("dt", 0) - target_ts))
 
-async def analyze_route_weather_handler(polyline: str) -> dict:
+async def analyze_route_weather_handler(polyline: str, duration_min: float = None) -> dict:
     """
     WEATHER SHIELD: Rota boyunca hava durumunu tarar ve risk raporu oluşturur.
+    Her nokta, sürücünün oraya varacağı saatin (ETA) tahminiyle değerlendirilir.
     """
     if not polyline:
         return {"error": "Rota verisi (polyline) eksik."}
@@ -32,24 +68,47 @@ async def analyze_route_weather_handler(polyline: str) -> dict:
     if not checkpoints:
         return {"error": "Rota geometrisi çözülemedi."}
 
-    log.info(f"🛡️ [SHIELD] Hava Kalkanı Devrede: {len(checkpoints)} nokta taranıyor...")
+    # 2. Her noktaya varış süresini ve grid hücresini hesapla
+    profile, profile_source = _resolve_eta_profile(polyline, duration_min, checkpoints)
+    cells = {}
+    for point in checkpoints:
+        point["eta_sec"] = eta_at_fraction(profile, point["fraction"]) or 0
+        point["cell"] = _grid_cell(point["lat"], point["lon"])
+        # Hücrenin ilk noktasını sorgu noktası olarak kullan
+        cells.setdefault(point["cell"], (point["lat"], point["lon"]))
+
+    log.info(f"🛡️ [SHIELD] Hava Kalkanı Devrede: {len(checkpoints)} nokta, {len(cells)} hücre taranıyor...")
 
     risks = []
     summary = []
     
-    # 2. Paralel İstek At (Batch Request)
+    # 3. Hücre başına tek istek (Eşzamanlılık limitli Batch Request)
+    cell_keys = list(cells)
     async with httpx.AsyncClient() as client:
-        tasks = [get_weather_simple(client, p["lat"], p["lon"]) for p in checkpoints]
-        results = await asyncio.gather(*tasks)
-
-    # 3. Analiz ve Süzgeç
-    for point, weather_data in zip(checkpoints, results):
-        if not weather_data or "current" not in weather_data: continue
-
-        current = weather_data["current"]
-        temp = current.get("temp")
-        condition = current.get("weather", [{}])[0].get("main", "") # Rain, Snow, Clear
-        desc = current.get("weather", [{}])[0].get("description", "")
+        results = await bounded_gather(
+            cell_keys,
+            lambda c: get_weather_simple(client, cells[c][0], cells[c][1]),
+            limit=settings.WEATHER_MAX_CONCURRENCY
+        )
+    forecasts = dict(zip(cell_keys, results))
+
+    # 4. Analiz ve Süzgeç
+    now_ts = time.time()
+    missing = []
+    for point in checkpoints:
+        weather_data = forecasts.get(point["cell"])
+        eta_ts = now_ts + point["eta_sec"]
+        forecast = _pick_forecast(weather_data, eta_ts) if weather_data else None
+        if not forecast:
+            missing.append(f"{point['km_point']}. km")
+            continue
+
+        temp = forecast.get("temp")
+        condition = forecast.get("weather", [{}])[0].get("main", "") # Rain, Snow, Clear
+        desc = forecast.get("weather", [{}])[0].get("description", "")
+
+        tz = timezone(timedelta(seconds=weather_data.get("timezone_offset", 0)))
+        eta_str = datetime.fromtimestamp(eta_ts, tz).strftime("%H:%M")
         
         # Risk Tespiti (LLM için bayraklar)
         is_risky = False
@@ -64,7 +123,7 @@ async def analyze_route_weather_handler(polyline: str) -> dict:
         elif condition in ["Fog", "Mist"]:
             is_risky = True
             risk_emoji = "🌫️"
-        elif temp < 2: # Buzlanma riski
+        elif temp is not None and temp < 2: # Buzlanma riski
             is_risky = True
             risk_emoji = "🧊"
         
@@ -73,18 +132,32 @@ async def analyze_route_weather_handler(polyline: str) -> dict:
         if is_risky or point["km_point"] == 0 or point == checkpoints[-1]:
             summary.append({
                 "km": f"{point['km_point']}. km",
+                "tahmini_varis": f"{eta_str} (+{int(point['eta_sec'] // 60)} dk)",
                 "durum": f"{risk_emoji} {desc.title()}",
                 "sicaklik": f"{temp}°C",
                 "riskli_mi": is_risky
             })
             
             if is_risky:
-                risks.append(f"{point['km_point']}. km civarında {desc} ({temp}°C)")
+                risks.append(f"{point['km_point']}. km civarında (varış ~{eta_str}) {desc} ({temp}°C)")
+
+    # 5. Final Rapor
+    covered = len(checkpoints) - len(missing)
+    if missing:
+        log.warning(f"⚠️ [SHIELD] Eksik veri: {len(missing)} nokta sorgulanamadı ({', '.join(missing)})")
+
+    if covered == 0:
+        risk_level = "BİLİNMİYOR" # Hiç veri yoksa 'TEMİZ' demek yanıltıcı olur
+    else:
+        risk_level = "YÜKSEK" if len(risks) > 0 else "TEMİZ"
 
-    # 4. Final Rapor
     shield_report = {
         "tarama_noktasi_sayisi": len(checkpoints),
-        "risk_durumu": "YÜKSEK" if len(risks) > 0 else "TEMİZ",
+        "sorgulanan_hucre_sayisi": len(cells),
+        "zaman_profili": profile_source,
+        "kapsama": f"{covered}/{len(checkpoints)} nokta",
+        "veri_alinamayan_noktalar": missing,
+        "risk_durumu": risk_level,
         "riskli_bolgeler": risks,
         "detayli_ozet": summary,
         "tavsiye": "Güzergah temiz görünüyor, iyi yolculuklar." if not risks else "Dikkat! Rotada kritik hava değişimleri var."
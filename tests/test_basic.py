@@ -109,4 +109,47 @@ async def test_validation_error():
     error_msg = results[0]["error"].lower()
     
     # "validation error" veya "match pattern" gibi ifadeler olmalı
-    assert "validation error" in error_msg or "input should match" in error_msg or "string should match" in error_msg
\ No newline at end of file
+    assert "validation error" in error_msg or "input should match" in error_msg or "string should match" in error_msg
+
+
+@pytest.mark.asyncio
+async def test_local_route_fails_fast_across_components():
+    """Farklı bileşenlere snap edilen noktalar için Dijkstra hiç çalışmamalı"""
+    from services.mcp_city.tools import local_routing
+
+    snaps = [
+        {"id": 1, "component": 0, "dist": 5.0, "main_id": None, "main_dist": None},
+        # En yakın düğüm adacıkta ama ana ağ 40 m ötede: Ana ağ seçilir
+        {"id": 2, "component": 3, "dist": 10.0, "main_id": 20, "main_dist": 50.0},
+    ]
+    conn = AsyncMock()
+    conn.fetchrow.side_effect = lambda sql, *args: snaps.pop(0) if "WITH p AS" in sql else None
+    with patch("services.mcp_city.tools.local_routing.asyncpg.connect", AsyncMock(return_value=conn)):
+        assert await local_routing._compute_local_route(41.0, 29.0, 41.01, 29.01, "fastest") is None
+    assert conn.fetchrow.call_count == 3        # İki snap + rota (Aynı bileşen)
+
+    snaps[:] = [
+        {"id": 1, "component": 0, "dist": 5.0, "main_id": None, "main_dist": None},
+        # Ana ağ çok uzakta (Ada): Adacıktaki düğüm kalır, rota aranmaz
+        {"id": 2, "component": 3, "dist": 10.0, "main_id": 20, "main_dist": 2000.0},
+    ]
+    conn.fetchrow.reset_mock()
+    with patch("services.mcp_city.tools.local_routing.asyncpg.connect", AsyncMock(return_value=conn)):
+        assert await local_routing._compute_local_route(41.0, 29.0, 41.2, 29.2, "fastest") is None
+    assert conn.fetchrow.call_count == 2
+
+
+def test_region_registry_lookup():
+    """Nokta -> bölge (STRtree + poligon). Bölgeler arası rota yerel grafa düşmemeli"""
+    from services.mcp_city.tools.regions import RegionRegistry
+    from services.mcp_city.tools.config import settings
+
+    registry = RegionRegistry(settings.REGIONS)
+    assert registry.find(41.01, 28.97).name == "istanbul"
+    samsun = registry.find(41.29, 36.33)
+    assert samsun.name == "samsun" and samsun.schema == "samsun" and samsun.traffic_feed is None
+    assert samsun.clip_bbox == (35.95, 41.05, 36.80, 41.45)
+    assert registry.get("istanbul").clip_bbox is None
+    assert registry.find(39.93, 32.85) is None                       # Ankara
+    assert registry.find_route(41.01, 28.97, 41.29, 36.33) is None
+    assert registry.find_route(41.28, 36.30, 41.20, 36.60) is samsun
@@ -0,0 +1,278 @@
+from services.mcp_city.etl.osm_poi import build_category_rules, normalize_poi
+
+
+def test_poi_category_normalization():
+    """OSM etiketleri OSM_TAG_MAP kategorilerine normalize edilmeli"""
+    rules = build_category_rules({
+        "school": ['"amenity"="school"', '"amenity"="university"'],
+        "mosque": ['"amenity"="place_of_worship"["religion"="muslim"]'],
+        "square": ['"place"="square"', '"landuse"="plaza"'],
+    })
+
+    assert normalize_poi({"amenity": "university", "name": "İTÜ"}, rules) == ("school", "amenity", "university")
+    assert normalize_poi({"amenity": "place_of_worship", "religion": "muslim"}, rules)[0] == "mosque"
+    # Sözlükte olmayan değer ham haliyle kategori olur
+    assert normalize_poi({"amenity": "place_of_worship"}, rules)[0] == "place_of_worship"
+    assert normalize_poi({"leisure": "park"}, rules) == ("park", "leisure", "park")
+    # Overpass'ın aradığı diğer katmanlar da girer; building=yes kategori taşımaz
+    assert normalize_poi({"place": "square"}, rules) == ("square", "place", "square")
+    assert normalize_poi({"landuse": "plaza"}, rules)[0] == "square"
+    assert normalize_poi({"building": "yes", "shop": "bakery"}, rules) == ("bakery", "shop", "bakery")
+    # POI anahtarı yoksa None
+    assert normalize_poi({"highway": "primary"}, rules) is None
+    assert normalize_poi({"building": "yes"}, rules) is None
+
+
+def test_streaming_osm_import_rows(tmp_path):
+    """Akış okuyucu düğümleri sıralı depoya koymalı, yol parçaları uzunluklarıyla üretilmeli"""
+    from services.mcp_city.etl.osm_graph import WAY_COLUMNS, way_edge_rows
+    from services.mcp_city.etl.osm_nodes import NodeStore
+    from services.mcp_city.etl.osm_xml import iter_osm_xml
+
+    osm = tmp_path / "mini.osm"
+    osm.write_text("""<?xml version="1.0"?>
+<osm version="0.6">
+  <bounds minlat="41.0" minlon="29.0" maxlat="41.1" maxlon="29.1"/>
+  <node id="30" lat="41.0" lon="29.002"/>
+  <node id="10" lat="41.0" lon="29.0"/>
+  <node id="20" lat="41.0" lon="29.001"><tag k="amenity" v="cafe"/></node>
+  <way id="5"><nd ref="10"/><nd ref="20"/><nd ref="30"/><nd ref="99"/><tag k="highway" v="primary"/></way>
+</osm>""")
+
+    nodes = NodeStore()
+    ways = []
+    for kind, *payload in iter_osm_xml(str(osm)):
+        if kind == "node":
+            nodes.add(*payload[:3])
+        elif kind == "way":
+            ways.append(payload)
+
+    nodes.freeze()
+    assert list(nodes.ids) == [10, 20, 30]
+    lons, lats, found = nodes.lookup([30, 99])
+    assert lons[0] == 29.002 and not found[1]
+
+    way_id, refs, tags = ways[0]
+    rows = [dict(zip(WAY_COLUMNS, r)) for r in way_edge_rows(way_id, refs, tags, nodes)]
+    # 99 numaralı düğüm dosyada yok -> 2 parça
+    assert len(rows) == 2
+    assert abs(rows[0]["length_m"] - 84.0) < 1.0          # 0.001 derece boylam @41° ≈ 84 m
+    assert abs(rows[0]["cost_time"] - rows[0]["length_m"] / (70 / 3.6)) < 1e-6
+    assert rows[0]["reverse_cost_time"] == rows[0]["cost_time"]
+    # Tek yön: Geri yön kapalı (-1); oneway=-1 ise düğüm sırası çevrilir, geri yön yine kapalı
+    one_way = [dict(zip(WAY_COLUMNS, r)) for r in way_edge_rows(way_id, refs, {**tags, "oneway": "yes"}, nodes)]
+    assert one_way[0]["reverse_cost_time"] == -1 and one_way[0]["cost_time"] > 0
+    against = [dict(zip(WAY_COLUMNS, r)) for r in way_edge_rows(way_id, refs, {**tags, "oneway": "-1"}, nodes)]
+    assert against[-1]["source"] == 20 and against[-1]["target"] == 10 and against[-1]["reverse_cost_time"] == -1
+
+
+def _pb_varint(n: int) -> bytes:
+    out = bytearray()
+    while True:
+        b, n = n & 0x7F, n >> 7
+        out.append(b | 0x80 if n else b)
+        if not n:
+            return bytes(out)
+
+
+def _pb_bytes(field: int, payload: bytes) -> bytes:
+    return _pb_varint(field << 3 | 2) + _pb_varint(len(payload)) + payload
+
+
+def _pb_packed(values, zigzag=False) -> bytes:
+    return b"".join(_pb_varint((v << 1) ^ (v >> 63) if zigzag else v) for v in values)
+
+
+def test_pbf_block_decoding(tmp_path):
+    """PBF okuyucu DenseNodes (delta + zigzag) ve yol referanslarını doğru çözmeli"""
+    import zlib
+    from services.mcp_city.etl.osm_pbf import packed_varints, read_block, scan_blocks
+
+    assert list(packed_varints(_pb_packed([1, 300, 2 ** 40]))) == [1, 300, 2 ** 40]
+
+    strings = ["", "amenity", "cafe", "name", "Kafe", "highway", "primary"]
+    string_table = b"".join(_pb_bytes(1, s.encode()) for s in strings)
+    # Koordinatlar granularity=100 nanoderece biriminde, delta kodlu
+    dense = (_pb_bytes(1, _pb_packed([10, 10, 10], zigzag=True))
+             + _pb_bytes(8, _pb_packed([410000000, 0, 1000000], zigzag=True))
+             + _pb_bytes(9, _pb_packed([290000000, 100000, 100000], zigzag=True))
+             + _pb_bytes(10, _pb_packed([0, 1, 2, 3, 4, 0, 0])))
+    way = (_pb_varint(1 << 3) + _pb_varint(5)
+           + _pb_bytes(2, _pb_packed([5])) + _pb_bytes(3, _pb_packed([6]))
+           + _pb_bytes(8, _pb_packed([10, 10, 10], zigzag=True)))
+    block = _pb_bytes(1, string_table) + _pb_bytes(2, _pb_bytes(2, dense)) + _pb_bytes(2, _pb_bytes(3, way))
+
+    blob = _pb_varint(2 << 3) + _pb_varint(len(block)) + _pb_bytes(3, zlib.compress(block))
+    header = _pb_bytes(1, b"OSMData") + _pb_varint(3 << 3) + _pb_varint(len(blob))
+    path = tmp_path / "mini.osm.pbf"
+    path.write_bytes(len(header).to_bytes(4, "big") + header + blob)
+
+    bbox, blocks = scan_blocks(str(path))
+    assert bbox is None and len(blocks) == 1
+
+    decoded = read_block(str(path), *blocks[0])
+    ids, lons, lats, tagged = decoded.nodes()
+    assert list(ids) == [10, 20, 30]
+    assert list(lons) == [290000000, 290100000, 290200000]
+    assert list(lats) == [410000000, 410000000, 411000000]
+    assert tagged == [(20, 290100000, 410000000, {"amenity": "cafe", "name": "Kafe"})]
+
+    way_id, refs, tags = next(decoded.ways())
+    assert (way_id, list(refs), tags) == (5, [10, 20, 30], {"highway": "primary"})
+    assert decoded.has_ways()
+
+
+def test_graph_compaction_cuts_only_at_junctions():
+    """Yollar sadece kavşak ve uç düğümlerde bölünmeli, ara düğümler geometride kalmalı"""
+    import numpy as np
+    from services.mcp_city.etl.osm_graph import WAY_COLUMNS, count_refs, merge_junctions, way_edge_rows
+    from services.mcp_city.etl.osm_nodes import NodeStore
+
+    nodes = NodeStore()
+    for node_id in range(1, 8):
+        nodes.add(node_id, 29.0 + node_id * 0.001, 41.0)
+    nodes.freeze()
+
+    main_road = np.array([1, 2, 3, 4, 5])
+    side_road = np.array([6, 3, 7])
+    junctions = merge_junctions([count_refs([main_road]), count_refs([side_road])])
+    assert list(junctions) == [3]
+
+    tags = {"highway": "residential"}
+    compact = way_edge_rows(1, main_road, tags, nodes, junctions)
+    raw = way_edge_rows(1, main_road, tags, nodes)
+    assert len(raw) == 4 and len(compact) == 2
+    # Toplam uzunluk değişmemeli, kenar geometrisi 3 nokta taşımalı (EWKB: bayt 9-13 nokta sayısı)
+    length = WAY_COLUMNS.index("length_m")
+    assert abs(sum(r[length] for r in compact) - sum(r[length] for r in raw)) < 1e-6
+    edge = dict(zip(WAY_COLUMNS, compact[0]))
+    assert edge["node_ids"] == [1, 2, 3]
+    assert int.from_bytes(edge["the_geom"][9:13], "little") == 3
+
+    # Topoloji: source/target doğrudan OSM düğüm id'leri, düğüm tablosu kenar uçlarından
+    from services.mcp_city.etl.osm_graph import EndpointTally, vertex_rows
+    assert [(r[2], r[3]) for r in compact] == [(1, 3), (3, 5)]
+    tally = EndpointTally(flush_every=2)
+    tally.add(compact)
+    tally.add(way_edge_rows(2, side_road, tags, nodes, junctions))
+    vertices = {v[0]: v[1] for v in vertex_rows(tally.counts(), nodes)}
+    assert vertices == {1: 1, 3: 4, 5: 1, 6: 1, 7: 1}
+
+
+def test_osc_change_resplits_touched_way(tmp_path):
+    """Yeni yol mevcut yolun ortasına bağlanınca sadece o yol kavşaktan yeniden bölünmeli"""
+    import numpy as np
+    from services.mcp_city.etl.osm_changes import read_changes, rebuild_rows, stitch_runs
+    from services.mcp_city.etl.osm_graph import count_refs, merge_junctions
+    from services.mcp_city.etl.osm_nodes import NodeStore
+
+    osc = tmp_path / "daily.osc"
+    osc.write_text("""<?xml version="1.0"?>
+<osmChange version="0.6">
+  <create>
+    <node id="4" lat="41.001" lon="29.002"/>
+    <way id="2"><nd ref="4"/><nd ref="2"/><tag k="highway" v="service"/></way>
+  </create>
+  <modify><way id="3"><nd ref="8"/><nd ref="9"/><tag k="building" v="yes"/></way></modify>
+  <delete><node id="7"/></delete>
+</osmChange>""")
+
+    changed_nodes, changed_ways = read_changes(str(osc))
+    assert changed_nodes == {4: (29.002, 41.001), 7: None}
+    assert changed_ways[3] is None                     # highway olmayan yol graftan çıkar
+    assert list(changed_ways[2][0]) == [4, 2]
+
+    # DB'deki mevcut yol: 1-2-3 tek kenar; eksik düğüm boşluğu ayrı parça olmalı
+    assert [list(r) for r in stitch_runs([[1, 2, 3], [5, 6]])] == [[1, 2, 3], [5, 6]]
+    assert [list(r) for r in stitch_runs([[1, 2], [2, 3]])] == [[1, 2, 3]]
+
+    nodes = NodeStore()
+    for node_id, lon in ((1, 29.0), (2, 29.002), (3, 29.004)):
+        nodes.add(node_id, lon, 41.0)
+    nodes.add(4, *changed_nodes[4])
+    nodes.freeze()
+
+    way_defs = {
+        1: ([np.array([1, 2, 3])], {"highway": "residential", "name": "A", "oneway": "no"}),
+        2: ([changed_ways[2][0]], changed_ways[2][1]),
+    }
+    junctions = merge_junctions([count_refs(runs) for runs, _ in way_defs.values()])
+    rows = rebuild_rows(way_defs, nodes, junctions)
+    assert [(r[0], r[1], r[2], r[3]) for r in rows] == [(1, 0, 1, 2), (1, 1, 2, 3), (2, 0, 4, 2)]
+
+
+def test_osc_change_fetches_missing_node_coordinates():
+    """Yeni highway yol etkilenmeyen kenarın ara düğümünden geçiyorsa koordinat DB'den gelmeli, yol düşmemeli"""
+    import numpy as np
+    import shapely
+    from shapely.geometry import LineString
+    from services.mcp_city.etl.osm_changes import build_node_store, missing_refs, rebuild_rows
+
+    edges = [{"node_ids": [1, 2], "the_geom": shapely.to_wkb(LineString([(29.0, 41.0), (29.001, 41.0)]))}]
+    changed_nodes = {4: (29.003, 41.001), 6: None}
+    # Yol 9: 2 (etkilenen kenar), 5 (başka yolun ara düğümü, .osc'de yok), 4 (.osc'de yeni), 6 (silindi)
+    way_defs = {9: ([np.array([2, 5, 4, 6])], {"highway": "residential"})}
+
+    nodes = build_node_store(edges, changed_nodes)
+    assert missing_refs(way_defs, nodes, changed_nodes).tolist() == [5]
+    assert [r[2:4] for r in rebuild_rows(way_defs, nodes, None)] == []     # Eksik düğümle yol kaybolurdu
+
+    nodes = build_node_store(edges, changed_nodes, {5: (29.002, 41.0)})
+    assert not len(missing_refs(way_defs, nodes, changed_nodes))
+    assert [(r[2], r[3]) for r in rebuild_rows(way_defs, nodes, None)] == [(2, 5), (5, 4)]
+
+
+def test_connected_components_rank_by_size():
+    from services.mcp_city.etl.graph_stats import connected_components
+
+    # 10-20-30-40 zinciri ana bileşen, 7-8 kopuk adacık
+    ids, labels, sizes = connected_components([10, 30, 30, 7], [20, 20, 40, 8])
+    by_id = dict(zip(ids.tolist(), labels.tolist()))
+    assert {by_id[n] for n in (10, 20, 30, 40)} == {0}
+    assert by_id[7] == by_id[8] == 1
+    assert sizes.tolist() == [4, 2]
+
+
+def test_ibb_match_prefers_overlap_and_bearing():
+    import shapely
+    from shapely.geometry import LineString
+    from services.mcp_city.etl.matcher import make_tiles, score_matches
+
+    def wkb(coords):
+        return shapely.to_wkb(LineString(coords))
+
+    east = [(29.000, 41.0), (29.001, 41.0)]                   # ~84 m doğuya
+    segments = {
+        1: [(29.0012, 41.00005), (28.9998, 41.00005)],        # Ters yön, paralel
+        2: [(28.9998, 41.00005), (29.0012, 41.00005)],        # Aynı yön, paralel
+        3: [(29.0005, 40.999), (29.0005, 41.001)],            # Dik kesişen
+        4: [(29.0009, 41.0), (29.0020, 41.0)],                # Sadece ucuna değen
+    }
+    args = (list(segments), [wkb(c) for c in segments.values()])
+
+    # Tek yönlü: Sadece aynı yöndeki segment
+    assert [m[:2] for m in score_matches([7], [wkb(east)], [84.0], [True], *args)] == [(7, 2)]
+    # Çift yönlü: Ters segment de geçerli ama eşitlikte çizim yönü kazanır
+    assert [m[:2] for m in score_matches([7], [wkb(east)], [84.0], [False], *args)] == [(7, 2)]
+    assert [m[:2] for m in score_matches([7], [wkb(east)], [84.0], [False], [1, 3], args[1][::2])] == [(7, 1)]
+    assert score_matches([7], [wkb(east)], [84.0], [True], [1, 3], args[1][::2]) == []
+
+    # Karolar kapsamayı boşluksuz örter
+    tiles = make_tiles(29.0, 41.0, 29.12, 41.0, 0.05)
+    assert len(tiles) == 3 and tiles[0][2] == tiles[1][0] and tiles[-1][2] > 29.12
+
+
+def test_ibb_json_streams_items(tmp_path):
+    import io
+    from services.mcp_city.etl.ibb_json import ibb_segment_rows, iter_json_array
+    from services.mcp_city.etl.pg_copy import linestring_coords
+
+    text = '[ {"S": 5, "G": "[[41.0, 29.0], [41.001, 29.002]]"},\n {"S": 6, "G": [[41.1, 29.1], [41.2, 29.2]]},' \
+           ' {"S": 7, "G": "[[41.0, 29.0]]"}, {"X": 1}, {"S": 8, "G": "[[41.3, 29.3], [41.4, 29.4], [41.5, 29.5]]"} ]'
+    # Küçük parça boyutu: Elemanlar ve sayılar parça sınırında bölünür
+    assert [i.get("S") for i in iter_json_array(io.StringIO(text), chunk_size=7)] == [5, 6, 7, None, 8]
+
+    rows = list(ibb_segment_rows(io.StringIO(text), chunk_size=11))
+    assert [r[0] for r in rows] == [5, 6, 8]
+    assert linestring_coords(rows[0][1]).tolist() == [[29.0, 41.0], [29.002, 41.001]]
+    assert list(iter_json_array(io.StringIO(" [ ] "))) == []
@@ -0,0 +1,74 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, patch
+from services.mcp_city.tools import osm
+from services.mcp_city.tools.mirror_health import MirrorHealth
+
+
+@pytest.mark.asyncio
+async def test_hedged_race_cancels_slow_mirror():
+    """Yavaş mirror beklenmemeli: hedge süresi dolunca ikinci mirror kazanmalı, yavaş olan iptal edilmeli"""
+    cancelled = []
+
+    async def fake_query(client, url, query, tag):
+        if url == "slow":
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(url)
+                raise
+        return [{"isim": f"Park ({url})"}]
+
+    with patch.object(osm, "_query_mirror", new=fake_query), \
+         patch.object(osm.overpass_health, "ranked", return_value=["slow", "fast"]), \
+         patch.object(osm.settings, "OVERPASS_HEDGE_DELAY", 0.05):
+        places = await asyncio.wait_for(osm._race_mirrors(None, "q", "park"), timeout=2)
+        await asyncio.sleep(0)
+
+    assert places[0]["isim"] == "Park (fast)"
+    assert cancelled == ["slow"]
+
+
+def test_mirror_circuit_breaker():
+    """429 dönen mirror cooldown süresince sıralamadan çıkmalı, yavaş mirror sona düşmeli"""
+    health = MirrorHealth(prefix="test")
+
+    with patch("services.mcp_city.tools.mirror_health.redis_store") as mock_redis:
+        mock_redis.client = None  # Redis yok -> süreç içi skor
+
+        health.record_success("a", 8.0)
+        health.record_success("b", 0.5)
+        health.record_failure("c", status=429)
+
+        assert health.ranked(["a", "b", "c"]) == ["b", "a"]
+
+
+@pytest.mark.asyncio
+async def test_search_uses_local_index_and_falls_back_for_unknown_category():
+    """Kapsama içinde yerel sonuç döner; boş sonuç 'bulunamadı' olur, indekste hiç olmayan kategori Overpass'a düşer"""
+    conn = AsyncMock()
+    overpass = AsyncMock(return_value=[{"isim": "Taksim Meydanı"}])
+
+    async def search(fetchval, rows, lat=41.03, lon=28.98):
+        conn.fetchval.side_effect = fetchval
+        conn.fetch.return_value = rows
+        with patch.object(osm.asyncpg, "connect", AsyncMock(return_value=conn)), \
+             patch.object(osm, "_race_mirrors", overpass):
+            return await osm.search_infrastructure_osm_handler(lat=lat, lon=lon, category="square")
+
+    row = {"name": "Taksim Meydanı", "category": "square", "tag_value": "square", "lat": 41.037, "lon": 28.985}
+    assert (await search([True], [row]))[0] == {"isim": "Taksim Meydanı", "tur": "square", "lat": 41.037, "lon": 28.985}
+    assert "warning" in (await search([True, True], []))[0]
+    overpass.assert_not_called()
+
+    assert await search([True, False], []) == [{"isim": "Taksim Meydanı"}]
+    overpass.assert_awaited_once()
+
+    # Samsun: Bölgenin şemasındaki tablolar sorgulanır; bölge dışı nokta DB'ye hiç gitmez
+    conn.reset_mock()
+    assert (await search([True], [row], lat=41.29, lon=36.33))[0]["isim"] == "Taksim Meydanı"
+    assert "FROM samsun.poi_coverage" in conn.fetchval.call_args.args[0]
+    assert "FROM samsun.pois" in conn.fetch.call_args.args[0]
+    conn.reset_mock()
+    assert await search([], [], lat=39.93, lon=32.85) == [{"isim": "Taksim Meydanı"}]
+    conn.fetch.assert_not_called()
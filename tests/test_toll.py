@@ -0,0 +1,28 @@
+import flexpolyline
+import pytest
+from services.mcp_city.tools.toll import estimate_route_tolls_handler
+
+
+@pytest.mark.asyncio
+async def test_istanbul_ankara_tolls():
+    """Çamlıca -> Akıncı rotası O-4 ücretini içermeli, Avrupa'ya geçiş yoksa köprü ücreti olmamalı"""
+    route = flexpolyline.encode([(41.0195, 29.0990), (40.7700, 30.4000), (40.0650, 32.5600)])
+
+    result = await estimate_route_tolls_handler(route)
+
+    names = [g["ad"] for g in result["gecisler"]]
+    assert names == ["O-4 Anadolu Otoyolu"]
+    assert result["toplam_ucret_tl"] == 187.0
+
+
+@pytest.mark.asyncio
+async def test_bosphorus_bridge_heading():
+    """15 Temmuz Köprüsü sadece Asya -> Avrupa yönünde ücretli"""
+    asia = (41.0420, 29.0500)
+    europe = (41.0480, 29.0180)
+
+    westbound = await estimate_route_tolls_handler(flexpolyline.encode([asia, europe]))
+    eastbound = await estimate_route_tolls_handler(flexpolyline.encode([europe, asia]))
+
+    assert westbound["toplam_ucret_tl"] == 33.0
+    assert eastbound["toplam_ucret_tl"] == 0
@@ -0,0 +1,392 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from services.mcp_city.services.traffic_monitor import build_snapshot, diff_snapshot, snapshot_hash
+
+
+def test_snapshot_diff_threshold():
+    """Sadece eşikten fazla değişen segmentler yazılmalı, duran trafik 3 km/s olmalı"""
+    snapshot = build_snapshot([
+        {"S": 1, "V": 50},
+        {"S": 2, "V": 42},
+        {"S": 3, "V": 0},
+        {"S": 4, "V": None},  # Eksik veri atlanır
+    ])
+    assert snapshot == {1: 50, 2: 42, 3: 3}
+
+    previous = {1: 48, 2: 30, 3: 3}
+    assert sorted(diff_snapshot(snapshot, previous, threshold=5)) == [(42, 2)]
+    # Eşiğe eşit değişim yazılmaz (Sadece eşikten fazlası)
+    assert diff_snapshot({1: 50, 2: 42}, {1: 45, 2: 36}, threshold=5) == [(42, 2)]
+
+    # İlk döngüde (hafıza boş) hepsi yazılır
+    assert len(diff_snapshot(snapshot, {}, threshold=5)) == 3
+
+
+def test_snapshot_hash_is_order_independent():
+    assert snapshot_hash({1: 50, 2: 40}) == snapshot_hash({2: 40, 1: 50})
+    assert snapshot_hash({1: 50, 2: 40}) != snapshot_hash({1: 50, 2: 41})
+
+
+def test_history_pack_roundtrip():
+    """Paketli geçmiş: ordinal indeksli, eksik segment 255, hız 254'e kırpılır"""
+    from services.mcp_city.services.traffic_history import pack_speeds, unpack_speeds, NO_DATA
+
+    ordinals = {101: 0, 205: 1, 309: 2}
+    blob = pack_speeds({101: 45, 309: 400}, ordinals)
+
+    assert len(blob) == 3
+    assert list(unpack_speeds(blob)) == [45, NO_DATA, 254]
+
+
+@pytest.mark.asyncio
+async def test_epoch_listener_swaps_snapshot():
+    """Yeni epoch ağırlıkları yeni tampona uygulanmalı, eski görüntü değişmemeli"""
+    from services.mcp_city.services.traffic_epoch import TrafficEpochListener, pack_weights, BLOB_KEY
+
+    blobs = {
+        BLOB_KEY.format(epoch=1): pack_weights([(10, 5.0, 6.0), (11, 7.5, 7.5)]),
+        BLOB_KEY.format(epoch=2): pack_weights([(10, 9.0, 9.0)]),
+    }
+    client = AsyncMock()
+    client.get.side_effect = lambda key: blobs.get(key)
+
+    listener = TrafficEpochListener(lambda: client)
+    seen = []
+    listener.on_epoch(seen.append)
+
+    await listener.apply(client, 1)
+    before = listener.snapshot
+    await listener.apply(client, 2)
+
+    assert before.weights == {10: (5.0, 6.0), 11: (7.5, 7.5)}
+    assert listener.snapshot.weights == {10: (9.0, 9.0), 11: (7.5, 7.5)}
+    assert listener.snapshot.complete
+    assert seen == [1, 2]
+
+    # Epoch atlanırsa görüntü eksik işaretlenir
+    await listener.apply(client, 4)
+    assert listener.epoch == 4 and not listener.snapshot.complete
+
+
+def test_graph_reload_invalidates_snapshot():
+    """Yeni graf sürümü: gid'ler değiştiği için ağırlık görüntüsü eksik sayılmalı, tüketiciler uyarılmalı"""
+    from services.mcp_city.services.traffic_epoch import TrafficEpochListener, WeightSnapshot
+
+    listener = TrafficEpochListener(lambda: None)
+    listener.snapshot = WeightSnapshot(epoch=3, weights={10: (1.0, 1.0)})
+    reloaded = []
+    listener.on_graph_reload(reloaded.append)
+
+    listener.apply_graph(1)
+    listener.apply_graph(1)   # Aynı sürüm tekrar gelirse yok sayılır
+    assert reloaded == [1]
+    assert listener.graph_version == 1
+    assert listener.snapshot.epoch == 3 and not listener.snapshot.complete and not listener.snapshot.weights
+
+
+@pytest.mark.asyncio
+async def test_live_speeds_upsert_edge_speed_and_join_route_cost():
+    """Canlı hız dar edge_speed tablosuna upsert edilir (ways'e yazılmaz); rota maliyeti JOIN + COALESCE ile okur"""
+    from unittest.mock import patch
+    from services.mcp_city.services import traffic_monitor
+    from services.mcp_city.tools import local_routing
+
+    conn = AsyncMock()
+    conn.fetch.return_value = [(7, 9.0, 9.0)]
+    assert await traffic_monitor.apply_updates(conn, [(40, 123)]) == [(7, 9.0, 9.0)]
+    ddl = conn.execute.call_args_list[0].args[0]
+    assert "edge_speed" in ddl and "fillfactor = 70" in ddl
+    conn.copy_records_to_table.assert_awaited_once_with("traffic_updates", records=[(40, 123)])
+    upsert = conn.fetch.call_args.args[0]
+    assert "INSERT INTO public.edge_speed" in upsert and "ON CONFLICT (gid) DO UPDATE" in upsert
+    assert "WHERE e.speed IS DISTINCT FROM EXCLUDED.speed" in upsert and "UPDATE public.ways" not in upsert
+
+    snaps = [{"id": 1, "component": 0, "dist": 1.0, "main_id": None, "main_dist": None},
+             {"id": 3, "component": 0, "dist": 1.0, "main_id": None, "main_dist": None}]
+    route_row = {
+        "total_meters": 200.0, "total_seconds": 18.0, "edge_meters": [100.0, 100.0], "edge_seconds": [9.0, 9.0],
+        "gids": [7, 8], "directions": [1, 1], "nodes": [1, 2],
+        "geometry": '{"type": "LineString", "coordinates": [[29.0, 41.0], [29.002, 41.0]]}',
+    }
+    conn = AsyncMock()
+    conn.fetchrow.side_effect = lambda sql, *args: snaps.pop(0) if "WITH p AS" in sql else route_row
+    with patch("services.mcp_city.tools.local_routing.asyncpg.connect", AsyncMock(return_value=conn)):
+        result = await local_routing._compute_local_route(41.0, 29.0, 41.0, 29.002, "fastest")
+    route_sql = conn.fetchrow.call_args.args[0]
+    assert "LEFT JOIN public.edge_speed s ON s.gid = w.gid" in route_sql
+    assert "COALESCE(s.cost_time, w.cost_time) as cost" in route_sql
+    assert "COALESCE(s.reverse_cost_time, w.reverse_cost_time) as reverse_cost" in route_sql
+    # Süre ve geometri gidiş yönünde: target -> source geçilen kenarda geri yön süresi, çevrilmiş geometri
+    assert f"sum(({local_routing.EDGE_SECONDS_SQL})) as total_seconds" in route_sql
+    assert "ELSE COALESCE(sp.reverse_cost_time, b.reverse_cost_time) END" in local_routing.EDGE_SECONDS_SQL
+    assert "ELSE ST_Reverse(b.the_geom) END ORDER BY a.seq" in route_sql
+    assert result["duration_min"] == 0.3 and result["edges"]["nodes"] == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_live_speed_keeps_one_way_reverse_closed():
+    """Tek yön: Canlı hız ters yönü açmamalı (SQL upsert negatif maliyeti korur, bellek içi graf aynı yolu bulur)"""
+    from services.mcp_city.services import traffic_monitor
+    from services.mcp_city.services.csr_graph import CSRGraph
+
+    conn = AsyncMock()
+    conn.fetch.return_value = [(6, 7.2, -1.0)]
+    changed = await traffic_monitor.apply_updates(conn, [(50, 123)])
+    upsert = conn.fetch.call_args.args[0]
+    assert "CASE WHEN w.reverse_cost_time < 0 THEN w.reverse_cost_time" in upsert
+
+    # 1 -(6, tek yön 1->2)- 2 ve 1 -(5, çift yön, uzun)- 2
+    graph = CSRGraph.from_edges(
+        gids=[5, 6], sources=[1, 1], targets=[2, 2], costs=[30, 10], reverse_costs=[30, -1], lengths=[300, 100],
+        vertex_ids=[1, 2], lons=[29.0, 29.001], lats=[41.0, 41.0],
+    )
+    gids, costs, reverse = zip(*changed)
+    graph.publish_weights(graph.overlay_weights(graph.weights, gids, costs, reverse))
+    one, two = graph.vertex_index(1), graph.vertex_index(2)
+    assert graph.describe_path(graph.shortest_path(one, two)["arcs"])["gids"] == [6]
+    assert graph.describe_path(graph.shortest_path(two, one)["arcs"])["gids"] == [5]
+
+
+def test_csr_graph_shared_weights():
+    """Paylaşımlı CSR: Bağlanan taraf kopyasız görür, ağırlık güncellemesi rotayı değiştirir"""
+    from services.mcp_city.services.csr_graph import CSRGraph
+
+    # 1 -(10)- 2 -(10)- 3 ve 1 -(25)- 3 (gid 7, geri yön kapalı)
+    graph = CSRGraph.from_edges(
+        gids=[5, 6, 7], sources=[1, 2, 1], targets=[2, 3, 3],
+        costs=[10, 10, 25], reverse_costs=[10, 10, -1], lengths=[100, 100, 200],
+        vertex_ids=[3, 1, 2], lons=[29.002, 29.0, 29.001], lats=[41.0, 41.0, 41.0],
+    )
+    handle = graph.share()
+    worker = CSRGraph.attach(handle)
+    try:
+        one, three = worker.vertex_index(1), worker.vertex_index(3)
+        path = worker.shortest_path(one, three)
+        assert worker.describe_path(path["arcs"])["gids"] == [5, 6] and path["seconds"] == 20
+        # Geri yön kapalı kenar kullanılmaz
+        assert worker.describe_path(worker.shortest_path(three, one)["arcs"])["gids"] == [6, 5]
+
+        base = graph.weights.copy()
+        graph.publish_weights(graph.overlay_weights(base, [6, 99], [30.0, 1.0], [30.0, 1.0]))
+        assert int(worker.generation[0]) == 2
+        path = worker.shortest_path(one, three)
+        assert worker.describe_path(path["arcs"])["gids"] == [7] and path["seconds"] == 25
+        assert worker.describe_path(worker.shortest_path(three, one)["arcs"])["directions"] == [-1, -1]
+    finally:
+        worker.close()
+        graph.close(unlink=True)
+
+
+def test_graph_snapshot_mmap_roundtrip(tmp_path):
+    """Graf dosyası: mmap ile açılır, KD-ağacıyla snap, geometri yönüyle birleşir, ağırlıklar paylaşımlı bellekte"""
+    from services.mcp_city.services import graph_snapshot
+    from services.mcp_city.services.csr_graph import CSRGraph
+
+    # 1 - 2 - 3 ana ağ, 9 - 10 kopuk adacık; gid 6 geometrisi 3 -> 2 yönünde kayıtlı
+    graph = CSRGraph.from_edges(
+        gids=[5, 6, 8], sources=[1, 3, 9], targets=[2, 2, 10],
+        costs=[10, 10, 5], reverse_costs=[10, 10, 5], lengths=[100, 100, 50],
+        vertex_ids=[1, 2, 3, 9, 10], lons=[29.0, 29.001, 29.002, 29.0, 29.0005],
+        lats=[41.0, 41.0, 41.0, 41.01, 41.01], components=[0, 0, 0, 1, 1],
+        geometries=(
+            [[29.0, 41.0], [29.001, 41.0], [29.002, 41.0], [29.0015, 41.0001], [29.001, 41.0],
+             [29.0, 41.01], [29.0005, 41.01]],
+            [2, 3, 2],
+        ),
+    )
+    path = str(tmp_path / "test.1.graph")
+    graph.write_snapshot(path, {"fingerprint": {"edges": 3, "max_gid": 8}})
+    graph_snapshot.publish_snapshot("test", path, str(tmp_path))
+
+    loaded = graph_snapshot.open_snapshot("test", str(tmp_path))
+    handle = loaded.share()
+    worker = CSRGraph.attach(handle)
+    try:
+        assert loaded.meta["fingerprint"]["max_gid"] == 8 and not loaded.edge_gids.flags.writeable
+        assert int(loaded.vertex_ids[loaded.nearest_vertex(29.0019, 41.0)]) == 3
+        assert int(loaded.vertex_ids[loaded.nearest_vertex(29.0, 41.009, main_only=True)]) == 1
+
+        arcs = worker.shortest_path(worker.vertex_index(1), worker.vertex_index(3))["arcs"]
+        assert worker.path_coordinates(arcs) == [[29.0, 41.0], [29.001, 41.0], [29.0015, 41.0001], [29.002, 41.0]]
+
+        loaded.publish_weights(loaded.overlay_weights(loaded.weights, [6], [40.0], [40.0]))
+        assert worker.shortest_path(worker.vertex_index(1), worker.vertex_index(3))["seconds"] == 50
+    finally:
+        worker.close()
+        loaded.close(unlink=True)
+
+
+def test_reroute_rejoins_stored_route():
+    """Sapma: Rotaya en ucuz (sapma + kalan) noktadan dönülür, rotanın geri kalanı aynen kullanılır"""
+    import numpy as np
+    from services.mcp_city.services.csr_graph import CSRGraph
+    from services.mcp_city.tools import memory_routing
+    from services.mcp_city.tools.route_store import StoredRoute
+
+    # Rota 1 -> 2 -> 3 -> 4 (gid 1, 2, 3). Sürücü 9'da: 9-2 kısa (5 sn), 9-4 uzun (100 sn)
+    graph = CSRGraph.from_edges(
+        gids=[1, 2, 3, 10, 11], sources=[1, 2, 3, 9, 9], targets=[2, 3, 4, 2, 4],
+        costs=[10, 10, 10, 5, 100], reverse_costs=[10, 10, 10, 5, 100], lengths=[100, 100, 100, 50, 900],
+        vertex_ids=[1, 2, 3, 4, 9], lons=[29.0, 29.001, 29.002, 29.003, 29.001],
+        lats=[41.0, 41.0, 41.0, 41.0, 41.001],
+    )
+    route = StoredRoute.unpack(StoredRoute.from_edges("istanbul", "fastest", 41.0, 29.003, {
+        "nodes": [1, 2, 3, 4], "gids": [1, 2, 3], "directions": [1, 1, 1],
+        "edge_meters": [100, 100, 100], "edge_seconds": [10, 10, 10],
+    }).pack())
+    assert route.remaining().tolist() == [30.0, 20.0, 10.0, 0.0] and route.nodes.dtype == np.int64
+
+    memory_routing._WORKER_GRAPH = graph
+    try:
+        args = (route.nodes, route.gids, route.directions, route.remaining())
+        path = memory_routing._rejoin_worker(9, *args, budget=300)
+        assert path["gids"] == [10, 2, 3] and path["nodes"] == [9, 2, 3, 4]
+        assert path["directions"] == [1, 1, 1] and path["seconds"] == 25 and path["detour_edges"] == 1
+        # Bütçe içinde rotaya ulaşılamıyor: Tam rotaya düşülür
+        assert memory_routing._rejoin_worker(9, *args, budget=3) is None
+    finally:
+        memory_routing._WORKER_GRAPH = None
+
+
+@pytest.mark.asyncio
+async def test_match_trace_snaps_noisy_trace(monkeypatch):
+    """GPS izi: Paralel yola kaymadan ana yola oturur, parçalar birleşir, kenar süreleri izden çıkar"""
+    from services.mcp_city.services.csr_graph import CSRGraph, _haversine_m
+    from services.mcp_city.services import map_matching
+    from services.mcp_city.tools import memory_routing, trace_matching
+
+    # Ana yol 1 - 2 - 3 (doğu), 60 m kuzeyde paralel yol 4 - 5, bağlantı 3 - 5
+    ids, lons, lats = [1, 2, 3, 4, 5], [29.0, 29.002, 29.004, 29.0, 29.004], [41.0, 41.0, 41.0, 41.00054, 41.00054]
+    sources, targets = [1, 2, 3, 4], [2, 3, 5, 5]
+    lengths = [_haversine_m(lons[ids.index(a)], lats[ids.index(a)], lons[ids.index(b)], lats[ids.index(b)])
+               for a, b in zip(sources, targets)]
+    graph = CSRGraph.from_edges([1, 2, 3, 4], sources, targets, lengths, lengths, lengths, ids, lons, lats)
+
+    class Router:
+        def __init__(self):
+            self.graph, self.index = graph, map_matching.EdgeIndex(graph)
+
+        async def edge_index(self):
+            return self.index
+
+        async def match(self, steps):
+            return map_matching.match_steps(graph, steps)
+
+    class Region:
+        name = "istanbul"
+
+    monkeypatch.setattr(memory_routing, "get_router", AsyncMock(return_value=Router()))
+    monkeypatch.setattr(trace_matching.regions, "find", lambda lat, lon: Region())
+    monkeypatch.setattr(trace_matching, "CHUNK_POINTS", 4)
+
+    # 2 sn'de bir ~25 m (45 km/s), kuzeye 12-18 m sapmalı (Paralel yola daha uzak)
+    points = [{"lat": 41.0 + (0.00011 if k % 2 else 0.00016), "lon": 29.0 + k * 0.0003, "time": 2 * k}
+              for k in range(13)]
+    result = await trace_matching.match_trace_handler(points)
+
+    assert result["segments"] == 1 and [e["gid"] for e in result["edges"]] == [1, 2]
+    assert all(e["direction"] == 1 for e in result["edges"])
+    assert result["duration_min"] == round(24 / 60, 1)
+    assert sum(e["seconds"] for e in result["edges"]) == pytest.approx(24, abs=0.2)
+    assert 40 < result["edges"][0]["speed_kmh"] < 50
+    assert result["geometry"]["coordinates"][0] == [29.0, 41.0]
+
+
+@pytest.mark.asyncio
+async def test_event_overlay_slows_venue_edges_during_window():
+    """Derbi penceresinde stadyum kenarları yavaşlar; çakışan etkinlikte en büyük çarpan, pencere dışında katman yok"""
+    import time
+    import numpy as np
+    from datetime import datetime
+    from services.mcp_city.tools import event_overlay as eo
+    from services.mcp_city.tools.local_routing import _event_join
+
+    kickoff = datetime(2026, 3, 1, 20, 0)
+    matches = [
+        {"id": 1, "stadium": "Chobani Stadyumu Fenerbahçe Şükrü Saracoğlu Spor Kompleksi - İstanbul",
+         "city": "İstanbul", "match_date": kickoff, "traffic_impact_level": 3},
+        {"id": 2, "stadium": "Malatya İnönü Stadyumu - Malatya", "city": "Malatya",
+         "match_date": kickoff, "traffic_impact_level": 3},   # Başka şehir: Beşiktaş'a eşlenmemeli
+    ]
+    events = [{"id": 7, "venue": "Ülker Stadyumu Konser Alanı", "city": "istanbul", "event_date": "01.03.2026 19:30"},
+              {"id": 8, "venue": "Bilinmeyen Sahne", "city": "istanbul", "event_date": "01.03.2026 19:30"}]
+    windows = eo.build_windows(matches, events)
+    assert [(w.key, w.venue, w.factor) for w in windows] == [
+        ("match:1", "sukru_saracoglu", 1.8), ("event:7", "sukru_saracoglu", 1.2),
+    ]
+
+    overlay = eo.EventOverlay()
+    # Zorlu penceresi kapanmış (Başlangıç = bitiş): Kenar 10 sadece derbiden etkilenir
+    overlay.windows = windows + [eo.EventWindow("event:9", "zorlu_psm", "istanbul", kickoff, kickoff, 1.5)]
+    overlay._loaded_at = time.monotonic()
+    overlay._venue_edges["istanbul"] = {"sukru_saracoglu": np.array([3, 10, 42]), "zorlu_psm": np.array([10, 11])}
+
+    class Region:
+        name = "istanbul"
+
+    active = await overlay.active(Region(), now=kickoff)
+    assert active.signature == ("event:7", "match:1")
+    assert active.gids.tolist() == [3, 10, 42] and np.allclose(active.factors, 1.8)
+    assert "ARRAY[3,10,42]::bigint[]" in _event_join(active, "w")
+    assert not await overlay.active(Region(), now=datetime(2026, 3, 2, 12, 0))
+
+
+def test_memory_router_applies_events_and_live_weights(monkeypatch):
+    """Bellek içi motor: Etkinlik çarpanı ve canlı hızlar yayınlanan ağırlıkta birleşir, katman kalkınca geri döner"""
+    import numpy as np
+    from services.mcp_city.services.csr_graph import CSRGraph
+    from services.mcp_city.services.traffic_epoch import WeightSnapshot
+    from services.mcp_city.tools import memory_routing
+    from services.mcp_city.tools.event_overlay import EMPTY_OVERLAY, ActiveOverlay
+
+    monkeypatch.setattr(memory_routing, "ProcessPoolExecutor", lambda *args, **kwargs: MagicMock())
+    graph = CSRGraph.from_edges(
+        gids=[5], sources=[1], targets=[2], costs=[10], reverse_costs=[-1], lengths=[100],
+        vertex_ids=[1, 2], lons=[29.0, 29.001], lats=[41.0, 41.0],
+    )
+    router = memory_routing.MemoryRouter(graph, graph.weights.copy(), workers=1)
+    try:
+        arc = int(graph.fwd_arc[0])
+        router.apply_events(EMPTY_OVERLAY)
+        assert graph.weights[arc] == 10
+
+        router.apply_events(ActiveOverlay(("match:1",), np.array([5, 99]), np.array([1.5, 2.0], dtype=np.float32)))
+        assert graph.weights[arc] == 15
+        router.apply_snapshot(WeightSnapshot(epoch=1, weights={5: (20.0, -1.0)}))
+        assert graph.weights[arc] == 30 and not router.stale
+
+        router.apply_events(EMPTY_OVERLAY)
+        assert graph.weights[arc] == 20
+    finally:
+        router.close()
+
+
+def test_speed_forecast_profile_and_anomaly_decay():
+    """Tahmin: Sabah zirvesi profilden gelir; anlık sapma (kaza) ufuk uzadıkça profile döner"""
+    import numpy as np
+    from datetime import datetime, timedelta
+    from services.mcp_city.services.traffic_forecast import (
+        LOCAL_TZ, OrdinalLookup, SpeedForecaster, pack_forecast, unpack_forecast,
+    )
+
+    forecaster = SpeedForecaster()
+    monday = datetime(2026, 3, 2, tzinfo=LOCAL_TZ)
+    # İki hafta, 2 dk'da bir: Segment 0 her gün 08-09 arası 30 km/s (Diğer saatler 60), segment 1 hep 50
+    for k in range(14 * 24 * 30):
+        t = monday + timedelta(minutes=2 * k)
+        forecaster.update(t, np.array([30.0 if t.hour == 8 else 60.0, 50.0]))
+
+    now = monday + timedelta(days=14, hours=7, minutes=30)
+    for _ in range(5):   # Segment 1'de kaza: 20 km/s
+        forecaster.update(now, np.array([60.0, 20.0]))
+    predicted = forecaster.forecast(now, (15, 30, 60))
+
+    assert predicted[0, 0] > predicted[1, 0] > predicted[2, 0]          # Zirveye yaklaşıyor
+    assert abs(predicted[2, 0] - 30) < 2                                 # 08:30
+    assert 20 < predicted[0, 1] < predicted[1, 1] < predicted[2, 1] < 50  # Sapma sönümleniyor
+
+    # Snapshot -> ordinal dizisi (Bilinmeyen segment atlanır) ve Redis paketi
+    speeds = OrdinalLookup().speeds({101: 40, 202: 70, 999: 10}, {202: 0, 101: 1})
+    assert speeds.tolist() == [70.0, 40.0]
+    _, horizons, packed = unpack_forecast(pack_forecast(now, (15, 30, 60), predicted))
+    assert horizons == (15, 30, 60) and packed.shape == (3, 2) and packed[2, 0] == round(float(predicted[2, 0]))
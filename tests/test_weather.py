@@ -0,0 +1,106 @@
+import asyncio
+import time
+import pytest
+from unittest.mock import patch, AsyncMock, MagicMock
+from services.mcp_city.tools.fanout import fetch_json_with_retry, bounded_gather
+
+
+@pytest.mark.asyncio
+async def test_fetch_retries_on_429():
+    """429 dönen istek tekrar denenmeli, sonra başarılı cevap dönmeli"""
+    rate_limited = MagicMock(status_code=429, headers={})
+    ok = MagicMock(status_code=200, headers={}, json=lambda: {"current": {"temp": 10}})
+
+    client = MagicMock()
+    client.get = AsyncMock(side_effect=[rate_limited, ok])
+
+    # Bekleme süresini atla (Test hızlı bitsin)
+    with patch("services.mcp_city.tools.fanout.asyncio.sleep", new=AsyncMock()):
+        data = await fetch_json_with_retry(client, "http://x", {}, retries=2)
+
+    assert data == {"current": {"temp": 10}}
+    assert client.get.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_fetch_gives_up_on_long_retry_after():
+    """Retry-After istek timeout'unu aşıyorsa beklenmemeli (Slot saatlerce kilitlenmesin); kısa olana uyulmalı"""
+    client = MagicMock()
+    client.get = AsyncMock(return_value=MagicMock(status_code=429, headers={"Retry-After": "3600"}))
+    sleep = AsyncMock()
+    with patch("services.mcp_city.tools.fanout.asyncio.sleep", new=sleep):
+        assert await fetch_json_with_retry(client, "http://x", {}, timeout=8.0, retries=3) is None
+    assert client.get.call_count == 1
+    sleep.assert_not_called()
+
+    ok = MagicMock(status_code=200, headers={}, json=lambda: {"ok": True})
+    client.get = AsyncMock(side_effect=[MagicMock(status_code=429, headers={"Retry-After": "2"}), ok])
+    with patch("services.mcp_city.tools.fanout.asyncio.sleep", new=sleep):
+        assert await fetch_json_with_retry(client, "http://x", {}, timeout=8.0) == {"ok": True}
+    sleep.assert_awaited_once_with(2.0)
+
+
+@pytest.mark.asyncio
+async def test_bounded_gather_limit():
+    """Aynı anda çalışan iş sayısı limiti aşmamalı, sıra korunmalı"""
+    running = 0
+    peak = 0
+
+    async def worker(i):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return i * 2
+
+    results = await bounded_gather(list(range(20)), worker, limit=4)
+
+    assert results == [i * 2 for i in range(20)]
+    assert peak <= 4
+
+
+@pytest.mark.asyncio
+async def test_route_weather_one_fetch_per_cell():
+    """Aynı grid hücresindeki noktalar tek istekle sorgulanmalı, ETA'ya göre tahmin seçilmeli"""
+    from services.mcp_city.tools import weather
+
+    checkpoints = [
+        {"lat": 41.00, "lon": 29.00, "km_point": 0, "fraction": 0.0},
+        {"lat": 41.01, "lon": 29.01, "km_point": 1, "fraction": 0.5},  # Aynı hücre
+        {"lat": 39.90, "lon": 32.80, "km_point": 450, "fraction": 1.0},
+    ]
+    forecast = {
+        "timezone_offset": 10800,
+        "current": {"dt": time.time(), "temp": 15, "weather": [{"main": "Clear", "description": "açık"}]},
+        # Varış saatine (5 saat sonra) denk gelen tahmin karlı
+        "hourly": [{"dt": time.time() + 5 * 3600, "temp": -3, "weather": [{"main": "Snow", "description": "kar"}]}],
+    }
+
+    with patch.object(weather, "sample_route_points", return_value=checkpoints), \
+         patch.object(weather.redis_store, "get_eta_profile", return_value=[(0.0, 0.0), (1.0, 5 * 3600)]), \
+         patch.object(weather, "get_weather_simple", new=AsyncMock(return_value=forecast)) as mock_fetch:
+
+        report = await weather.analyze_route_weather_handler("encoded")
+
+    assert mock_fetch.call_count == 2
+    assert report["kapsama"] == "3/3 nokta"
+    assert report["risk_durumu"] == "YÜKSEK"
+
+
+def test_local_route_eta_profile_keyed_by_polyline():
+    """Yerel rota ETA profili kendi polyline'ı ile saklanmalı; encode edilemeyen rota ortak anahtara yazmamalı"""
+    from services.mcp_city.tools import here
+
+    profile = [(0.5, 60.0), (1.0, 120.0)]
+    route = {"mode": "fastest", "distance_km": 1.0, "duration_min": 2.0, "eta_profile": profile,
+             "geometry": {"type": "LineString", "coordinates": [[29.0, 41.0], [29.01, 41.0]]}}
+    with patch.object(here, "redis_store") as store:
+        response = here.build_local_response(route, None, 41.0, 29.0, 41.0, 29.01, "A", "B")
+        assert response["polyline_encoded"] != "LOCAL_ROUTE"
+        store.set_eta_profile.assert_called_once_with(response["polyline_encoded"], profile)
+
+        store.reset_mock()
+        response = here.build_local_response({**route, "geometry": None}, None, 41.0, 29.0, 41.0, 29.01, "A", "B")
+        assert response["polyline_encoded"] == "LOCAL_ROUTE"
+        store.set_eta_profile.assert_not_called()